@@ -0,0 +1,223 @@
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from functools import wraps
+from flask import g, request, jsonify, make_response
+
+try:
+    import redis
+except ImportError:  # 可选依赖，只在配置了 AGGREGATE_CACHE_REDIS_URL 时需要
+    redis = None
+
+class MemoryBackend:
+    """进程内缓存，每个工作进程一份（invalidate 只对本进程生效，跨进程靠键中的数据版本号）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._generation = 0
+
+    def generation(self):
+        return self._generation
+
+    def bump_generation(self):
+        with self._lock:
+            self._generation += 1
+            # 旧一代的条目不会再被读取，直接清空
+            self._entries.clear()
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        return entry[1]
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+
+    def acquire(self, key, timeout):
+        # 进程内的并发由 AggregateCache 的单飞锁处理
+        return True
+
+    def release(self, key):
+        pass
+
+class RedisBackend:
+    """Redis（或兼容协议的服务）缓存，所有工作进程共享，失效对所有进程立即生效"""
+
+    GENERATION_KEY = 'bookstore:agg:generation'
+
+    def __init__(self, url):
+        if redis is None:
+            raise RuntimeError('配置了 AGGREGATE_CACHE_REDIS_URL，但没有安装 redis 包')
+        self._client = redis.Redis.from_url(url)
+        self._tokens = {}
+
+    def generation(self):
+        return int(self._client.get(self.GENERATION_KEY) or 0)
+
+    def bump_generation(self):
+        self._client.incr(self.GENERATION_KEY)
+
+    def get(self, key):
+        value = self._client.get(key)
+        return json.loads(value) if value is not None else None
+
+    def set(self, key, value, ttl):
+        self._client.set(key, json.dumps(value), ex=ttl)
+
+    def acquire(self, key, timeout):
+        # 跨进程的重算锁：拿不到锁的进程等待结果写入缓存
+        token = uuid.uuid4().hex
+        if self._client.set(f'{key}:lock', token, nx=True, px=int(timeout * 1000)):
+            self._tokens[key] = token
+            return True
+        return False
+
+    def release(self, key):
+        token = self._tokens.pop(key, None)
+        if token is not None and self._client.get(f'{key}:lock') == token.encode():
+            self._client.delete(f'{key}:lock')
+
+class AggregateCache:
+    """
+    统计类接口的结果缓存，键为 接口名 + 规范化后的查询参数 + 数据版本号 + 当前代数。
+    数据版本号由 conditional 从数据库读取，任何进程提交的写入都会改变它，
+    每个进程一份的 MemoryBackend 也不会返回其他进程写入之前的结果；
+    销售、进货付款、新书入库提交后调用 invalidate() 使代数加一，本进程（Redis 时为所有进程）
+    的旧条目立即失效，不占用缓存空间。
+
+    同一个键同时只有一个线程（使用 Redis 时为一个进程）重新计算，
+    其他请求等待计算完成后直接读取结果，不会同时执行多次全量统计。
+    """
+
+    def __init__(self, ttl=300, lock_timeout=30):
+        self.ttl = ttl
+        self.lock_timeout = lock_timeout
+        self.backend = MemoryBackend()
+        self.hits = 0
+        self.misses = 0
+        self._locks_guard = threading.Lock()
+        self._locks = {}  # 键 -> [锁, 使用中的线程数]
+
+    def configure(self, ttl=None, lock_timeout=None, backend=None):
+        if ttl is not None:
+            self.ttl = ttl
+        if lock_timeout is not None:
+            self.lock_timeout = lock_timeout
+        if backend is not None:
+            self.backend = backend
+
+    def invalidate(self):
+        self.backend.bump_generation()
+
+    @contextmanager
+    def _key_lock(self, key):
+        # 每个键一把锁，记录正在持有或等待它的线程数；
+        # 数量超过上限时只淘汰没有线程使用的锁，正在计算的键仍是同一把锁
+        with self._locks_guard:
+            entry = self._locks.get(key)
+            if entry is None:
+                if len(self._locks) > 1024:
+                    for stale in [k for k, e in self._locks.items() if e[1] == 0]:
+                        del self._locks[stale]
+                entry = self._locks[key] = [threading.Lock(), 0]
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._locks_guard:
+                entry[1] -= 1
+
+    def get_or_compute(self, name, params, compute):
+        key = f'bookstore:agg:{self.backend.generation()}:{name}:{params}'
+        value = self.backend.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        with self._key_lock(key):
+            # 等待锁期间可能已由其他线程算好
+            value = self.backend.get(key)
+            if value is not None:
+                self.hits += 1
+                return value
+
+            deadline = time.monotonic() + self.lock_timeout
+            while not self.backend.acquire(key, self.lock_timeout):
+                time.sleep(0.05)
+                value = self.backend.get(key)
+                if value is not None:
+                    self.hits += 1
+                    return value
+                if time.monotonic() > deadline:
+                    # 持有锁的进程可能已退出，自行计算
+                    break
+
+            try:
+                self.misses += 1
+                value = compute()
+                if value is not None:
+                    self.backend.set(key, value, self.ttl)
+                return value
+            finally:
+                self.backend.release(key)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'backend': type(self.backend).__name__,
+            'ttl': self.ttl,
+            'generation': self.backend.generation(),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 4) if total else 0
+        }
+
+aggregate_cache = AggregateCache()
+
+def _normalized_params():
+    # 忽略空参数，参数顺序不同的请求使用同一个键
+    return '&'.join(f'{k}={v}' for k, v in sorted(request.args.items(multi=True)) if v != '')
+
+def cached_aggregate(f):
+    """
+    缓存接口返回的JSON（仅200响应），放在 login_required / conditional 之下，
+    conditional 须列出接口读取的所有表，缓存键包含这些表的数据版本号。
+    接口的结果只能依赖查询参数，不能依赖当前用户。
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        status = {}
+        params = _normalized_params()
+        # 未执行数据版本号迁移时 conditional 读不到版本号，只靠代数和有效期失效
+        versions = g.get('data_versions')
+        if versions is not None:
+            params = f'{params}|{versions}'
+
+        def compute():
+            response = make_response(f(*args, **kwargs))
+            data = response.get_json(silent=True) if response.status_code == 200 else None
+            if data is None:
+                # 错误响应和非JSON响应不缓存，原样返回
+                status['response'] = response
+            return data
+
+        data = aggregate_cache.get_or_compute(request.endpoint, params, compute)
+        if data is None:
+            return status['response']
+        return jsonify(data)
+    return decorated_function
+
+def init_aggregate_cache(app):
+    app.config.setdefault('AGGREGATE_CACHE_TTL', int(os.getenv('AGGREGATE_CACHE_TTL', 300)))
+    app.config.setdefault('AGGREGATE_CACHE_REDIS_URL', os.getenv('AGGREGATE_CACHE_REDIS_URL'))
+    backend = None
+    if app.config['AGGREGATE_CACHE_REDIS_URL']:
+        backend = RedisBackend(app.config['AGGREGATE_CACHE_REDIS_URL'])
+    aggregate_cache.configure(ttl=app.config['AGGREGATE_CACHE_TTL'], backend=backend or MemoryBackend())
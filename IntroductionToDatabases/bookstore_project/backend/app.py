@@ -3,6 +3,16 @@ from flask_cors import CORS
 from dotenv import load_dotenv
 import os
 from backend.models import db, init_app  
+from backend.db_pool import configure_pool
+from backend.query_counter import init_query_counter
+from backend.auth import init_auth
+from backend.passwords import init_passwords
+from backend.book_cache import init_book_cache
+from backend.dashboard_snapshot import init_dashboard_snapshot
+from backend.aggregate_cache import init_aggregate_cache
+from backend.partitions import init_partitions
+from backend.report_views import init_report_views
+from backend.commands import init_commands
 from backend.routes.user_routes import user_bp  
 from backend.routes.book_routes import book_bp  
 from backend.routes.purchase_routes import purchase_bp  
@@ -28,17 +38,53 @@ def create_app():
     app.config['PERMANENT_SESSION_LIFETIME'] = 86400  # 会话有效期24小时
     app.config['SESSION_COOKIE_DOMAIN'] = None  # 不指定域，让浏览器使用当前访问的域名
     
+    # 请求体大小上限（MAX_UPLOAD_MB，默认10），超过时返回413，
+    # 供应商清单导入等接口不会把任意大小的上传读入内存
+    app.config['MAX_CONTENT_LENGTH'] = int(os.getenv('MAX_UPLOAD_MB', 10)) * 1024 * 1024
+    
     # 配置CORS以支持带凭证的跨域请求
     CORS(app, resources={r"/api/*": {
         "origins": "*",  # 允许所有来源，因为我们在开发环境下
         "supports_credentials": True,
         "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-        "allow_headers": ["Content-Type", "Authorization"]
+        "allow_headers": ["Content-Type", "Authorization", "If-None-Match"],
+        "expose_headers": ["ETag", "X-Query-Count"]
     }})
     
+    # 连接池（DB_POOL_SIZE / DB_MAX_OVERFLOW / DB_POOL_TIMEOUT / DB_POOL_RECYCLE /
+    # DB_POOL_PRE_PING / DB_STATEMENT_TIMEOUT）
+    configure_pool(app)
+    
     # 初始化数据库
     init_app(app)
     
+    # 密码哈希（PASSWORD_HASH_METHOD 及成本参数，见 README）
+    init_passwords(app)
+    
+    # 授权版本缓存（AUTH_VERSION_TTL）
+    init_auth(app)
+    
+    # SQL语句计数（SQL_QUERY_COUNT=1 时开启）
+    init_query_counter(app)
+    
+    # 图书缓存（BOOK_CACHE_SIZE / BOOK_CACHE_TTL）
+    init_book_cache(app)
+    
+    # 仪表盘概览快照（DASHBOARD_SNAPSHOT_TTL / DASHBOARD_FULL_REFRESH）
+    init_dashboard_snapshot(app)
+    
+    # 统计接口结果缓存（AGGREGATE_CACHE_TTL / AGGREGATE_CACHE_REDIS_URL）
+    init_aggregate_cache(app)
+    
+    # 月份分区（PARTITION_MONTHS_AHEAD / PARTITION_ARCHIVE_DIR）
+    init_partitions(app)
+    
+    # 报表物化视图后台刷新（REPORT_REFRESH_INTERVAL）
+    init_report_views(app)
+    
+    # 注册命令行工具
+    init_commands(app)
+    
     # 注册蓝图
     app.register_blueprint(user_bp, url_prefix='/api/users')
     app.register_blueprint(book_bp, url_prefix='/api/books')
@@ -52,6 +98,10 @@ def create_app():
     def not_found(error):
         return jsonify({'error': '找不到请求的资源'}), 404
     
+    @app.errorhandler(413)
+    def request_too_large(error):
+        return jsonify({'error': f'请求体超过 {app.config["MAX_CONTENT_LENGTH"] // (1024 * 1024)}MB 上限'}), 413
+    
     @app.errorhandler(500)
     def server_error(error):
         return jsonify({'error': '服务器内部错误'}), 500
@@ -0,0 +1,126 @@
+import os
+import threading
+import time
+from functools import wraps
+from flask import g, jsonify, session
+from backend.models import db, User
+from backend.query_counter import uncounted
+
+ADMIN_ROLE = '超级管理员'
+
+# g 中尚未加载当前用户的标记（与“用户不存在”的 None 区分）
+_MISSING = object()
+
+class AuthVersions:
+    """
+    所有用户当前的授权版本号（user.auth_version），每个进程一份。
+    每隔 ttl 秒用一条查询整体刷新，其余时间鉴权不访问数据库；
+    本进程内修改角色、删除用户后立即更新，其他进程最迟 ttl 秒后生效。
+    """
+
+    def __init__(self, ttl=10):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._versions = None
+        self._loaded_at = 0
+
+    def configure(self, ttl=None):
+        with self._lock:
+            if ttl is not None:
+                self.ttl = ttl
+            self._versions = None
+
+    def get(self, user_id):
+        if self._versions is None or time.monotonic() - self._loaded_at >= self.ttl:
+            with self._lock:
+                # 等待锁期间可能已由其他线程刷新
+                now = time.monotonic()
+                if self._versions is None or now - self._loaded_at >= self.ttl:
+                    # 每个进程每 ttl 秒一次，不计入接口的SQL预算
+                    with uncounted():
+                        self._versions = dict(db.session.query(User.user_id, User.auth_version).all())
+                    self._loaded_at = now
+        return self._versions.get(user_id)
+
+    def set(self, user_id, version):
+        with self._lock:
+            if self._versions is not None:
+                self._versions[user_id] = version
+
+    def remove(self, user_id):
+        with self._lock:
+            if self._versions is not None:
+                self._versions.pop(user_id, None)
+
+auth_versions = AuthVersions()
+
+def issue_claim(user):
+    """登录或授权版本变化后，把用户ID、角色和版本号写入会话（Flask 会话由 SECRET_KEY 签名）"""
+    session['user_id'] = user.user_id
+    session['role'] = user.role
+    session['auth_version'] = user.auth_version
+
+def clear_claim():
+    session.pop('user_id', None)
+    session.pop('role', None)
+    session.pop('auth_version', None)
+
+def current_user():
+    """当前登录的用户，每个请求最多查询一次；未登录或用户已删除时返回 None"""
+    if 'user_id' not in session:
+        return None
+    user = g.get('current_user', _MISSING)
+    if user is _MISSING:
+        user = User.query.get(session['user_id'])
+        g.current_user = user
+    return user
+
+def current_role():
+    return session.get('role')
+
+def _check_claim():
+    """验证会话中的授权声明，通过时返回 None，否则返回错误响应"""
+    if 'user_id' not in session:
+        return jsonify({'error': '请先登录'}), 401
+    if g.get('auth_checked'):
+        return None
+
+    if session.get('auth_version') != auth_versions.get(session['user_id']):
+        # 角色被修改、用户被删除，或者是旧版本的会话：按数据库重新签发
+        user = current_user()
+        if user is None:
+            clear_claim()
+            return jsonify({'error': '登录已失效，请重新登录'}), 401
+        issue_claim(user)
+        auth_versions.set(user.user_id, user.auth_version)
+
+    g.auth_checked = True
+    return None
+
+# 检查用户是否已登录的装饰器
+def login_required(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        error = _check_claim()
+        if error:
+            return error
+        return f(*args, **kwargs)
+    return decorated_function
+
+# 检查是否是超级管理员的装饰器（角色取自会话中的授权声明，不查询数据库）
+def admin_required(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        error = _check_claim()
+        if error:
+            return error
+
+        if current_role() != ADMIN_ROLE:
+            return jsonify({'error': '需要超级管理员权限'}), 403
+
+        return f(*args, **kwargs)
+    return decorated_function
+
+def init_auth(app):
+    app.config.setdefault('AUTH_VERSION_TTL', int(os.getenv('AUTH_VERSION_TTL', 10)))
+    auth_versions.configure(ttl=app.config['AUTH_VERSION_TTL'])
@@ -0,0 +1,134 @@
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from backend.models import Book
+
+# 缓存的图书快照（只读，不是ORM对象，可以跨请求和线程共享）
+# 缓存在每个进程内，本进程的写入提交后立即失效对应条目，但其他工作进程的修改、
+# 删除只能等有效期淘汰，因此所有字段（包括图书是否存在）都可能过期最多 ttl 秒。
+# 快照只用于提示信息和提前拒绝明显无效的请求，库存是否足够、图书是否存在
+# 必须以数据库为准（由 proc_sell_book 等存储过程在数据库内判断）
+BookSnapshot = namedtuple('BookSnapshot', [
+    'book_id', 'isbn', 'title', 'author', 'publisher', 'retail_price', 'stock'
+])
+
+# 可能过期的字段
+STALE_FIELDS = BookSnapshot._fields
+
+class BookCache:
+    """按 book_id 和 isbn 缓存图书的有界 LRU + TTL 缓存"""
+
+    def __init__(self, maxsize=1024, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # book_id -> (过期时间, 快照)
+        self._isbn_index = {}          # isbn -> book_id
+        self._lock = threading.Lock()
+
+    def configure(self, maxsize=None, ttl=None):
+        with self._lock:
+            if maxsize is not None:
+                self.maxsize = maxsize
+            if ttl is not None:
+                self.ttl = ttl
+            self._entries.clear()
+            self._isbn_index.clear()
+
+    def _lookup(self, book_id):
+        # 调用方需持有锁
+        entry = self._entries.get(book_id)
+        if entry is None:
+            return None
+        expires_at, snapshot = entry
+        if expires_at < time.monotonic():
+            self._remove(book_id)
+            return None
+        self._entries.move_to_end(book_id)
+        return snapshot
+
+    def _remove(self, book_id):
+        # 调用方需持有锁
+        entry = self._entries.pop(book_id, None)
+        if entry is not None:
+            self._isbn_index.pop(entry[1].isbn, None)
+
+    def _store(self, book):
+        snapshot = BookSnapshot(
+            book_id=book.book_id,
+            isbn=book.isbn,
+            title=book.title,
+            author=book.author,
+            publisher=book.publisher,
+            retail_price=book.retail_price,
+            stock=book.stock
+        )
+        if self.maxsize <= 0:
+            return snapshot
+        with self._lock:
+            self._remove(book.book_id)
+            self._entries[book.book_id] = (time.monotonic() + self.ttl, snapshot)
+            self._isbn_index[book.isbn] = book.book_id
+            while len(self._entries) > self.maxsize:
+                oldest_id = next(iter(self._entries))
+                self._remove(oldest_id)
+        return snapshot
+
+    def get(self, book_id):
+        """按 book_id 获取图书快照，不存在时返回 None"""
+        with self._lock:
+            snapshot = self._lookup(book_id)
+            if snapshot is not None:
+                self.hits += 1
+                return snapshot
+            self.misses += 1
+
+        book = Book.query.get(book_id)
+        return self._store(book) if book else None
+
+    def get_by_isbn(self, isbn):
+        """按 isbn 获取图书快照，不存在时返回 None"""
+        with self._lock:
+            book_id = self._isbn_index.get(isbn)
+            snapshot = self._lookup(book_id) if book_id is not None else None
+            if snapshot is not None:
+                self.hits += 1
+                return snapshot
+            self.misses += 1
+
+        book = Book.query.filter_by(isbn=isbn).first()
+        return self._store(book) if book else None
+
+    def invalidate(self, *book_ids):
+        """图书信息或库存变化后调用，提交成功后再失效"""
+        with self._lock:
+            for book_id in book_ids:
+                self._remove(book_id)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._isbn_index.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 4) if total else 0,
+                'stale_fields': list(STALE_FIELDS)
+            }
+
+book_cache = BookCache()
+
+def init_book_cache(app):
+    # BOOK_CACHE_SIZE=0 时关闭缓存
+    app.config.setdefault('BOOK_CACHE_SIZE', int(os.getenv('BOOK_CACHE_SIZE', 1024)))
+    app.config.setdefault('BOOK_CACHE_TTL', int(os.getenv('BOOK_CACHE_TTL', 60)))
+    book_cache.configure(maxsize=app.config['BOOK_CACHE_SIZE'], ttl=app.config['BOOK_CACHE_TTL'])
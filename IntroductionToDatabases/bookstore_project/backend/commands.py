@@ -0,0 +1,126 @@
+import click
+from datetime import datetime
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import text
+from backend.models import db
+from backend.static_files import compress_static_files
+from backend.partitions import ensure_partitions, list_partitions, archive_partitions
+from backend.report_views import REPORT_VIEWS, refresh_report_views, report_refresh_status, compact_financial_summary
+
+# 财务日汇总表维护命令：
+#   FLASK_APP=run.py flask finance-summary rebuild
+#   FLASK_APP=run.py flask finance-summary check
+#   FLASK_APP=run.py flask finance-summary compact
+finance_summary_cli = AppGroup('finance-summary', help='财务日汇总表维护')
+
+@finance_summary_cli.command('rebuild')
+def rebuild_finance_summary():
+    """根据财务记录重建日汇总表"""
+    rows = db.session.execute(text("SELECT proc_rebuild_financial_daily_summary()")).scalar()
+    db.session.commit()
+    click.echo(f'财务日汇总已重建，共 {rows} 行')
+
+@finance_summary_cli.command('check')
+def check_finance_summary():
+    """检查日汇总表与财务记录是否一致，不一致时以非零状态退出"""
+    mismatches = db.session.execute(text("SELECT * FROM fn_check_financial_daily_summary()")).fetchall()
+    if not mismatches:
+        click.echo('财务日汇总与财务记录一致')
+        return
+
+    for r in mismatches:
+        click.echo(
+            f'{r.day} {r.type}: 汇总 {r.summary_amount} ({r.summary_count} 笔), '
+            f'实际 {r.actual_amount} ({r.actual_count} 笔)'
+        )
+    raise click.ClickException(f'发现 {len(mismatches)} 处不一致，可执行 finance-summary rebuild 修复')
+
+@finance_summary_cli.command('compact')
+def compact_finance_summary():
+    """把今天以前各天的分桶行合并为每天每种类型一行（后台定时任务每天也会执行）"""
+    merged = compact_financial_summary()
+    click.echo(f'财务日汇总已合并 {merged} 个日期和类型')
+
+# 前端资源预压缩（部署或修改前端文件后执行）：
+#   FLASK_APP=run.py flask static compress
+static_cli = AppGroup('static', help='前端静态资源')
+
+@static_cli.command('compress')
+def compress_static():
+    """为 frontend/ 下的文本资源生成 .gz / .br 预压缩文件"""
+    written = compress_static_files(current_app.config['FRONTEND_DIR'])
+    click.echo(f'已生成 {written} 个预压缩文件')
+
+# 销售记录、财务记录的月份分区维护：
+#   FLASK_APP=run.py flask partitions ensure              # 可加入每日定时任务
+#   FLASK_APP=run.py flask partitions list
+#   FLASK_APP=run.py flask partitions archive --before 2023-01
+partitions_cli = AppGroup('partitions', help='销售记录和财务记录的月份分区')
+
+@partitions_cli.command('ensure')
+@click.option('--months', type=int, default=None, help='预先创建的月数（默认 PARTITION_MONTHS_AHEAD）')
+def ensure_partitions_command(months):
+    """创建本月及之后几个月缺少的分区"""
+    if months is None:
+        months = current_app.config['PARTITION_MONTHS_AHEAD']
+    created = ensure_partitions(months)
+    click.echo(f'新建 {created} 个分区')
+
+@partitions_cli.command('list')
+def list_partitions_command():
+    """列出各分区的范围、估计行数和大小"""
+    for r in list_partitions():
+        click.echo(
+            f'{r.partition_name:<28} {r.partition_bound:<70} '
+            f'{r.estimated_rows:>10} 行 {r.total_bytes / 1024 / 1024:>10.1f} MB'
+        )
+
+@partitions_cli.command('archive')
+@click.option('--before', required=True, help='归档该月份（YYYY-MM）之前的分区')
+@click.option('--dir', 'directory', default=None, help='归档文件目录（默认 PARTITION_ARCHIVE_DIR）')
+@click.option('--keep-table', is_flag=True, help='只从父表分离，不删除分区表')
+def archive_partitions_command(before, directory, keep_table):
+    """把旧的财务记录分区导出为 .csv.gz 文件后从财务记录中分离（销售记录不归档）"""
+    try:
+        before_month = datetime.strptime(before, '%Y-%m').date()
+    except ValueError:
+        raise click.BadParameter('格式应为 YYYY-MM', param_hint='--before')
+
+    directory = directory or current_app.config['PARTITION_ARCHIVE_DIR']
+    try:
+        archived = archive_partitions(before_month, directory, drop=not keep_table)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+
+    for name, rows, path in archived:
+        click.echo(f'{name}: {rows} 行 -> {path}')
+    click.echo(f'已归档 {len(archived)} 个分区')
+
+# 报表物化视图刷新（REPORT_REFRESH_INTERVAL=0 关闭后台刷新时，可用 cron 定时执行）：
+#   FLASK_APP=run.py flask reports refresh
+#   FLASK_APP=run.py flask reports status
+reports_cli = AppGroup('reports', help='报表物化视图')
+
+@reports_cli.command('refresh')
+@click.option('--view', 'views', multiple=True, type=click.Choice(REPORT_VIEWS), help='只刷新指定视图（可重复）')
+def refresh_reports(views):
+    """以 CONCURRENTLY 方式刷新报表物化视图"""
+    refreshed = refresh_report_views(views or REPORT_VIEWS)
+    for view in views or REPORT_VIEWS:
+        if view in refreshed:
+            click.echo(f'{view}: 数据时间点 {refreshed[view]}')
+        else:
+            click.echo(f'{view}: 其他进程正在刷新，已跳过')
+
+@reports_cli.command('status')
+def report_status():
+    """各物化视图的数据时间点和上次刷新耗时"""
+    for r in report_refresh_status():
+        click.echo(f'{r.view_name:<30} {r.refreshed_at}  {r.duration_ms} ms')
+
+def init_commands(app):
+    app.cli.add_command(finance_summary_cli)
+    app.cli.add_command(static_cli)
+    app.cli.add_command(partitions_cli)
+    app.cli.add_command(reports_cli)
@@ -0,0 +1,99 @@
+from sqlalchemy import text
+
+# 成本计算方法：加权平均 / 先进先出
+COST_METHODS = ('average', 'fifo')
+
+# 销售和进货先各自按图书汇总再连接，避免 销售行 × 进货行 的笛卡尔展开，
+# 整个报表与数据量成线性关系。只有已付款进货单的明细计入成本。
+_COMMON_CTES = """
+    sales AS (
+        SELECT
+            book_id,
+            SUM(quantity) AS total_sold,
+            SUM(quantity * sale_price) AS total_revenue
+        FROM sale_record
+        GROUP BY book_id
+    ),
+    purchase_lines AS (
+        SELECT pd.book_id, pd.detail_id, pd.quantity, pd.purchase_price, po.create_time
+        FROM purchase_detail pd
+        JOIN purchase_order po ON po.order_id = pd.order_id
+        WHERE po.status = '已付款' AND pd.book_id IS NOT NULL
+    )
+"""
+
+# 加权平均成本：总进货金额 / 总进货数量
+_AVERAGE_COST_CTE = """
+    cost AS (
+        SELECT
+            c.book_id,
+            c.total_cost / c.purchased AS avg_purchase_price,
+            s.total_sold * c.total_cost / c.purchased AS cost_of_sold
+        FROM (
+            SELECT book_id, SUM(quantity) AS purchased, SUM(quantity * purchase_price) AS total_cost
+            FROM purchase_lines
+            GROUP BY book_id
+            HAVING SUM(quantity) > 0
+        ) c
+        JOIN sales s ON s.book_id = c.book_id
+    )
+"""
+
+# 先进先出成本：按进货单创建时间把进货明细排成成本层，
+# 已售数量依次消耗各层；超出进货总量的部分（如手工录入的初始库存）按最后一层的价格计
+_FIFO_COST_CTE = """
+    layers AS (
+        SELECT
+            book_id,
+            quantity,
+            purchase_price,
+            SUM(quantity) OVER (PARTITION BY book_id ORDER BY create_time, detail_id) AS layer_end
+        FROM purchase_lines
+    ),
+    fifo_cost AS (
+        SELECT
+            l.book_id,
+            MAX(s.total_sold) AS total_sold,
+            SUM(GREATEST(LEAST(l.quantity, s.total_sold - (l.layer_end - l.quantity)), 0) * l.purchase_price)
+                + GREATEST(MAX(s.total_sold) - MAX(l.layer_end), 0)
+                  * (ARRAY_AGG(l.purchase_price ORDER BY l.layer_end DESC))[1] AS cost_of_sold
+        FROM layers l
+        JOIN sales s ON s.book_id = l.book_id
+        GROUP BY l.book_id
+    ),
+    cost AS (
+        SELECT
+            book_id,
+            cost_of_sold / NULLIF(total_sold, 0) AS avg_purchase_price,
+            cost_of_sold
+        FROM fifo_cost
+    )
+"""
+
+_REPORT_SELECT = """
+    SELECT
+        b.book_id,
+        b.isbn,
+        b.title,
+        s.total_sold,
+        s.total_revenue,
+        c.avg_purchase_price,
+        s.total_revenue / NULLIF(s.total_sold, 0) AS avg_sale_price,
+        s.total_revenue / NULLIF(s.total_sold, 0) - c.avg_purchase_price AS avg_profit_per_book,
+        s.total_revenue - c.cost_of_sold AS total_profit
+    FROM sales s
+    JOIN book b ON b.book_id = s.book_id
+    LEFT JOIN cost c ON c.book_id = s.book_id
+    ORDER BY total_profit DESC NULLS LAST, b.book_id
+"""
+
+SALES_PROFIT_SQL = {
+    'average': text('WITH' + _COMMON_CTES + ',' + _AVERAGE_COST_CTE + _REPORT_SELECT),
+    'fifo': text('WITH' + _COMMON_CTES + ',' + _FIFO_COST_CTE + _REPORT_SELECT)
+}
+
+def sales_profit_sql(method='average'):
+    """返回指定成本计算方法的销售利润报表SQL，列顺序与原报表一致"""
+    if method not in COST_METHODS:
+        raise ValueError(f'不支持的成本计算方法: {method}')
+    return SALES_PROFIT_SQL[method]
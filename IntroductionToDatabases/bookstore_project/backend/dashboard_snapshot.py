@@ -0,0 +1,163 @@
+import os
+import threading
+import time
+from datetime import datetime
+from decimal import Decimal
+from sqlalchemy import text
+from backend.models import db
+from backend.book_cache import book_cache
+
+# 一条语句取回概览所需的全部数据：
+# 库存汇总和本月销售每次重新计算（分别只与图书数、本月销售量有关），
+# 收支总额读取财务日汇总表（与天数有关），
+# 销量排行只读取上次刷新之后新增的销售记录（按主键水位线）
+OVERVIEW_SQL = text("""
+    WITH inventory AS (
+        SELECT
+            COUNT(*) AS total_books,
+            COALESCE(SUM(stock), 0) AS total_stock,
+            COUNT(*) FILTER (WHERE stock < 10) AS low_stock_books
+        FROM book
+    ),
+    monthly_sales AS (
+        SELECT
+            COUNT(*) AS sales_count,
+            COALESCE(SUM(quantity * sale_price), 0) AS sales_amount
+        FROM sale_record
+        WHERE sale_time >= :month_start
+    ),
+    new_sales AS (
+        SELECT book_id, SUM(quantity) AS total_sold, MAX(sale_id) AS max_id
+        FROM sale_record
+        WHERE sale_id > :last_sale_id
+        GROUP BY book_id
+    ),
+    finance_totals AS (
+        SELECT type, SUM(total_amount) AS amount
+        FROM financial_daily_summary
+        GROUP BY type
+    )
+    SELECT
+        inventory.total_books,
+        inventory.total_stock,
+        inventory.low_stock_books,
+        monthly_sales.sales_count,
+        monthly_sales.sales_amount,
+        (SELECT COALESCE(json_agg(json_build_array(book_id, total_sold)), '[]') FROM new_sales) AS sale_deltas,
+        (SELECT MAX(max_id) FROM new_sales) AS max_sale_id,
+        (SELECT COALESCE(json_agg(json_build_array(type, amount::text)), '[]') FROM finance_totals) AS finance_totals
+    FROM inventory, monthly_sales
+""")
+
+class DashboardSnapshot:
+    """
+    仪表盘概览的共享快照。所有请求共用同一份结果，过期后由一个线程刷新，
+    其余线程等待刷新完成后直接使用新结果。
+
+    销售记录只追加不修改，销量排行按主键水位线增量累加，
+    刷新代价与新增记录数有关，与历史总量无关。并发事务提交顺序可能与主键顺序不一致，
+    水位线可能跳过个别晚提交的记录，因此每隔 full_refresh_interval 秒做一次全量重建。
+    """
+
+    def __init__(self, ttl=5, full_refresh_interval=600):
+        self.ttl = ttl
+        self.full_refresh_interval = full_refresh_interval
+        self._lock = threading.Lock()
+        self._overview = None
+        self._refreshed_at = 0
+        self._rebuilt_at = None
+        self._book_sold = {}
+        self._last_sale_id = 0
+
+    def configure(self, ttl=None, full_refresh_interval=None):
+        with self._lock:
+            if ttl is not None:
+                self.ttl = ttl
+            if full_refresh_interval is not None:
+                self.full_refresh_interval = full_refresh_interval
+            self._overview = None
+            self._rebuilt_at = None
+
+    def get_overview(self):
+        if self._overview is not None and time.monotonic() - self._refreshed_at < self.ttl:
+            return self._overview
+
+        with self._lock:
+            # 等待锁期间可能已由其他线程刷新
+            now = time.monotonic()
+            if self._overview is None or now - self._refreshed_at >= self.ttl:
+                self._refresh(now)
+            return self._overview
+
+    def _refresh(self, now):
+        full = self._rebuilt_at is None or now - self._rebuilt_at >= self.full_refresh_interval
+        if full:
+            book_sold, last_sale_id = {}, 0
+        else:
+            book_sold, last_sale_id = self._book_sold, self._last_sale_id
+
+        current_month_start = datetime(datetime.now().year, datetime.now().month, 1)
+        row = db.session.execute(OVERVIEW_SQL, {
+            'month_start': current_month_start,
+            'last_sale_id': last_sale_id
+        }).fetchone()
+
+        for book_id, total_sold in row.sale_deltas:
+            book_sold[book_id] = book_sold.get(book_id, 0) + total_sold
+        finance_totals = {record_type: Decimal(amount) for record_type, amount in row.finance_totals}
+
+        self._book_sold = book_sold
+        self._last_sale_id = row.max_sale_id or last_sale_id
+        if full:
+            self._rebuilt_at = now
+
+        total_income = finance_totals.get('收入', Decimal(0))
+        total_expense = finance_totals.get('支出', Decimal(0))
+
+        self._overview = {
+            'inventory_summary': {
+                'total_books': row.total_books,
+                'total_stock': int(row.total_stock),
+                'low_stock_books': row.low_stock_books
+            },
+            'sales_summary': {
+                'monthly_sales_count': row.sales_count,
+                'monthly_sales_amount': float(row.sales_amount)
+            },
+            'finance_summary': {
+                'total_income': float(total_income),
+                'total_expense': float(total_expense),
+                'total_profit': float(total_income) - float(total_expense)
+            },
+            'top_selling_books': self._top_selling_books(5),
+            'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        }
+        self._refreshed_at = now
+
+    def _top_selling_books(self, limit):
+        ranking = sorted(self._book_sold.items(), key=lambda item: (-item[1], item[0]))
+        top_books = []
+        for book_id, total_sold in ranking:
+            # 书名等信息取自图书缓存
+            book = book_cache.get(book_id)
+            if book is None:
+                continue
+            top_books.append({
+                'book_id': book.book_id,
+                'isbn': book.isbn,
+                'title': book.title,
+                'total_sold': total_sold
+            })
+            if len(top_books) >= limit:
+                break
+        return top_books
+
+dashboard_snapshot = DashboardSnapshot()
+
+def init_dashboard_snapshot(app):
+    app.config.setdefault('DASHBOARD_SNAPSHOT_TTL', int(os.getenv('DASHBOARD_SNAPSHOT_TTL', 5)))
+    app.config.setdefault('DASHBOARD_FULL_REFRESH', int(os.getenv('DASHBOARD_FULL_REFRESH', 600)))
+    dashboard_snapshot.configure(
+        ttl=app.config['DASHBOARD_SNAPSHOT_TTL'],
+        full_refresh_interval=app.config['DASHBOARD_FULL_REFRESH']
+    )
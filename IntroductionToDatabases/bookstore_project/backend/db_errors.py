@@ -0,0 +1,48 @@
+import random
+import time
+from sqlalchemy.exc import DBAPIError
+from backend.models import db
+
+# 存储过程中 RAISE EXCEPTION 抛出的业务错误（如订单状态不对）
+RAISE_EXCEPTION_SQLSTATE = 'P0001'
+
+# 库存不足（proc_sell_book / proc_sell_books 抛出），属于资源冲突
+INSUFFICIENT_STOCK_SQLSTATE = 'BK001'
+
+# 可以原样重试的错误：序列化失败、死锁、等待锁超时
+TRANSIENT_SQLSTATES = ('40001', '40P01', '55P03')
+
+def _pgcode(error):
+    if not isinstance(error, DBAPIError):
+        return None
+    return getattr(error.orig, 'pgcode', None)
+
+def procedure_error_message(error):
+    """如果是存储过程抛出的业务错误，返回其中的提示信息，否则返回 None"""
+    if _pgcode(error) not in (RAISE_EXCEPTION_SQLSTATE, INSUFFICIENT_STOCK_SQLSTATE):
+        return None
+    return error.orig.diag.message_primary
+
+def is_stock_conflict(error):
+    return _pgcode(error) == INSUFFICIENT_STOCK_SQLSTATE
+
+def is_transient_error(error):
+    return _pgcode(error) in TRANSIENT_SQLSTATES
+
+def run_in_transaction(work, attempts=3, backoff=0.05):
+    """
+    执行 work() 并提交，返回 work() 的结果。
+    遇到死锁、序列化失败、锁等待超时时回滚并以指数退避（带随机抖动）重试，
+    最多执行 attempts 次；其他错误回滚后直接抛出。
+    """
+    for attempt in range(1, attempts + 1):
+        try:
+            result = work()
+            db.session.commit()
+            return result
+        except Exception as e:
+            db.session.rollback()
+            if attempt < attempts and is_transient_error(e):
+                time.sleep(backoff * (2 ** (attempt - 1)) * random.uniform(0.5, 1.5))
+                continue
+            raise
@@ -0,0 +1,143 @@
+import os
+import threading
+import time
+from collections import deque
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool
+
+# 最近多少次取连接的等待时间用于计算分位数
+WAIT_SAMPLES = 1000
+
+def _env_int(name, default):
+    return int(os.getenv(name, default))
+
+def _env_flag(name, default):
+    return os.getenv(name, default).lower() in ('1', 'true', 'yes', 'on')
+
+class PoolMetrics:
+    """连接池的累计指标，所有线程共享"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.connects = 0
+            self.invalidations = 0
+            self.overflow_connections = 0
+            self.timeouts = 0
+            self.wait_total = 0.0
+            self.wait_max = 0.0
+            self._waits = deque(maxlen=WAIT_SAMPLES)
+
+    def record_wait(self, seconds, overflowed):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            self._waits.append(seconds)
+            if overflowed:
+                self.overflow_connections += 1
+
+    def record_timeout(self, seconds):
+        with self._lock:
+            self.timeouts += 1
+            self.wait_max = max(self.wait_max, seconds)
+
+    def record_connect(self):
+        with self._lock:
+            self.connects += 1
+
+    def record_invalidation(self):
+        with self._lock:
+            self.invalidations += 1
+
+    def snapshot(self):
+        with self._lock:
+            waits = sorted(self._waits)
+            p95 = waits[int(len(waits) * 0.95)] if waits else 0.0
+            return {
+                'checkouts': self.checkouts,
+                'connects': self.connects,
+                'invalidations': self.invalidations,
+                'overflow_connections': self.overflow_connections,
+                'timeouts': self.timeouts,
+                'wait_ms': {
+                    'avg': round(self.wait_total / self.checkouts * 1000, 3) if self.checkouts else 0,
+                    'p95': round(p95 * 1000, 3),
+                    'max': round(self.wait_max * 1000, 3)
+                }
+            }
+
+pool_metrics = PoolMetrics()
+
+class InstrumentedQueuePool(QueuePool):
+    """记录取连接等待时间和溢出连接的 QueuePool"""
+
+    def _do_get(self):
+        overflow_before = self._overflow
+        started = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            pool_metrics.record_timeout(time.perf_counter() - started)
+            raise
+        pool_metrics.record_wait(time.perf_counter() - started, self._overflow > overflow_before and self._overflow > 0)
+        return conn
+
+# 新建连接和失效连接（pre-ping 失败、连接断开）
+@event.listens_for(InstrumentedQueuePool, 'connect')
+def _on_connect(dbapi_connection, connection_record):
+    pool_metrics.record_connect()
+
+@event.listens_for(InstrumentedQueuePool, 'invalidate')
+def _on_invalidate(dbapi_connection, connection_record, exception):
+    pool_metrics.record_invalidation()
+
+def engine_options():
+    """
+    从环境变量生成 create_engine 的连接池参数：
+    DB_POOL_SIZE、DB_MAX_OVERFLOW、DB_POOL_TIMEOUT（秒）、DB_POOL_RECYCLE（秒）、
+    DB_POOL_PRE_PING、DB_STATEMENT_TIMEOUT（毫秒，0 表示不限制）
+    """
+    options = {
+        'poolclass': InstrumentedQueuePool,
+        'pool_size': _env_int('DB_POOL_SIZE', 5),
+        'max_overflow': _env_int('DB_MAX_OVERFLOW', 10),
+        'pool_timeout': _env_int('DB_POOL_TIMEOUT', 30),
+        'pool_recycle': _env_int('DB_POOL_RECYCLE', 1800),
+        # 取出连接前先 ping 一次，数据库重启后不会把失效连接交给请求
+        'pool_pre_ping': _env_flag('DB_POOL_PRE_PING', '1')
+    }
+    statement_timeout = _env_int('DB_STATEMENT_TIMEOUT', 0)
+    if statement_timeout > 0:
+        options['connect_args'] = {'options': f'-c statement_timeout={statement_timeout}'}
+    return options
+
+def configure_pool(app):
+    """在 init_app 之前调用，设置 SQLALCHEMY_ENGINE_OPTIONS"""
+    options = engine_options()
+    options.update(app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+def pool_status(engine):
+    """当前连接池状态和累计指标"""
+    pool = engine.pool
+    status = {
+        'pool_class': type(pool).__name__,
+        'metrics': pool_metrics.snapshot()
+    }
+    if isinstance(pool, QueuePool):
+        status.update({
+            'size': pool.size(),
+            'checked_in': pool.checkedin(),
+            'checked_out': pool.checkedout(),
+            'overflow': max(pool.overflow(), 0),
+            'max_overflow': pool._max_overflow,
+            'timeout': pool.timeout(),
+            'recycle': pool._recycle,
+            'pre_ping': pool._pre_ping
+        })
+    return status
@@ -0,0 +1,76 @@
+import hashlib
+from functools import wraps
+from flask import current_app, g, request, make_response
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from backend.models import db
+from backend.report_views import REPORT_VIEWS
+
+# 有版本号的表（db/create_functions.sql 中的 data_version 表，与数据在同一事务中提交）；
+# 报表物化视图的数据只在刷新时变化，以 report_refresh 中的刷新时间作为版本号
+VERSIONED_TABLES = ('book', 'sale_record', 'user', 'purchase_order') + REPORT_VIEWS
+
+def _version_column(table):
+    if table in REPORT_VIEWS:
+        return f"(SELECT refreshed_at FROM report_refresh WHERE view_name = '{table}')"
+    return f"(SELECT version FROM data_version WHERE table_name = '{table}')"
+
+def table_versions(tables):
+    """一条查询读取各表的数据版本号；版本号表不存在（未执行迁移）时返回 None"""
+    columns = ', '.join(_version_column(table) for table in tables)
+    try:
+        return tuple(db.session.execute(text(f'SELECT {columns}')).fetchone())
+    except DBAPIError:
+        db.session.rollback()
+        current_app.logger.warning('读取数据版本号失败，请按顺序执行 db/migrations/ 下的迁移脚本')
+        return None
+
+def conditional(*tables):
+    """
+    根据所依赖表的版本号生成 ETag，放在 login_required 之下：
+
+        @book_bp.route('/low-stock')
+        @login_required
+        @conditional('book')
+        def get_low_stock_books(): ...
+
+    请求带有相同的 If-None-Match 时直接返回304，不执行接口中的查询。
+    ETag 包含完整的查询字符串，不同筛选条件互不影响。
+
+    版本号与接口中的查询在同一个 REPEATABLE READ 事务中读取，看到的是同一个快照，
+    响应内容与 ETag 始终对应。读到的版本号保存在 g.data_versions 中，
+    cached_aggregate 以它作为缓存键的一部分。
+    """
+    for table in tables:
+        if table not in VERSIONED_TABLES:
+            raise ValueError(f'表 {table} 没有数据版本号')
+
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            # 登录检查刷新用户版本号缓存时事务已经开始，无法再设置隔离级别；
+            # 这时版本号先于数据读取（READ COMMITTED），数据只会比版本号新，
+            # 旧内容不会带上新 ETag，下次请求的 ETag 不同会重新获取
+            if not db.session().in_transaction():
+                db.session.connection(execution_options={'isolation_level': 'REPEATABLE READ'})
+            versions = table_versions(tables)
+            if versions is None:
+                return f(*args, **kwargs)
+            g.data_versions = versions
+
+            signature = f'{request.endpoint}|{request.query_string.decode()}|{versions}'
+            etag = hashlib.sha1(signature.encode()).hexdigest()[:20]
+
+            if request.if_none_match.contains(etag):
+                response = make_response('', 304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag)
+            # 浏览器可以缓存，但每次使用前都要带 If-None-Match 确认
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return decorated_function
+    return decorator
@@ -1,6 +1,7 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.orm import joinedload, selectinload
 from datetime import datetime
-import hashlib
+from backend.passwords import password_hasher
 
 # 初始化SQLAlchemy
 db = SQLAlchemy()
@@ -15,20 +16,22 @@ class User(db.Model):
     __tablename__ = 'user'
     user_id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(50), unique=True, nullable=False)
-    password = db.Column(db.String(32), nullable=False)
+    password = db.Column(db.String(255), nullable=False)
     real_name = db.Column(db.String(100), nullable=False)
     employee_id = db.Column(db.String(20), nullable=False)
     gender = db.Column(db.String(2), nullable=False)
     age = db.Column(db.Integer)
     role = db.Column(db.String(10), nullable=False)
+    # 角色变化时加一，使已登录会话中的授权声明失效
+    auth_version = db.Column(db.Integer, nullable=False, default=1)
     created_at = db.Column(db.DateTime, default=datetime.now)
 
     @staticmethod
     def hash_password(password):
-        return hashlib.md5(password.encode()).hexdigest()
+        return password_hasher.hash(password)
 
     def check_password(self, password):
-        return self.password == hashlib.md5(password.encode()).hexdigest()
+        return password_hasher.verify(self.password, password)
 
     def to_dict(self):
         return {
@@ -82,6 +85,14 @@ class PurchaseOrder(db.Model):
     creator = db.relationship('User', backref='purchase_orders')
     details = db.relationship('PurchaseDetail', backref='order', cascade='all, delete-orphan')
 
+    @staticmethod
+    def load_options():
+        # to_dict 会访问的关联：创建人、明细及明细对应的图书，共3条查询加载完
+        return [
+            joinedload(PurchaseOrder.creator),
+            selectinload(PurchaseOrder.details).selectinload(PurchaseDetail.book)
+        ]
+
     def to_dict(self):
         return {
             'order_id': self.order_id,
@@ -140,6 +151,11 @@ class SaleRecord(db.Model):
     book = db.relationship('Book', backref='sale_records')
     seller = db.relationship('User', backref='sales')
 
+    @staticmethod
+    def load_options():
+        # to_dict 会访问的关联：图书和售货员，与销售记录在同一条查询中加载
+        return [joinedload(SaleRecord.book), joinedload(SaleRecord.seller)]
+
     def to_dict(self):
         return {
             'sale_id': self.sale_id,
@@ -169,6 +185,11 @@ class FinancialRecord(db.Model):
     # 关系
     operator = db.relationship('User', backref='financial_records')
 
+    @staticmethod
+    def load_options():
+        # to_dict 会访问的关联：操作人
+        return [joinedload(FinancialRecord.operator)]
+
     def to_dict(self):
         return {
             'record_id': self.record_id,
@@ -180,4 +201,13 @@ class FinancialRecord(db.Model):
             'operator_id': self.operator_id,
             'operator_name': self.operator.username if self.operator else None,
             'description': self.description
-        }
\ No newline at end of file
+        }
+
+# 财务日汇总模型（由数据库触发器维护，应用只读）
+class FinancialDailySummary(db.Model):
+    __tablename__ = 'financial_daily_summary'
+    day = db.Column(db.Date, primary_key=True)
+    type = db.Column(db.String(10), primary_key=True)  # 收入/支出
+    bucket = db.Column(db.SmallInteger, primary_key=True, default=0)  # 每天每种类型分多行，读取时合计
+    total_amount = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    record_count = db.Column(db.Integer, nullable=False, default=0)
@@ -0,0 +1,99 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from flask import request
+from sqlalchemy import tuple_, DateTime, Integer, Numeric, String
+
+# 单页最大条数
+MAX_PAGE_SIZE = 500
+
+class PaginationError(ValueError):
+    """分页参数或游标无效"""
+    pass
+
+def encode_cursor(values):
+    # 游标对客户端不透明：排序键的值序列化为JSON后做base64编码
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor, columns):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        payload = json.loads(raw)
+    except (binascii.Error, ValueError):
+        raise PaginationError('无效的分页游标')
+
+    if not isinstance(payload, list) or len(payload) != len(columns):
+        raise PaginationError('无效的分页游标')
+
+    # 游标来自客户端，按列类型逐个校验，类型不符的值不能传给数据库（会变成500）
+    values = []
+    for column, value in zip(columns, payload):
+        if isinstance(column.type, DateTime):
+            try:
+                value = datetime.fromisoformat(value)
+            except (TypeError, ValueError):
+                raise PaginationError('无效的分页游标')
+        elif isinstance(column.type, Integer):
+            if not isinstance(value, int) or isinstance(value, bool):
+                raise PaginationError('无效的分页游标')
+        elif isinstance(column.type, Numeric):
+            if not isinstance(value, (int, float)) or isinstance(value, bool):
+                raise PaginationError('无效的分页游标')
+        elif isinstance(column.type, String):
+            if not isinstance(value, str):
+                raise PaginationError('无效的分页游标')
+        else:
+            raise PaginationError('该排序列不支持游标分页')
+        values.append(value)
+    return values
+
+def get_page_args():
+    """读取 limit / cursor 查询参数，未传 limit 时返回 (None, None) 表示不分页"""
+    limit = request.args.get('limit')
+    cursor = request.args.get('cursor')
+
+    if limit is None:
+        if cursor:
+            raise PaginationError('使用游标分页时必须指定limit')
+        return None, None
+
+    try:
+        limit = int(limit)
+    except ValueError:
+        raise PaginationError('limit必须是整数')
+    if limit <= 0 or limit > MAX_PAGE_SIZE:
+        raise PaginationError(f'limit必须在1到{MAX_PAGE_SIZE}之间')
+
+    return limit, cursor or None
+
+def keyset_paginate(query, sort_columns, limit, cursor=None, descending=True):
+    """
+    按 sort_columns 做键集（游标）分页，最后一列应为主键以保证顺序唯一。
+    使用行值比较 (col1, col2) < (v1, v2)，配合同序的复合索引，
+    任何一页的代价都与第一页相同。
+    limit 为 None 时不分页，按同样的顺序返回全部记录。
+    返回 (当前页记录, 下一页游标)，没有下一页时游标为 None。
+    """
+    if cursor:
+        values = decode_cursor(cursor, sort_columns)
+        key = tuple_(*sort_columns)
+        boundary = tuple_(*values)
+        query = query.filter(key < boundary if descending else key > boundary)
+
+    order = [c.desc() if descending else c.asc() for c in sort_columns]
+    if limit is None:
+        return query.order_by(*order).all(), None
+
+    # 多取一条用于判断是否还有下一页
+    items = query.order_by(*order).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        last = items[-1]
+        next_cursor = encode_cursor([getattr(last, c.key) for c in sort_columns])
+
+    return items, next_cursor
@@ -0,0 +1,107 @@
+import gzip
+import os
+import re
+from datetime import date
+from flask import current_app
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from backend.models import db
+
+# 按月分区的表（db/init_database.sql），月份分区名为 表名_pYYYYMM
+PARTITIONED_TABLES = ('sale_record', 'financial_record')
+PARTITION_NAME_PATTERN = re.compile(r'^(sale_record|financial_record)_p(\d{4})(\d{2})$')
+
+# 可以归档的表。销售记录不归档：销售统计、业绩排行和先进先出成本（cost_basis.py）
+# 都按全部历史销售计算，进货记录不归档时，归档旧销售会使剩余的销售重新消耗最早的进货批次
+ARCHIVABLE_TABLES = ('financial_record',)
+
+# 记录归档截止月份（与分离分区在同一事务中），财务日汇总的检查和重建跳过该月份之前的日期
+ARCHIVE_CUTOFF_SQL = """
+    INSERT INTO partition_archive (table_name, archived_before) VALUES (%s, %s)
+    ON CONFLICT (table_name) DO UPDATE
+    SET archived_before = GREATEST(partition_archive.archived_before, EXCLUDED.archived_before)
+"""
+
+def ensure_partitions(months_ahead):
+    """创建本月及之后 months_ahead 个月缺少的分区，返回新建的分区数"""
+    created = db.session.execute(
+        text('SELECT proc_ensure_partitions(:months)'), {'months': months_ahead}
+    ).scalar()
+    db.session.commit()
+    return created
+
+def list_partitions():
+    return db.session.execute(text('SELECT * FROM view_partitions')).fetchall()
+
+def partition_month(name):
+    """分区名对应的月份（date，当月1日）；默认分区返回 None"""
+    match = PARTITION_NAME_PATTERN.match(name)
+    if match is None:
+        return None
+    return date(int(match.group(2)), int(match.group(3)), 1)
+
+def archive_partitions(before, directory, drop=True):
+    """
+    把 before 所在月份之前的财务记录月份分区导出为 gzip 压缩的 CSV（带表头），再从父表分离
+    （销售记录不归档，见 ARCHIVABLE_TABLES）。
+
+    先导出再分离：文件完整写入后才在同一事务中分离（drop 为真时同时删除）分区并记录归档截止月份，
+    中途失败时分区仍在父表中，可以重新执行。分离不会触发行级触发器，
+    财务日汇总中已归档月份的金额保留不变。返回 [(分区名, 行数, 文件路径)]。
+    """
+    before = before.replace(day=1)
+    if before > date.today().replace(day=1):
+        raise ValueError('只能归档本月之前的分区')
+
+    targets = [
+        (r.parent_table, r.partition_name) for r in list_partitions()
+        if r.parent_table in ARCHIVABLE_TABLES
+        and partition_month(r.partition_name) is not None and partition_month(r.partition_name) < before
+    ]
+    db.session.commit()
+    os.makedirs(directory, exist_ok=True)
+
+    archived = []
+    for parent, name in targets:
+        path = os.path.join(directory, f'{name}.csv.gz')
+        partial = path + '.partial'
+        raw = db.engine.raw_connection()
+        try:
+            cursor = raw.cursor()
+            with gzip.open(partial, 'wb') as f:
+                cursor.copy_expert(f'COPY "{name}" TO STDOUT WITH (FORMAT csv, HEADER)', f)
+            rows = cursor.rowcount
+            os.replace(partial, path)
+
+            cursor.execute(f'ALTER TABLE "{parent}" DETACH PARTITION "{name}"')
+            month = partition_month(name)
+            next_month = date(month.year + month.month // 12, month.month % 12 + 1, 1)
+            cursor.execute(ARCHIVE_CUTOFF_SQL, (parent, next_month))
+            if drop:
+                cursor.execute(f'DROP TABLE "{name}"')
+            raw.commit()
+        except Exception:
+            raw.rollback()
+            if os.path.exists(partial):
+                os.remove(partial)
+            raise
+        finally:
+            raw.close()
+        archived.append((name, rows, path))
+    return archived
+
+def init_partitions(app):
+    app.config.setdefault('PARTITION_MONTHS_AHEAD', int(os.getenv('PARTITION_MONTHS_AHEAD', 3)))
+    app.config.setdefault('PARTITION_ARCHIVE_DIR', os.getenv('PARTITION_ARCHIVE_DIR', 'archive'))
+
+    @app.before_first_request
+    def create_future_partitions():
+        # 每个工作进程启动后执行一次，数据库函数内部用咨询锁串行化
+        try:
+            created = ensure_partitions(app.config['PARTITION_MONTHS_AHEAD'])
+        except DBAPIError:
+            db.session.rollback()
+            current_app.logger.warning('创建月份分区失败，请执行 db/migrations/012_monthly_partitions.sql')
+            return
+        if created:
+            current_app.logger.info(f'已创建 {created} 个月份分区')
@@ -0,0 +1,135 @@
+import base64
+import hashlib
+import hmac
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# 哈希格式：
+#   scrypt$<n>$<r>$<p>$<salt>$<hash>
+#   pbkdf2_sha256$<iterations>$<salt>$<hash>
+# salt 和 hash 为 base64；旧数据是32位十六进制的无盐 MD5，登录成功后自动升级
+HASH_METHODS = ('scrypt', 'pbkdf2_sha256')
+LEGACY_MD5_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+SALT_BYTES = 16
+HASH_BYTES = 32
+
+def _b64(data):
+    return base64.b64encode(data).decode('ascii')
+
+class PasswordHasher:
+    """
+    可调成本的密码哈希。计算在独立的线程池中进行，最多 concurrency 个同时计算，
+    登录高峰时多余的请求排队等待，不会占满全部CPU拖慢其他接口；
+    hashlib 计算期间释放 GIL，同一进程内的其他请求线程照常运行。
+    """
+
+    def __init__(self, method='scrypt', scrypt_n=2 ** 14, scrypt_r=8, scrypt_p=1,
+                 pbkdf2_iterations=600000, concurrency=2):
+        self._lock = threading.Lock()
+        self._executor = None
+        self.configure(method, scrypt_n, scrypt_r, scrypt_p, pbkdf2_iterations, concurrency)
+
+    def configure(self, method=None, scrypt_n=None, scrypt_r=None, scrypt_p=None,
+                  pbkdf2_iterations=None, concurrency=None):
+        if method is not None:
+            if method not in HASH_METHODS:
+                raise ValueError(f'不支持的密码哈希方法: {method}')
+            self.method = method
+        if scrypt_n is not None:
+            self.scrypt_n = scrypt_n
+        if scrypt_r is not None:
+            self.scrypt_r = scrypt_r
+        if scrypt_p is not None:
+            self.scrypt_p = scrypt_p
+        if pbkdf2_iterations is not None:
+            self.pbkdf2_iterations = pbkdf2_iterations
+        if concurrency is not None:
+            with self._lock:
+                self.concurrency = concurrency
+                # 线程池在第一次使用时创建（gunicorn 的工作进程 fork 之后）
+                if self._executor is not None:
+                    self._executor.shutdown(wait=False)
+                self._executor = None
+
+    def _submit(self, fn, *args):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.concurrency,
+                                                    thread_name_prefix='password-hash')
+            executor = self._executor
+        return executor.submit(fn, *args).result()
+
+    def _scrypt(self, password, salt, n, r, p):
+        # maxmem 按参数计算，避免较大的 n 超出 OpenSSL 默认的32MB上限
+        return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p,
+                              maxmem=128 * n * r * (p + 1) + 1024 * 1024, dklen=HASH_BYTES)
+
+    def _pbkdf2(self, password, salt, iterations):
+        return hashlib.pbkdf2_hmac('sha256', password.encode(), salt, iterations, dklen=HASH_BYTES)
+
+    def _hash(self, password):
+        salt = os.urandom(SALT_BYTES)
+        if self.method == 'scrypt':
+            n, r, p = self.scrypt_n, self.scrypt_r, self.scrypt_p
+            return f'scrypt${n}${r}${p}${_b64(salt)}${_b64(self._scrypt(password, salt, n, r, p))}'
+        iterations = self.pbkdf2_iterations
+        return f'pbkdf2_sha256${iterations}${_b64(salt)}${_b64(self._pbkdf2(password, salt, iterations))}'
+
+    def _verify(self, stored, password):
+        if LEGACY_MD5_PATTERN.match(stored):
+            return hmac.compare_digest(stored, hashlib.md5(password.encode()).hexdigest())
+
+        parts = stored.split('$')
+        try:
+            if parts[0] == 'scrypt' and len(parts) == 6:
+                n, r, p = int(parts[1]), int(parts[2]), int(parts[3])
+                salt, expected = base64.b64decode(parts[4]), base64.b64decode(parts[5])
+                actual = self._scrypt(password, salt, n, r, p)
+            elif parts[0] == 'pbkdf2_sha256' and len(parts) == 4:
+                salt, expected = base64.b64decode(parts[2]), base64.b64decode(parts[3])
+                actual = self._pbkdf2(password, salt, int(parts[1]))
+            else:
+                return False
+        except ValueError:
+            return False
+        return hmac.compare_digest(actual, expected)
+
+    def hash(self, password):
+        """用当前配置计算密码哈希"""
+        return self._submit(self._hash, password)
+
+    def verify(self, stored, password):
+        """校验密码，stored 为 None 时也执行一次同等代价的计算，避免通过响应时间判断用户名是否存在"""
+        if stored is None:
+            self._submit(self._hash, password)
+            return False
+        return self._submit(self._verify, stored, password)
+
+    def needs_rehash(self, stored):
+        """旧的 MD5 哈希，或者方法、成本参数与当前配置不同"""
+        if self.method == 'scrypt':
+            current = f'scrypt${self.scrypt_n}${self.scrypt_r}${self.scrypt_p}$'
+        else:
+            current = f'pbkdf2_sha256${self.pbkdf2_iterations}$'
+        return not stored.startswith(current)
+
+password_hasher = PasswordHasher()
+
+def init_passwords(app):
+    app.config.setdefault('PASSWORD_HASH_METHOD', os.getenv('PASSWORD_HASH_METHOD', 'scrypt'))
+    app.config.setdefault('PASSWORD_SCRYPT_N', int(os.getenv('PASSWORD_SCRYPT_N', 2 ** 14)))
+    app.config.setdefault('PASSWORD_SCRYPT_R', int(os.getenv('PASSWORD_SCRYPT_R', 8)))
+    app.config.setdefault('PASSWORD_SCRYPT_P', int(os.getenv('PASSWORD_SCRYPT_P', 1)))
+    app.config.setdefault('PASSWORD_PBKDF2_ITERATIONS', int(os.getenv('PASSWORD_PBKDF2_ITERATIONS', 600000)))
+    app.config.setdefault('PASSWORD_HASH_CONCURRENCY', int(os.getenv('PASSWORD_HASH_CONCURRENCY', 2)))
+    password_hasher.configure(
+        method=app.config['PASSWORD_HASH_METHOD'],
+        scrypt_n=app.config['PASSWORD_SCRYPT_N'],
+        scrypt_r=app.config['PASSWORD_SCRYPT_R'],
+        scrypt_p=app.config['PASSWORD_SCRYPT_P'],
+        pbkdf2_iterations=app.config['PASSWORD_PBKDF2_ITERATIONS'],
+        concurrency=app.config['PASSWORD_HASH_CONCURRENCY']
+    )
@@ -0,0 +1,214 @@
+import csv
+import io
+import json
+import math
+from sqlalchemy import bindparam
+from backend.models import db, Book, PurchaseDetail
+
+# 新书明细必须提供的图书信息
+NEW_BOOK_FIELDS = ['isbn', 'title', 'author', 'publisher']
+
+# 明细中可修改的字段，用于比较新旧明细是否有变化
+DETAIL_FIELDS = ['book_id', 'isbn', 'title', 'author', 'publisher', 'quantity', 'purchase_price', 'is_new_book']
+
+# 供应商清单（CSV）支持的列
+MANIFEST_COLUMNS = ['book_id', 'isbn', 'title', 'author', 'publisher', 'quantity', 'purchase_price']
+
+class DetailError(Exception):
+    """进货明细验证失败，status 为应返回的HTTP状态码"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+def build_detail_rows(details, resolve_isbn=False):
+    """
+    验证进货明细并转换为可直接批量插入 purchase_detail 的行（不含 order_id）。
+    引用的图书ID用一条 IN 查询校验；resolve_isbn 为 True 时，
+    没有 book_id 但 ISBN 已在库的明细按已有图书处理（同样只用一条 IN 查询）。
+    """
+    if not details:
+        raise DetailError('进货单必须包含至少一项商品')
+
+    if not isinstance(details, list):
+        raise DetailError('进货明细应为数组')
+
+    rows = []
+    for detail in details:
+        if not isinstance(detail, dict):
+            raise DetailError('进货明细格式不正确')
+
+        # 验证必填字段
+        for field in ['quantity', 'purchase_price']:
+            if detail.get(field) in (None, ''):
+                raise DetailError(f'进货明细中缺少必填字段: {field}')
+
+        try:
+            quantity = int(detail['quantity'])
+            purchase_price = float(detail['purchase_price'])
+            book_id = int(detail['book_id']) if detail.get('book_id') not in (None, '') else None
+        except (TypeError, ValueError, OverflowError):
+            raise DetailError('进货明细中的图书ID、数量或价格格式不正确')
+        if not math.isfinite(purchase_price):
+            raise DetailError('进货明细中的价格格式不正确')
+        if quantity <= 0:
+            raise DetailError('进货数量必须大于0')
+
+        if book_id is None and not resolve_isbn:
+            # 对于新书，需要提供基本信息
+            for field in NEW_BOOK_FIELDS:
+                if not detail.get(field):
+                    raise DetailError(f'新书明细中缺少必填字段: {field}')
+
+        rows.append({
+            'book_id': book_id,
+            'isbn': None if book_id else detail.get('isbn'),
+            'title': None if book_id else detail.get('title'),
+            'author': None if book_id else detail.get('author'),
+            'publisher': None if book_id else detail.get('publisher'),
+            'quantity': quantity,
+            'purchase_price': purchase_price,
+            'is_new_book': book_id is None
+        })
+
+    if resolve_isbn:
+        isbns = {r['isbn'] for r in rows if r['book_id'] is None and r['isbn']}
+        known = dict(db.session.query(Book.isbn, Book.book_id).filter(Book.isbn.in_(isbns)).all()) if isbns else {}
+        for row in rows:
+            if row['book_id'] is None and row['isbn'] in known:
+                row.update(book_id=known[row['isbn']], isbn=None, title=None, author=None,
+                           publisher=None, is_new_book=False)
+            elif row['book_id'] is None:
+                for field in NEW_BOOK_FIELDS:
+                    if not row.get(field):
+                        raise DetailError(f'新书明细中缺少必填字段: {field}')
+
+    # 一条查询校验所有引用的图书
+    book_ids = {r['book_id'] for r in rows if r['book_id'] is not None}
+    if book_ids:
+        existing = {book_id for (book_id,) in db.session.query(Book.book_id).filter(Book.book_id.in_(book_ids))}
+        missing = sorted(book_ids - existing)
+        if missing:
+            raise DetailError(f'图书ID不存在: {missing[0]}', 404)
+
+    return rows
+
+def insert_detail_rows(order_id, rows):
+    # 一条 executemany 插入全部明细
+    if rows:
+        db.session.execute(PurchaseDetail.__table__.insert(), [dict(row, order_id=order_id) for row in rows])
+
+def _match_key(row):
+    # 已有图书按 book_id 匹配，新书按 ISBN 匹配
+    return ('book', row['book_id']) if row['book_id'] is not None else ('isbn', row['isbn'])
+
+def apply_detail_changes(order_id, details, rows):
+    """
+    将进货单明细更新为 rows（与 details 一一对应，由 build_detail_rows 生成），
+    只对有变化的明细执行 INSERT / UPDATE / DELETE，保留未变化明细的 detail_id。
+    明细先按请求中的 detail_id 匹配，没有 detail_id 时按 book_id / ISBN 匹配。
+    返回变化摘要。
+    """
+    table = PurchaseDetail.__table__
+    existing = {
+        r.detail_id: r for r in db.session.execute(
+            table.select().where(table.c.order_id == order_id).order_by(table.c.detail_id)
+        )
+    }
+
+    matched = {}
+    unmatched_rows = []
+    for detail, row in zip(details, rows):
+        detail_id = detail.get('detail_id')
+        if detail_id in (None, ''):
+            unmatched_rows.append(row)
+            continue
+        try:
+            detail_id = int(detail_id)
+        except (TypeError, ValueError):
+            raise DetailError('明细ID格式不正确')
+        if detail_id not in existing:
+            raise DetailError(f'明细ID不属于该进货单: {detail_id}')
+        if detail_id in matched:
+            raise DetailError(f'明细ID重复: {detail_id}')
+        matched[detail_id] = row
+
+    # 剩余明细按图书匹配尚未被占用的旧明细
+    by_key = {}
+    for detail_id, old in existing.items():
+        if detail_id not in matched:
+            by_key.setdefault(_match_key(old), []).append(detail_id)
+    inserts = []
+    for row in unmatched_rows:
+        candidates = by_key.get(_match_key(row))
+        if candidates:
+            matched[candidates.pop(0)] = row
+        else:
+            inserts.append(dict(row, order_id=order_id))
+
+    updates = []
+    for detail_id, row in matched.items():
+        old = existing[detail_id]
+        if any(getattr(old, field) != row[field] for field in DETAIL_FIELDS if field != 'purchase_price') \
+                or float(old.purchase_price) != row['purchase_price']:
+            updates.append(dict(row, _detail_id=detail_id))
+    deleted = sorted(set(existing) - set(matched))
+
+    # 每种变化各一条语句
+    if deleted:
+        db.session.execute(table.delete().where(table.c.detail_id.in_(deleted)))
+    if updates:
+        db.session.execute(table.update().where(table.c.detail_id == bindparam('_detail_id')), updates)
+    if inserts:
+        db.session.execute(table.insert(), inserts)
+
+    return {
+        'inserted': len(inserts),
+        'updated': sorted(u['_detail_id'] for u in updates),
+        'deleted': deleted,
+        'unchanged': len(matched) - len(updates)
+    }
+
+def _decode(raw):
+    # Excel 导出的CSV常带BOM或使用GBK编码
+    for encoding in ('utf-8-sig', 'gbk'):
+        try:
+            return raw.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+    raise DetailError('清单文件编码无法识别，请使用UTF-8或GBK')
+
+def parse_manifest(raw, filename='', content_type=''):
+    """
+    解析供应商清单，返回 (明细列表, 备注)。
+    CSV 首行为列名（见 MANIFEST_COLUMNS）；JSON 可以是明细数组，
+    也可以是 {"remark": ..., "details": [...]}。
+    """
+    text = _decode(raw)
+    is_json = filename.lower().endswith('.json') or 'json' in (content_type or '')
+
+    if is_json:
+        try:
+            data = json.loads(text)
+        except ValueError:
+            raise DetailError('清单不是有效的JSON')
+        if isinstance(data, dict):
+            return data.get('details') or [], data.get('remark', '')
+        if isinstance(data, list):
+            return data, ''
+        raise DetailError('JSON清单应为明细数组或包含 details 的对象')
+
+    reader = csv.DictReader(io.StringIO(text))
+    if not reader.fieldnames:
+        raise DetailError('清单为空')
+    unknown = set(name.strip() for name in reader.fieldnames) - set(MANIFEST_COLUMNS)
+    if unknown:
+        raise DetailError(f'清单包含未知的列: {", ".join(sorted(unknown))}')
+
+    details = []
+    for record in reader:
+        detail = {key.strip(): (value or '').strip() for key, value in record.items() if key}
+        if any(detail.values()):
+            details.append(detail)
+    return details, ''
@@ -0,0 +1,103 @@
+import os
+import threading
+from contextlib import contextmanager
+from flask import g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# 当前线程上正在计数的计数器（支持嵌套）
+_local = threading.local()
+
+class QueryCounter:
+    """记录一段代码执行期间发出的SQL语句"""
+
+    def __init__(self):
+        self.count = 0
+        self.statements = []
+
+    def record(self, statement):
+        self.count += 1
+        self.statements.append(statement)
+
+def _active_counters():
+    if not hasattr(_local, 'counters'):
+        _local.counters = []
+    return _local.counters
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    for counter in _active_counters():
+        counter.record(statement)
+
+@contextmanager
+def count_queries():
+    """
+    统计 with 块内执行的SQL语句数，用于脚本和基准测试：
+
+        with count_queries() as counter:
+            client.get('/api/sales/')
+        assert counter.count <= 3
+    """
+    counter = QueryCounter()
+    counters = _active_counters()
+    counters.append(counter)
+    try:
+        yield counter
+    finally:
+        counters.remove(counter)
+
+@contextmanager
+def uncounted():
+    """with 块内的语句不计入当前线程的任何计数器（用于与请求无关的周期性缓存刷新）"""
+    counters = _active_counters()
+    saved = counters[:]
+    counters.clear()
+    try:
+        yield
+    finally:
+        counters[:] = saved
+
+def query_budget(max_queries):
+    """声明接口允许的最大SQL语句数，放在路由装饰器之下"""
+    def decorator(f):
+        f.query_budget = max_queries
+        return f
+    return decorator
+
+def init_query_counter(app):
+    """
+    按请求统计SQL语句数（环境变量 SQL_QUERY_COUNT=1 开启）：
+    响应头 X-Query-Count 返回本次请求的语句数，超出 query_budget 时记录警告。
+    预算的强制检查在 tests/test_query_budget.py 中，不影响线上的响应。
+    """
+    app.config.setdefault('SQL_QUERY_COUNT', os.getenv('SQL_QUERY_COUNT') == '1')
+
+    if not app.config['SQL_QUERY_COUNT']:
+        return
+
+    @app.before_request
+    def start_query_count():
+        g.query_counter = QueryCounter()
+        _active_counters().append(g.query_counter)
+
+    @app.after_request
+    def finish_query_count(response):
+        counter = g.get('query_counter')
+        if counter is None:
+            return response
+
+        response.headers['X-Query-Count'] = str(counter.count)
+
+        view = app.view_functions.get(request.endpoint)
+        budget = getattr(view, 'query_budget', None)
+        if budget is not None and counter.count > budget:
+            app.logger.warning('%s 执行了 %d 条SQL，超出预算 %d',
+                               request.endpoint, counter.count, budget)
+        return response
+
+    @app.teardown_request
+    def stop_query_count(exc):
+        # 请求异常时 after_request 不会执行，在这里统一移除计数器
+        counter = g.pop('query_counter', None)
+        if counter is not None and counter in _active_counters():
+            _active_counters().remove(counter)
@@ -0,0 +1,140 @@
+import os
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from backend.models import db
+from backend.partitions import ensure_partitions
+
+# 报表物化视图（db/create_views.sql），由 proc_refresh_report_view 刷新
+REPORT_VIEWS = (
+    'view_sales_statistics',
+    'view_purchase_statistics',
+    'view_user_sales_performance',
+    'view_monthly_finance'
+)
+
+REFRESH_SQL = text('SELECT proc_refresh_report_view(:view, make_interval(secs => :max_age))')
+
+def refresh_report_views(views=REPORT_VIEWS, max_age=0):
+    """
+    逐个刷新物化视图（每个视图一个事务），距上次刷新不足 max_age 秒的视图跳过。
+    返回 {视图名: 数据时间点}，跳过的视图不在结果中
+    """
+    refreshed = {}
+    for view in views:
+        refreshed_at = db.session.execute(REFRESH_SQL, {'view': view, 'max_age': max_age}).scalar()
+        db.session.commit()
+        if refreshed_at is not None:
+            refreshed[view] = refreshed_at
+    return refreshed
+
+def compact_financial_summary():
+    """合并财务日汇总中今天以前各天的分桶行，返回合并的（日期, 类型）数"""
+    merged = db.session.execute(text('SELECT proc_compact_financial_daily_summary()')).scalar()
+    db.session.commit()
+    return merged
+
+def report_refresh_status():
+    return db.session.execute(text(
+        'SELECT view_name, refreshed_at, duration_ms FROM report_refresh ORDER BY view_name'
+    )).fetchall()
+
+def view_freshness(view):
+    """物化视图数据的时间点，放在接口响应的 freshness 字段中"""
+    refreshed_at = db.session.execute(
+        text('SELECT refreshed_at FROM report_refresh WHERE view_name = :view'), {'view': view}
+    ).scalar()
+    return {
+        'source': view,
+        'refreshed_at': refreshed_at.isoformat() if refreshed_at else None
+    }
+
+def live_freshness():
+    """直接查询明细表的结果，数据时间点即查询时刻"""
+    return {'source': 'live', 'refreshed_at': datetime.now().isoformat()}
+
+class ReportScheduler:
+    """
+    应用内的后台定时任务，每个工作进程一个线程：
+
+    - 每 refresh_interval 秒刷新一次报表物化视图。各进程同时到期时，
+      数据库函数中的咨询锁和刷新时间检查保证只有一个进程真正执行刷新
+    - 每天检查一次月份分区，保证新月份开始前分区已存在，并合并财务日汇总的分桶行
+    """
+
+    PARTITION_CHECK_INTERVAL = 86400
+
+    def __init__(self, refresh_interval=60):
+        self.refresh_interval = refresh_interval
+        self.runs = 0
+        self.last_error = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._next_partition_check = 0
+
+    def configure(self, refresh_interval=None):
+        if refresh_interval is not None:
+            self.refresh_interval = refresh_interval
+
+    def start(self, app):
+        with self._lock:
+            if self._thread is not None or self.refresh_interval <= 0:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, args=(app,), name='report-scheduler', daemon=True
+            )
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join()
+
+    def _run(self, app):
+        while not self._stop.wait(self.refresh_interval):
+            with app.app_context():
+                try:
+                    self.tick(app)
+                except DBAPIError as e:
+                    db.session.rollback()
+                    self.last_error = str(e.orig)
+                    app.logger.warning(f'报表物化视图刷新失败: {e.orig}')
+                finally:
+                    db.session.remove()
+
+    def tick(self, app):
+        # 上次刷新距今超过半个周期才刷新，其他进程刚刷新过的视图不会重复刷新
+        refresh_report_views(max_age=self.refresh_interval / 2)
+        self.runs += 1
+        self.last_error = None
+
+        if time.monotonic() >= self._next_partition_check:
+            self._next_partition_check = time.monotonic() + self.PARTITION_CHECK_INTERVAL
+            ensure_partitions(app.config['PARTITION_MONTHS_AHEAD'])
+            compact_financial_summary()
+
+    def stats(self):
+        return {
+            'refresh_interval': self.refresh_interval,
+            'running': self._thread is not None and self._thread.is_alive(),
+            'runs': self.runs,
+            'last_error': self.last_error
+        }
+
+report_scheduler = ReportScheduler()
+
+def init_report_views(app):
+    # REPORT_REFRESH_INTERVAL=0 时不启动后台刷新（改用 flask reports refresh 定时执行）
+    app.config.setdefault('REPORT_REFRESH_INTERVAL', int(os.getenv('REPORT_REFRESH_INTERVAL', 60)))
+    report_scheduler.configure(refresh_interval=app.config['REPORT_REFRESH_INTERVAL'])
+
+    @app.before_first_request
+    def start_report_scheduler():
+        # 在处理请求的进程中启动（gunicorn 的工作进程 fork 之后）
+        report_scheduler.start(app)
@@ -1,34 +1,50 @@
 from flask import Blueprint, request, jsonify, session
-from backend.models import db, Book
-from backend.routes.user_routes import login_required
-from sqlalchemy import or_
+from sqlalchemy import exists
+from backend.models import db, Book, SaleRecord, PurchaseDetail
+from backend.routes.user_routes import login_required, admin_required
+from backend.pagination import get_page_args, keyset_paginate, PaginationError
+from backend.search import search_books
+from backend.book_cache import book_cache
+from backend.aggregate_cache import aggregate_cache
+from backend.http_cache import conditional
 
 book_bp = Blueprint('book_bp', __name__)
 
 # 获取所有图书
 @book_bp.route('/', methods=['GET'])
 @login_required
+@conditional('book')
 def get_all_books():
     # 支持搜索功能
-    search_query = request.args.get('search', '')
-    
-    if search_query:
-        # 如果有搜索关键词，就按照书名、作者、出版社、ISBN进行模糊搜索
-        books = Book.query.filter(
-            or_(
-                Book.title.ilike(f'%{search_query}%'),
-                Book.author.ilike(f'%{search_query}%'),
-                Book.publisher.ilike(f'%{search_query}%'),
-                Book.isbn.ilike(f'%{search_query}%')
-            )
-        ).all()
-    else:
-        # 否则返回所有图书
-        books = Book.query.all()
+    search_query = request.args.get('search', '').strip()
     
-    return jsonify({
-        'books': [book.to_dict() for book in books]
-    })
+    try:
+        limit, cursor = get_page_args()
+        
+        if search_query:
+            # 搜索结果按相关度排序，不支持游标翻页：不传limit时返回全部匹配，
+            # 传入limit时截断为limit条，多取一条判断是否还有更多匹配
+            if cursor:
+                raise PaginationError('搜索结果不支持游标分页')
+            if limit is None:
+                books = search_books(search_query)
+                return jsonify({'books': [book.to_dict() for book in books]})
+            books = search_books(search_query, limit + 1)
+            return jsonify({
+                'books': [book.to_dict() for book in books[:limit]],
+                'truncated': len(books) > limit
+            })
+        
+        books, next_cursor = keyset_paginate(Book.query, [Book.book_id], limit, cursor, descending=False)
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    response = {'books': [book.to_dict() for book in books]}
+    # 只有显式传入limit时才返回游标，保持不分页时的响应格式不变
+    if limit is not None:
+        response['next_cursor'] = next_cursor
+    
+    return jsonify(response)
 
 # 获取单本图书详情
 @book_bp.route('/<int:book_id>', methods=['GET'])
@@ -111,6 +127,8 @@ def update_book(book_id):
     
     try:
         db.session.commit()
+        book_cache.invalidate(book_id)
+        aggregate_cache.invalidate()
         return jsonify({
             'message': '图书信息更新成功',
             'book': book.to_dict()
@@ -128,14 +146,19 @@ def delete_book(book_id):
     if not book:
         return jsonify({'error': '图书不存在'}), 404
     
-    # 检查图书是否有关联的销售记录或进货记录
-    if book.sale_records or book.purchase_details:
+    # 检查图书是否有关联的销售记录或进货记录（只判断是否存在，不加载关联记录）
+    has_records = db.session.query(
+        exists().where(SaleRecord.book_id == book_id) | exists().where(PurchaseDetail.book_id == book_id)
+    ).scalar()
+    if has_records:
         return jsonify({'error': '此图书有关联的销售或进货记录，无法删除'}), 400
     
     db.session.delete(book)
     
     try:
         db.session.commit()
+        book_cache.invalidate(book_id)
+        aggregate_cache.invalidate()
         return jsonify({'message': '图书删除成功'})
     except Exception as e:
         db.session.rollback()
@@ -144,9 +167,16 @@ def delete_book(book_id):
 # 获取库存少于10本的图书（库存预警）
 @book_bp.route('/low-stock', methods=['GET'])
 @login_required
+@conditional('book')
 def get_low_stock_books():
     low_stock_books = Book.query.filter(Book.stock < 10).order_by(Book.stock).all()
     
     return jsonify({
         'books': [book.to_dict() for book in low_stock_books]
-    })
\ No newline at end of file
+    })
+
+# 图书缓存命中统计（仅超级管理员可用）
+@book_bp.route('/cache-stats', methods=['GET'])
+@admin_required
+def get_book_cache_stats():
+    return jsonify({'cache': book_cache.stats()})
@@ -1,6 +1,11 @@
 from flask import Blueprint, jsonify, session
 from backend.models import db, Book, SaleRecord, FinancialRecord, User
-from backend.routes.user_routes import login_required
+from backend.routes.user_routes import login_required, admin_required
+from backend.dashboard_snapshot import dashboard_snapshot
+from backend.db_pool import pool_status
+from backend.http_cache import conditional
+from backend.aggregate_cache import aggregate_cache
+from backend.report_views import report_scheduler, report_refresh_status, view_freshness
 from sqlalchemy import func, desc, text
 from datetime import datetime, timedelta
 
@@ -10,102 +15,35 @@ dashboard_bp = Blueprint('dashboard_bp', __name__)
 @dashboard_bp.route('/overview', methods=['GET'])
 @login_required
 def get_overview():
-    # 库存汇总
-    total_books = db.session.query(func.count(Book.book_id)).scalar() or 0
-    total_stock = db.session.query(func.sum(Book.stock)).scalar() or 0
-    low_stock_books = db.session.query(func.count(Book.book_id)).filter(Book.stock < 10).scalar() or 0
-    
-    # 销售汇总（本月）
-    current_month_start = datetime(datetime.now().year, datetime.now().month, 1)
-    monthly_sales_count = db.session.query(
-        func.count(SaleRecord.sale_id)
-    ).filter(SaleRecord.sale_time >= current_month_start).scalar() or 0
-    
-    monthly_sales_amount = db.session.query(
-        func.sum(SaleRecord.quantity * SaleRecord.sale_price)
-    ).filter(SaleRecord.sale_time >= current_month_start).scalar() or 0
-    
-    # 财务汇总
-    total_income = db.session.query(
-        func.sum(FinancialRecord.amount)
-    ).filter(FinancialRecord.type == '收入').scalar() or 0
-    
-    total_expense = db.session.query(
-        func.sum(FinancialRecord.amount)
-    ).filter(FinancialRecord.type == '支出').scalar() or 0
-    
-    # 热销书籍
-    top_selling_books = db.session.query(
-        Book.book_id,
-        Book.isbn,
-        Book.title,
-        func.sum(SaleRecord.quantity).label('total_sold')
-    ).join(SaleRecord).group_by(
-        Book.book_id,
-        Book.isbn,
-        Book.title
-    ).order_by(desc('total_sold')).limit(5).all()
-    
-    # 构建返回数据
-    overview = {
-        'inventory_summary': {
-            'total_books': total_books,
-            'total_stock': total_stock,
-            'low_stock_books': low_stock_books
-        },
-        'sales_summary': {
-            'monthly_sales_count': monthly_sales_count,
-            'monthly_sales_amount': float(monthly_sales_amount) if monthly_sales_amount else 0
-        },
-        'finance_summary': {
-            'total_income': float(total_income),
-            'total_expense': float(total_expense),
-            'total_profit': float(total_income) - float(total_expense)
-        },
-        'top_selling_books': [
-            {
-                'book_id': book.book_id,
-                'isbn': book.isbn,
-                'title': book.title,
-                'total_sold': book.total_sold
-            }
-            for book in top_selling_books
-        ]
-    }
-    
-    return jsonify({'overview': overview})
+    # 所有浏览器共用一份短期快照，过期后单条SQL增量刷新
+    return jsonify({'overview': dashboard_snapshot.get_overview()})
+
+# 销售排行读取物化视图
+BOOK_RANKING_SQL = text("""
+    SELECT book_id, isbn, title, total_sold AS total_quantity, total_revenue
+    FROM view_sales_statistics
+    ORDER BY total_sold DESC
+    LIMIT 10
+""")
+
+STAFF_RANKING_SQL = text("""
+    SELECT user_id, username, total_sales AS sales_count, total_items_sold AS books_sold, total_revenue
+    FROM view_user_sales_performance
+    WHERE total_sales > 0
+    ORDER BY total_revenue DESC
+    LIMIT 10
+""")
 
 # 获取销售排行数据
 @dashboard_bp.route('/sales-ranking', methods=['GET'])
 @login_required
+@conditional('view_sales_statistics', 'view_user_sales_performance')
 def get_sales_ranking():
-    # 查询销售排行（按书籍和销售员）
-    
     # 热销书籍排行
-    book_ranking = db.session.query(
-        Book.book_id, 
-        Book.isbn, 
-        Book.title, 
-        func.sum(SaleRecord.quantity).label('total_quantity'),
-        func.sum(SaleRecord.quantity * SaleRecord.sale_price).label('total_revenue')
-    ).join(SaleRecord).group_by(
-        Book.book_id, 
-        Book.isbn, 
-        Book.title
-    ).order_by(desc('total_quantity')).limit(10).all()
+    book_ranking = db.session.execute(BOOK_RANKING_SQL).fetchall()
     
     # 销售员业绩排行
-    staff_ranking = db.session.query(
-        User.user_id,
-        User.username,
-        func.count(SaleRecord.sale_id).label('sales_count'),
-        func.sum(SaleRecord.quantity).label('books_sold'),
-        func.sum(SaleRecord.quantity * SaleRecord.sale_price).label('total_revenue')
-    ).join(SaleRecord, User.user_id == SaleRecord.seller_id
-    ).group_by(
-        User.user_id,
-        User.username
-    ).order_by(desc('total_revenue')).limit(10).all()
+    staff_ranking = db.session.execute(STAFF_RANKING_SQL).fetchall()
     
     # 构建返回数据
     ranking_data = {
@@ -131,4 +69,38 @@ def get_sales_ranking():
         ]
     }
     
-    return jsonify({'ranking_data': ranking_data})
\ No newline at end of file
+    return jsonify({
+        'ranking_data': ranking_data,
+        # 两个物化视图中较早的刷新时间
+        'freshness': min(
+            view_freshness('view_sales_statistics'),
+            view_freshness('view_user_sales_performance'),
+            key=lambda f: f['refreshed_at'] or ''
+        )
+    })
+
+# 数据库连接池状态（仅超级管理员可用），用于按数据库连接数规划工作进程数
+@dashboard_bp.route('/db-pool', methods=['GET'])
+@admin_required
+def get_db_pool_status():
+    return jsonify({'pool': pool_status(db.engine)})
+
+# 统计结果缓存命中情况（仅超级管理员可用）
+@dashboard_bp.route('/aggregate-cache', methods=['GET'])
+@admin_required
+def get_aggregate_cache_stats():
+    return jsonify({'cache': aggregate_cache.stats()})
+
+# 报表物化视图的刷新时间、耗时和本进程后台刷新线程状态（仅超级管理员可用）
+@dashboard_bp.route('/report-views', methods=['GET'])
+@admin_required
+def get_report_views_status():
+    views = [
+        {
+            'view_name': r.view_name,
+            'refreshed_at': r.refreshed_at.isoformat(),
+            'duration_ms': r.duration_ms
+        }
+        for r in report_refresh_status()
+    ]
+    return jsonify({'views': views, 'scheduler': report_scheduler.stats()})
\ No newline at end of file
@@ -1,14 +1,22 @@
 from flask import Blueprint, request, jsonify, session
-from backend.models import db, FinancialRecord, User
+from backend.models import db, FinancialRecord, FinancialDailySummary, User
 from backend.routes.user_routes import login_required, admin_required
+from backend.pagination import get_page_args, keyset_paginate, PaginationError
+from backend.query_counter import query_budget
+from backend.streaming import wants_ndjson, ndjson_response
+from backend.cost_basis import COST_METHODS, sales_profit_sql
+from backend.aggregate_cache import cached_aggregate
+from backend.http_cache import conditional
+from backend.report_views import view_freshness
 from sqlalchemy import func, extract, text
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 
 finance_bp = Blueprint('finance_bp', __name__)
 
 # 获取所有财务记录
 @finance_bp.route('/', methods=['GET'])
 @login_required
+@query_budget(1)
 def get_all_financial_records():
     # 支持按日期范围、类型筛选
     start_date = request.args.get('start_date')
@@ -16,7 +24,7 @@ def get_all_financial_records():
     record_type = request.args.get('type')  # 收入/支出
     source_type = request.args.get('source_type')  # 进货/销售
     
-    query = FinancialRecord.query
+    query = FinancialRecord.query.options(*FinancialRecord.load_options())
     
     if start_date:
         query = query.filter(FinancialRecord.record_time >= start_date)
@@ -27,31 +35,61 @@ def get_all_financial_records():
     if source_type:
         query = query.filter(FinancialRecord.source_type == source_type)
     
-    # 按记录时间倒序排序
-    records = query.order_by(FinancialRecord.record_time.desc()).all()
+    # 流式导出（?format=ndjson），用于大范围对账
+    if wants_ndjson(request.args):
+        return ndjson_response(query.order_by(FinancialRecord.record_time.desc(), FinancialRecord.record_id.desc()))
     
-    return jsonify({
-        'records': [record.to_dict() for record in records]
-    })
+    # 按记录时间倒序排序，record_id作为相同时间的次序
+    try:
+        limit, cursor = get_page_args()
+        records, next_cursor = keyset_paginate(
+            query, [FinancialRecord.record_time, FinancialRecord.record_id], limit, cursor
+        )
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    response = {'records': [record.to_dict() for record in records]}
+    if limit is not None:
+        response['next_cursor'] = next_cursor
+    
+    return jsonify(response)
+
+# 月度收支统计：读取月度财务物化视图，没有记录的月份也返回0
+MONTHLY_STATISTICS_SQL = text("""
+    SELECT
+        TO_CHAR(m.month_start, 'YYYY-MM') AS month,
+        t.type,
+        COALESCE(v.total_amount, 0) AS total_amount
+    FROM generate_series(
+        CAST(:year_start AS TIMESTAMP),
+        CAST(:year_end AS TIMESTAMP) - INTERVAL '1 month',
+        INTERVAL '1 month'
+    ) AS m(month_start)
+    CROSS JOIN (VALUES ('收入'), ('支出')) AS t(type)
+    LEFT JOIN view_monthly_finance v
+        ON v.month = TO_CHAR(m.month_start, 'YYYY-MM')
+        AND v.type = t.type
+    ORDER BY month, t.type
+""")
 
 # 获取月度财务统计
 @finance_bp.route('/monthly', methods=['GET'])
 @login_required
+@conditional('view_monthly_finance')
 def get_monthly_statistics():
     # 可选参数：年份
-    year = request.args.get('year', datetime.now().year)
+    try:
+        year = int(request.args.get('year', datetime.now().year))
+        year_start = datetime(year, 1, 1)
+        year_end = datetime(year + 1, 1, 1)
+    except ValueError:
+        return jsonify({'error': '年份参数无效'}), 400
     
     # 查询月度收支统计
-    results = db.session.execute(text("""
-        SELECT 
-            TO_CHAR(record_time, 'YYYY-MM') AS month,
-            type,
-            SUM(amount) AS total_amount
-        FROM financial_record
-        WHERE EXTRACT(YEAR FROM record_time) = :year
-        GROUP BY TO_CHAR(record_time, 'YYYY-MM'), type
-        ORDER BY month, type
-    """), {"year": year}).fetchall()
+    results = db.session.execute(MONTHLY_STATISTICS_SQL, {
+        "year_start": year_start,
+        "year_end": year_end
+    }).fetchall()
     
     # 构建返回数据
     monthly_stats = []
@@ -62,77 +100,62 @@ def get_monthly_statistics():
             'total_amount': float(r[2])
         })
     
-    return jsonify({'monthly_statistics': monthly_stats})
+    return jsonify({
+        'monthly_statistics': monthly_stats,
+        'freshness': view_freshness('view_monthly_finance')
+    })
 
 # 获取总体财务概况
 @finance_bp.route('/summary', methods=['GET'])
 @login_required
 def get_finance_summary():
-    # 总收入
-    total_income = db.session.query(
-        func.sum(FinancialRecord.amount)
-    ).filter(FinancialRecord.type == '收入').scalar() or 0
-    
-    # 总支出
-    total_expense = db.session.query(
-        func.sum(FinancialRecord.amount)
-    ).filter(FinancialRecord.type == '支出').scalar() or 0
-    
-    # 本月收入
-    current_month_start = datetime(datetime.now().year, datetime.now().month, 1)
-    current_month_income = db.session.query(
-        func.sum(FinancialRecord.amount)
-    ).filter(
-        FinancialRecord.type == '收入',
-        FinancialRecord.record_time >= current_month_start
-    ).scalar() or 0
-    
-    # 本月支出
-    current_month_expense = db.session.query(
-        func.sum(FinancialRecord.amount)
-    ).filter(
-        FinancialRecord.type == '支出',
-        FinancialRecord.record_time >= current_month_start
-    ).scalar() or 0
-    
-    # 上月收入
-    last_month_start = current_month_start - timedelta(days=current_month_start.day)
-    last_month_end = current_month_start - timedelta(days=1)
-    last_month_income = db.session.query(
-        func.sum(FinancialRecord.amount)
-    ).filter(
-        FinancialRecord.type == '收入',
-        FinancialRecord.record_time >= last_month_start,
-        FinancialRecord.record_time <= last_month_end
-    ).scalar() or 0
-    
-    # 上月支出
-    last_month_expense = db.session.query(
-        func.sum(FinancialRecord.amount)
-    ).filter(
-        FinancialRecord.type == '支出',
-        FinancialRecord.record_time >= last_month_start,
-        FinancialRecord.record_time <= last_month_end
-    ).scalar() or 0
+    # 从财务日汇总表读取，代价与天数有关，与财务记录条数无关
+    today = date.today()
+    current_month_start = date(today.year, today.month, 1)
+    last_month_start = (current_month_start - timedelta(days=1)).replace(day=1)
+    
+    amount = FinancialDailySummary.total_amount
+    day = FinancialDailySummary.day
+    results = db.session.query(
+        FinancialDailySummary.type,
+        func.sum(amount).label('total'),
+        func.sum(amount).filter(day >= current_month_start).label('current_month'),
+        func.sum(amount).filter(day >= last_month_start, day < current_month_start).label('last_month')
+    ).group_by(FinancialDailySummary.type).all()
+    
+    totals = {r.type: r for r in results}
+    income = totals.get('收入')
+    expense = totals.get('支出')
+    
+    def amount_of(row, column):
+        value = getattr(row, column) if row else None
+        return float(value) if value else 0.0
+    
+    total_income = amount_of(income, 'total')
+    total_expense = amount_of(expense, 'total')
+    current_month_income = amount_of(income, 'current_month')
+    current_month_expense = amount_of(expense, 'current_month')
+    last_month_income = amount_of(income, 'last_month')
+    last_month_expense = amount_of(expense, 'last_month')
     
     # 构建返回数据
     summary = {
-        'total_income': float(total_income),
-        'total_expense': float(total_expense),
-        'total_profit': float(total_income) - float(total_expense),
+        'total_income': total_income,
+        'total_expense': total_expense,
+        'total_profit': total_income - total_expense,
         'current_month': {
-            'year': datetime.now().year,
-            'month': datetime.now().month,
-            'income': float(current_month_income),
-            'expense': float(current_month_expense),
-            'profit': float(current_month_income) - float(current_month_expense)
+            'year': current_month_start.year,
+            'month': current_month_start.month,
+            'income': current_month_income,
+            'expense': current_month_expense,
+            'profit': current_month_income - current_month_expense
         },
         'last_month': {
             'year': last_month_start.year,
             'month': last_month_start.month,
-            'income': float(last_month_income),
-            'expense': float(last_month_expense),
-            'profit': float(last_month_income) - float(last_month_expense)
+            'income': last_month_income,
+            'expense': last_month_expense,
+            'profit': last_month_income - last_month_expense
         }
     }
     
@@ -141,25 +164,16 @@ def get_finance_summary():
 # 获取销售利润数据
 @finance_bp.route('/sales-profit', methods=['GET'])
 @login_required
+@conditional('book', 'sale_record', 'purchase_order')
+@cached_aggregate
 def get_sales_profit():
-    # 查询销售和购买的价格差
-    results = db.session.execute(text("""
-        SELECT 
-            b.book_id,
-            b.isbn,
-            b.title,
-            SUM(s.quantity) AS total_sold,
-            SUM(s.quantity * s.sale_price) AS total_revenue,
-            AVG(pd.purchase_price) AS avg_purchase_price,
-            AVG(s.sale_price) AS avg_sale_price,
-            AVG(s.sale_price - pd.purchase_price) AS avg_profit_per_book,
-            SUM(s.quantity * (s.sale_price - pd.purchase_price)) AS total_profit
-        FROM sale_record s
-        JOIN book b ON s.book_id = b.book_id
-        LEFT JOIN purchase_detail pd ON b.book_id = pd.book_id
-        GROUP BY b.book_id, b.isbn, b.title
-        ORDER BY total_profit DESC
-    """)).fetchall()
+    # 成本计算方法：average（加权平均，默认）或 fifo（先进先出）
+    cost_method = request.args.get('cost_method', 'average')
+    if cost_method not in COST_METHODS:
+        return jsonify({'error': f'cost_method 只能是: {", ".join(COST_METHODS)}'}), 400
+    
+    # 销售与进货成本先分别按图书汇总再连接，避免一对多连接造成重复计数
+    results = db.session.execute(sales_profit_sql(cost_method)).fetchall()
     
     # 构建返回数据
     profit_data = []
@@ -176,4 +190,4 @@ def get_sales_profit():
             'total_profit': float(r[8]) if r[8] else 0
         })
     
-    return jsonify({'profit_data': profit_data})
\ No newline at end of file
+    return jsonify({'profit_data': profit_data, 'cost_method': cost_method})
\ No newline at end of file
@@ -1,114 +1,160 @@
-from flask import Blueprint, request, jsonify, session
+from flask import Blueprint, request, jsonify, session, abort
 from backend.models import db, PurchaseOrder, PurchaseDetail, Book, User, FinancialRecord
 from backend.routes.user_routes import login_required
+from backend.pagination import get_page_args, keyset_paginate, PaginationError
+from backend.query_counter import query_budget
+from backend.book_cache import book_cache
+from backend.aggregate_cache import aggregate_cache
+from backend.http_cache import conditional
+from backend.report_views import view_freshness
+from backend.db_errors import procedure_error_message, run_in_transaction
+from backend.purchase_details import (
+    DetailError, build_detail_rows, insert_detail_rows, apply_detail_changes, parse_manifest
+)
 from sqlalchemy import text
+import json
 
 purchase_bp = Blueprint('purchase_bp', __name__)
 
+def load_purchase_order(order_id):
+    # 连同 to_dict 需要的关联一起加载，提交后重新读取时同样适用
+    return PurchaseOrder.query.options(*PurchaseOrder.load_options()).filter_by(order_id=order_id).first()
+
 # 获取所有进货单
 @purchase_bp.route('/', methods=['GET'])
 @login_required
+@query_budget(3)
 def get_all_purchase_orders():
     # 支持按状态筛选
     status = request.args.get('status')
     
-    query = PurchaseOrder.query
+    query = PurchaseOrder.query.options(*PurchaseOrder.load_options())
     
     if status:
         query = query.filter_by(status=status)
     
-    # 按创建时间倒序排序
-    orders = query.order_by(PurchaseOrder.create_time.desc()).all()
+    # 按创建时间倒序排序，order_id作为相同时间的次序
+    try:
+        limit, cursor = get_page_args()
+        orders, next_cursor = keyset_paginate(
+            query, [PurchaseOrder.create_time, PurchaseOrder.order_id], limit, cursor
+        )
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
     
-    return jsonify({
-        'orders': [order.to_dict() for order in orders]
-    })
+    response = {'orders': [order.to_dict() for order in orders]}
+    if limit is not None:
+        response['next_cursor'] = next_cursor
+    
+    return jsonify(response)
 
 # 获取进货单详情
 @purchase_bp.route('/<int:order_id>', methods=['GET'])
 @login_required
+@query_budget(3)
 def get_purchase_order(order_id):
-    order = PurchaseOrder.query.get(order_id)
+    order = load_purchase_order(order_id)
     
     if not order:
         return jsonify({'error': '进货单不存在'}), 404
     
     return jsonify({'order': order.to_dict()})
 
-# 创建新的进货单
-@purchase_bp.route('/', methods=['POST'])
+# 获取进货统计（按图书统计已付款进货的数量和成本，读取物化视图）
+@purchase_bp.route('/statistics', methods=['GET'])
 @login_required
-def create_purchase_order():
-    data = request.json
+@conditional('view_purchase_statistics')
+def get_purchase_statistics():
+    results = db.session.execute(text("""
+        SELECT book_id, isbn, title, total_purchased, total_cost
+        FROM view_purchase_statistics
+        ORDER BY total_cost DESC
+    """)).fetchall()
+    
+    statistics = [
+        {
+            'book_id': r.book_id,
+            'isbn': r.isbn,
+            'title': r.title,
+            'total_purchased': r.total_purchased,
+            'total_cost': float(r.total_cost) if r.total_cost else 0
+        }
+        for r in results
+    ]
+    
+    return jsonify({
+        'statistics': statistics,
+        'freshness': view_freshness('view_purchase_statistics')
+    })
+
+def create_order_with_details(details, remark='', resolve_isbn=False):
+    """
+    创建进货单并批量写入明细，返回 (响应, 状态码)。
+    图书校验和明细插入的语句数与明细行数无关。
+    """
+    try:
+        rows = build_detail_rows(details, resolve_isbn=resolve_isbn)
+    except DetailError as e:
+        db.session.rollback()
+        return {'error': e.message}, e.status
     
     # 创建进货单
     new_order = PurchaseOrder(
         creator_id=session['user_id'],
-        remark=data.get('remark', '')
+        remark=remark or ''
     )
     
-    db.session.add(new_order)
-    db.session.flush()  # 获取新生成的order_id
-    
-    # 处理进货明细
-    details = data.get('details', [])
-    if not details:
-        db.session.rollback()
-        return jsonify({'error': '进货单必须包含至少一项商品'}), 400
-    
-    for detail in details:
-        # 验证必填字段
-        required_fields = ['quantity', 'purchase_price']
-        for field in required_fields:
-            if field not in detail:
-                db.session.rollback()
-                return jsonify({'error': f'进货明细中缺少必填字段: {field}'}), 400
-        
-        # 处理已有图书的进货
-        if 'book_id' in detail:
-            book = Book.query.get(detail['book_id'])
-            if not book:
-                db.session.rollback()
-                return jsonify({'error': f'图书ID不存在: {detail["book_id"]}'}), 404
-            
-            new_detail = PurchaseDetail(
-                order_id=new_order.order_id,
-                book_id=detail['book_id'],
-                quantity=detail['quantity'],
-                purchase_price=detail['purchase_price'],
-                is_new_book=False
-            )
-        # 处理新书的进货
-        else:
-            # 对于新书，需要提供基本信息
-            required_fields = ['isbn', 'title', 'author', 'publisher']
-            for field in required_fields:
-                if field not in detail:
-                    db.session.rollback()
-                    return jsonify({'error': f'新书明细中缺少必填字段: {field}'}), 400
-            
-            new_detail = PurchaseDetail(
-                order_id=new_order.order_id,
-                isbn=detail['isbn'],
-                title=detail['title'],
-                author=detail['author'],
-                publisher=detail['publisher'],
-                quantity=detail['quantity'],
-                purchase_price=detail['purchase_price'],
-                is_new_book=True
-            )
-        
-        db.session.add(new_detail)
-    
     try:
+        db.session.add(new_order)
+        db.session.flush()  # 获取新生成的order_id
+        order_id = new_order.order_id
+        
+        insert_detail_rows(order_id, rows)
         db.session.commit()
-        return jsonify({
+        return {
             'message': '进货单创建成功',
-            'order': new_order.to_dict()
-        }), 201
+            'order': load_purchase_order(order_id).to_dict()
+        }, 201
     except Exception as e:
         db.session.rollback()
-        return jsonify({'error': f'创建进货单失败: {str(e)}'}), 500
+        return {'error': f'创建进货单失败: {str(e)}'}, 500
+
+# 创建新的进货单
+@purchase_bp.route('/', methods=['POST'])
+@login_required
+def create_purchase_order():
+    data = request.json
+    
+    response, status = create_order_with_details(data.get('details', []), data.get('remark', ''))
+    return jsonify(response), status
+
+# 导入供应商清单创建进货单
+# 支持上传 CSV/JSON 文件（表单字段 file，可附带 remark），
+# 也支持直接以 text/csv 或 application/json 作为请求体
+@purchase_bp.route('/import', methods=['POST'])
+@login_required
+def import_purchase_manifest():
+    # MAX_CONTENT_LENGTH 只在解析表单时检查，直接作为请求体上传的清单在这里检查
+    if (request.max_content_length is not None
+            and (request.content_length or 0) > request.max_content_length):
+        abort(413)
+    
+    upload = request.files.get('file')
+    remark = request.form.get('remark') or request.args.get('remark', '')
+    
+    try:
+        if upload:
+            details, manifest_remark = parse_manifest(upload.read(), upload.filename or '', upload.mimetype)
+        else:
+            details, manifest_remark = parse_manifest(request.get_data(), content_type=request.content_type)
+    except DetailError as e:
+        return jsonify({'error': e.message}), e.status
+    
+    # 清单中的图书可以只给 ISBN，已在库的按已有图书进货
+    response, status = create_order_with_details(details, remark or manifest_remark, resolve_isbn=True)
+    if status == 201:
+        response['imported_lines'] = len(details)
+    return jsonify(response), status
 
 # 支付进货单
 @purchase_bp.route('/<int:order_id>/pay', methods=['POST'])
@@ -132,7 +178,11 @@ def pay_purchase_order(order_id):
         db.session.commit()
         
         # 重新获取更新后的订单
-        updated_order = PurchaseOrder.query.get(order_id)
+        updated_order = load_purchase_order(order_id)
+        
+        # 付款触发器更新了已有图书的库存
+        book_cache.invalidate(*[d.book_id for d in updated_order.details if d.book_id])
+        aggregate_cache.invalidate()
         
         return jsonify({
             'message': '进货单支付成功',
@@ -140,6 +190,10 @@ def pay_purchase_order(order_id):
         })
     except Exception as e:
         db.session.rollback()
+        message = procedure_error_message(e)
+        if message:
+            # 其他请求已先付款（状态检查由存储过程在行锁下完成）
+            return jsonify({'error': message}), 409
         return jsonify({'error': f'支付进货单失败: {str(e)}'}), 500
 
 # 添加新书到库存
@@ -163,6 +217,8 @@ def add_new_book_to_stock(detail_id):
         book_id = result.fetchone()[0]
         
         db.session.commit()
+        book_cache.invalidate(book_id)
+        aggregate_cache.invalidate()
         
         # 获取新添加的图书信息
         new_book = Book.query.get(book_id)
@@ -175,6 +231,49 @@ def add_new_book_to_stock(detail_id):
         db.session.rollback()
         return jsonify({'error': f'添加新书到库存失败: {str(e)}'}), 500
 
+# 整单新书入库：把已付款进货单中所有新书明细一次加入库存
+# 请求体: {"default_retail_price": 39.8, "retail_prices": {"明细ID": 零售价, ...}}
+@purchase_bp.route('/<int:order_id>/receive-new-books', methods=['POST'])
+@login_required
+def receive_new_books(order_id):
+    data = request.json or {}
+    
+    try:
+        default_price = data.get('default_retail_price')
+        default_price = float(default_price) if default_price not in (None, '') else None
+        prices = {str(int(detail_id)): float(price) for detail_id, price in (data.get('retail_prices') or {}).items()}
+    except (TypeError, ValueError, AttributeError):
+        return jsonify({'error': '零售价格式不正确'}), 400
+    
+    if any(price <= 0 for price in prices.values()) or (default_price is not None and default_price <= 0):
+        return jsonify({'error': '零售价必须大于0'}), 400
+    
+    def receive():
+        return db.session.execute(
+            text("SELECT * FROM proc_receive_new_books(:order_id, CAST(:prices AS JSONB), :default_price)"),
+            {"order_id": order_id, "prices": json.dumps(prices), "default_price": default_price}
+        ).fetchall()
+    
+    try:
+        received = run_in_transaction(receive)
+    except Exception as e:
+        message = procedure_error_message(e)
+        if message:
+            return jsonify({'error': message}), 400
+        return jsonify({'error': f'新书入库失败: {str(e)}'}), 500
+    
+    book_cache.invalidate(*{row.p_book_id for row in received})
+    aggregate_cache.invalidate()
+    
+    return jsonify({
+        'message': f'已入库 {len(received)} 条新书明细',
+        'received': [
+            {'detail_id': row.p_detail_id, 'book_id': row.p_book_id, 'merged': row.p_merged}
+            for row in received
+        ],
+        'order': load_purchase_order(order_id).to_dict()
+    })
+
 # 编辑进货单（仅限未付款状态）
 @purchase_bp.route('/<int:order_id>', methods=['PUT'])
 @login_required
@@ -194,62 +293,25 @@ def update_purchase_order(order_id):
         order.remark = data['remark']
     
     # 如果有明细更新
+    changes = None
     if 'details' in data:
-        # 先删除旧的明细
-        for detail in order.details:
-            db.session.delete(detail)
-        
-        # 添加新的明细
-        for detail in data['details']:
-            # 验证必填字段
-            required_fields = ['quantity', 'purchase_price']
-            for field in required_fields:
-                if field not in detail:
-                    db.session.rollback()
-                    return jsonify({'error': f'进货明细中缺少必填字段: {field}'}), 400
-            
-            # 处理已有图书的进货
-            if 'book_id' in detail:
-                book = Book.query.get(detail['book_id'])
-                if not book:
-                    db.session.rollback()
-                    return jsonify({'error': f'图书ID不存在: {detail["book_id"]}'}), 404
-                
-                new_detail = PurchaseDetail(
-                    order_id=order.order_id,
-                    book_id=detail['book_id'],
-                    quantity=detail['quantity'],
-                    purchase_price=detail['purchase_price'],
-                    is_new_book=False
-                )
-            # 处理新书的进货
-            else:
-                # 对于新书，需要提供基本信息
-                required_fields = ['isbn', 'title', 'author', 'publisher']
-                for field in required_fields:
-                    if field not in detail:
-                        db.session.rollback()
-                        return jsonify({'error': f'新书明细中缺少必填字段: {field}'}), 400
-                
-                new_detail = PurchaseDetail(
-                    order_id=order.order_id,
-                    isbn=detail['isbn'],
-                    title=detail['title'],
-                    author=detail['author'],
-                    publisher=detail['publisher'],
-                    quantity=detail['quantity'],
-                    purchase_price=detail['purchase_price'],
-                    is_new_book=True
-                )
-            
-            db.session.add(new_detail)
+        # 与原有明细比较，只写入变化的部分
+        try:
+            rows = build_detail_rows(data['details'])
+            changes = apply_detail_changes(order.order_id, data['details'], rows)
+        except DetailError as e:
+            db.session.rollback()
+            return jsonify({'error': e.message}), e.status
     
     try:
         db.session.commit()
-        return jsonify({
+        response = {
             'message': '进货单更新成功',
-            'order': order.to_dict()
-        })
+            'order': load_purchase_order(order_id).to_dict()
+        }
+        if changes is not None:
+            response['changes'] = changes
+        return jsonify(response)
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': f'更新进货单失败: {str(e)}'}), 500
@@ -272,7 +334,7 @@ def cancel_purchase_order(order_id):
         db.session.commit()
         return jsonify({
             'message': '进货单已退货',
-            'order': order.to_dict()
+            'order': load_purchase_order(order_id).to_dict()
         })
     except Exception as e:
         db.session.rollback()
@@ -1,21 +1,32 @@
 from flask import Blueprint, request, jsonify, session
-from backend.models import db, SaleRecord, Book, User
+from backend.models import db, SaleRecord, Book
 from backend.routes.user_routes import login_required
+from backend.pagination import get_page_args, keyset_paginate, PaginationError
+from backend.query_counter import query_budget
+from backend.streaming import wants_ndjson, ndjson_response
+from backend.book_cache import book_cache
+from backend.http_cache import conditional
+from backend.aggregate_cache import aggregate_cache, cached_aggregate
+from backend.report_views import view_freshness, live_freshness
+from backend.db_errors import procedure_error_message, is_stock_conflict, run_in_transaction
 from sqlalchemy import text, func
 from datetime import datetime
+import json
+import math
 
 sale_bp = Blueprint('sale_bp', __name__)
 
 # 获取所有销售记录
 @sale_bp.route('/', methods=['GET'])
 @login_required
+@query_budget(1)
 def get_all_sales():
     # 支持按日期范围和售货员筛选
     start_date = request.args.get('start_date')
     end_date = request.args.get('end_date')
     seller_id = request.args.get('seller_id')
     
-    query = SaleRecord.query
+    query = SaleRecord.query.options(*SaleRecord.load_options())
     
     if start_date:
         query = query.filter(SaleRecord.sale_time >= start_date)
@@ -24,18 +35,31 @@ def get_all_sales():
     if seller_id:
         query = query.filter(SaleRecord.seller_id == seller_id)
     
-    # 按销售时间倒序排序
-    sales = query.order_by(SaleRecord.sale_time.desc()).all()
+    # 流式导出（?format=ndjson），用于大范围对账
+    if wants_ndjson(request.args):
+        return ndjson_response(query.order_by(SaleRecord.sale_time.desc(), SaleRecord.sale_id.desc()))
     
-    return jsonify({
-        'sales': [sale.to_dict() for sale in sales]
-    })
+    # 按销售时间倒序排序，sale_id作为相同时间的次序
+    try:
+        limit, cursor = get_page_args()
+        sales, next_cursor = keyset_paginate(
+            query, [SaleRecord.sale_time, SaleRecord.sale_id], limit, cursor
+        )
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    response = {'sales': [sale.to_dict() for sale in sales]}
+    if limit is not None:
+        response['next_cursor'] = next_cursor
+    
+    return jsonify(response)
 
 # 获取单个销售记录详情
 @sale_bp.route('/<int:sale_id>', methods=['GET'])
 @login_required
+@query_budget(1)
 def get_sale(sale_id):
-    sale = SaleRecord.query.get(sale_id)
+    sale = SaleRecord.query.options(*SaleRecord.load_options()).filter_by(sale_id=sale_id).first()
     
     if not sale:
         return jsonify({'error': '销售记录不存在'}), 404
@@ -54,17 +78,18 @@ def create_sale():
         if field not in data:
             return jsonify({'error': f'缺少必填字段: {field}'}), 400
     
+    if not isinstance(data['quantity'], int) or data['quantity'] <= 0:
+        return jsonify({'error': '销售数量必须是正整数'}), 400
+    
     # 检查图书是否存在
-    book = Book.query.get(data['book_id'])
+    book = book_cache.get(data['book_id'])
     if not book:
         return jsonify({'error': '图书不存在'}), 404
     
-    # 检查库存是否足够
-    if book.stock < data['quantity']:
-        return jsonify({'error': f'库存不足，当前库存: {book.stock}, 需要: {data["quantity"]}'}), 400
+    # 缓存可能已过期（包括其他进程删除的图书），图书是否存在、库存是否足够由 proc_sell_book 在数据库中判断
     
-    try:
-        # 调用存储过程进行销售
+    def sell():
+        # 调用存储过程进行销售，返回销售ID
         result = db.session.execute(
             text("SELECT * FROM proc_sell_book(:p_book_id, :p_quantity, :p_seller_id, :p_sale_price, :p_remark)"),
             {
@@ -75,14 +100,16 @@ def create_sale():
                 "p_remark": data.get('remark', '')
             }
         )
-        
-        # 获取返回的销售ID
-        sale_id = result.fetchone()[0]
-        
-        db.session.commit()
+        return result.fetchone()[0]
+    
+    try:
+        # 死锁、锁等待超时时自动重试
+        sale_id = run_in_transaction(sell)
+        book_cache.invalidate(data['book_id'])
+        aggregate_cache.invalidate()
         
         # 获取新创建的销售记录
-        new_sale = SaleRecord.query.get(sale_id)
+        new_sale = SaleRecord.query.options(*SaleRecord.load_options()).filter_by(sale_id=sale_id).first()
         
         return jsonify({
             'message': '销售记录创建成功',
@@ -90,36 +117,116 @@ def create_sale():
         }), 201
     except Exception as e:
         db.session.rollback()
+        message = procedure_error_message(e)
+        if message:
+            # 库存不足是与其他销售的冲突，返回409
+            return jsonify({'error': message}), 409 if is_stock_conflict(e) else 400
         return jsonify({'error': f'创建销售记录失败: {str(e)}'}), 500
 
+# 批量销售（购物车结算），所有行在一个事务中完成
+@sale_bp.route('/batch', methods=['POST'])
+@login_required
+def create_sales_batch():
+    data = request.json or {}
+    items = data.get('items')
+    
+    if not items or not isinstance(items, list):
+        return jsonify({'error': '购物车不能为空'}), 400
+    
+    # 验证每一行
+    lines = []
+    required_fields = ['book_id', 'quantity', 'sale_price']
+    for index, item in enumerate(items, 1):
+        if not isinstance(item, dict):
+            return jsonify({'error': f'第{index}项格式不正确'}), 400
+        for field in required_fields:
+            if field not in item:
+                return jsonify({'error': f'第{index}项缺少必填字段: {field}'}), 400
+        try:
+            line = {
+                'book_id': int(item['book_id']),
+                'quantity': int(item['quantity']),
+                'sale_price': float(item['sale_price']),
+                'remark': item.get('remark', '')
+            }
+        except (TypeError, ValueError, OverflowError):
+            return jsonify({'error': f'第{index}项的图书ID、数量或价格格式不正确'}), 400
+        # NaN、Infinity 无法写入 JSONB，也不是有效的价格
+        if not math.isfinite(line['sale_price']):
+            return jsonify({'error': f'第{index}项的价格格式不正确'}), 400
+        if line['quantity'] <= 0:
+            return jsonify({'error': f'第{index}项的数量必须大于0'}), 400
+        lines.append(line)
+    
+    def sell_all():
+        # 调用批量销售存储过程：按图书ID顺序加锁，一次扣减库存并写入所有销售记录
+        result = db.session.execute(
+            text("SELECT p_line_no, p_sale_id FROM proc_sell_books(CAST(:p_items AS JSONB), :p_seller_id)"),
+            {"p_items": json.dumps(lines), "p_seller_id": session['user_id']}
+        )
+        return [row.p_sale_id for row in result]
+    
+    try:
+        sale_ids = run_in_transaction(sell_all)
+        book_cache.invalidate(*{line['book_id'] for line in lines})
+        aggregate_cache.invalidate()
+        
+        # 一次查询取回所有新建的销售记录，并按购物车顺序排列
+        sales = SaleRecord.query.options(*SaleRecord.load_options()).filter(SaleRecord.sale_id.in_(sale_ids)).all()
+        sales_by_id = {sale.sale_id: sale for sale in sales}
+        
+        return jsonify({
+            'message': f'结算成功，共{len(sale_ids)}项',
+            'sale_ids': sale_ids,
+            'sales': [sales_by_id[sale_id].to_dict() for sale_id in sale_ids if sale_id in sales_by_id]
+        }), 201
+    except Exception as e:
+        db.session.rollback()
+        message = procedure_error_message(e)
+        if message:
+            return jsonify({'error': message}), 409 if is_stock_conflict(e) else 400
+        return jsonify({'error': f'批量销售失败: {str(e)}'}), 500
+
+# 全部时间的销售统计直接读取物化视图
+SALES_STATISTICS_VIEW_SQL = text("""
+    SELECT book_id, isbn, title, author, total_sold, total_revenue
+    FROM view_sales_statistics
+    ORDER BY total_revenue DESC
+""")
+
 # 获取销售统计数据
 @sale_bp.route('/statistics', methods=['GET'])
 @login_required
+@conditional('book', 'sale_record', 'view_sales_statistics')
+@cached_aggregate
 def get_sales_statistics():
     # 支持按时间范围筛选
     start_date = request.args.get('start_date')
     end_date = request.args.get('end_date')
     
-    # 基本查询
-    query = db.session.query(
-        Book.book_id,
-        Book.isbn,
-        Book.title,
-        Book.author,
-        func.sum(SaleRecord.quantity).label('total_sold'),
-        func.sum(SaleRecord.quantity * SaleRecord.sale_price).label('total_revenue')
-    ).join(SaleRecord)
-    
-    # 添加日期过滤
-    if start_date:
-        query = query.filter(SaleRecord.sale_time >= start_date)
-    if end_date:
-        query = query.filter(SaleRecord.sale_time <= end_date)
-    
-    # 分组并排序
-    results = query.group_by(Book.book_id, Book.isbn, Book.title, Book.author).order_by(
-        func.sum(SaleRecord.quantity * SaleRecord.sale_price).desc()
-    ).all()
+    if not start_date and not end_date:
+        results = db.session.execute(SALES_STATISTICS_VIEW_SQL).fetchall()
+        freshness = view_freshness('view_sales_statistics')
+    else:
+        # 按时间范围实时统计（只扫描相关月份的分区）
+        query = db.session.query(
+            Book.book_id,
+            Book.isbn,
+            Book.title,
+            Book.author,
+            func.sum(SaleRecord.quantity).label('total_sold'),
+            func.sum(SaleRecord.quantity * SaleRecord.sale_price).label('total_revenue')
+        ).join(SaleRecord)
+        
+        if start_date:
+            query = query.filter(SaleRecord.sale_time >= start_date)
+        if end_date:
+            query = query.filter(SaleRecord.sale_time <= end_date)
+        
+        results = query.group_by(Book.book_id, Book.isbn, Book.title, Book.author).order_by(
+            func.sum(SaleRecord.quantity * SaleRecord.sale_price).desc()
+        ).all()
+        freshness = live_freshness()
     
     # 构建返回数据
     statistics = []
@@ -133,25 +240,20 @@ def get_sales_statistics():
             'total_revenue': float(r.total_revenue) if r.total_revenue else 0
         })
     
-    return jsonify({'statistics': statistics})
+    return jsonify({'statistics': statistics, 'freshness': freshness})
 
-# 获取用户销售业绩
+USER_PERFORMANCE_VIEW_SQL = text("""
+    SELECT user_id, username, real_name, total_sales, total_items_sold, total_revenue
+    FROM view_user_sales_performance
+    ORDER BY total_revenue DESC NULLS LAST
+""")
+
+# 获取用户销售业绩（读取物化视图）
 @sale_bp.route('/performance', methods=['GET'])
 @login_required
+@conditional('view_user_sales_performance')
 def get_user_performance():
-    # 查询所有用户的销售业绩
-    results = db.session.query(
-        User.user_id,
-        User.username,
-        User.real_name,
-        func.count(SaleRecord.sale_id).label('total_sales'),
-        func.sum(SaleRecord.quantity).label('total_items_sold'),
-        func.sum(SaleRecord.quantity * SaleRecord.sale_price).label('total_revenue')
-    ).outerjoin(SaleRecord, User.user_id == SaleRecord.seller_id).group_by(
-        User.user_id, User.username, User.real_name
-    ).order_by(
-        func.sum(SaleRecord.quantity * SaleRecord.sale_price).desc().nullslast()
-    ).all()
+    results = db.session.execute(USER_PERFORMANCE_VIEW_SQL).fetchall()
     
     # 构建返回数据
     performance = []
@@ -165,4 +267,7 @@ def get_user_performance():
             'total_revenue': float(r.total_revenue) if r.total_revenue else 0
         })
     
-    return jsonify({'performance': performance})
\ No newline at end of file
+    return jsonify({
+        'performance': performance,
+        'freshness': view_freshness('view_user_sales_performance')
+    })
\ No newline at end of file
@@ -1,33 +1,13 @@
 from flask import Blueprint, request, jsonify, session
 from backend.models import db, User
-import hashlib
-from functools import wraps
+from backend.passwords import password_hasher
+from backend.auth import (
+    login_required, admin_required, current_user, current_role,
+    issue_claim, clear_claim, auth_versions, ADMIN_ROLE
+)
 
 user_bp = Blueprint('user_bp', __name__)
 
-# 检查用户是否已登录的装饰器
-def login_required(f):
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        if 'user_id' not in session:
-            return jsonify({'error': '请先登录'}), 401
-        return f(*args, **kwargs)
-    return decorated_function
-
-# 检查是否是超级管理员的装饰器
-def admin_required(f):
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        if 'user_id' not in session:
-            return jsonify({'error': '请先登录'}), 401
-        
-        user = User.query.get(session['user_id'])
-        if not user or user.role != '超级管理员':
-            return jsonify({'error': '需要超级管理员权限'}), 403
-        
-        return f(*args, **kwargs)
-    return decorated_function
-
 # 用户登录
 @user_bp.route('/login', methods=['POST'])
 def login():
@@ -39,12 +19,29 @@ def login():
         return jsonify({'error': '用户名和密码不能为空'}), 400
     
     user = User.query.filter_by(username=username).first()
+    stored = user.password if user else None
     
-    if not user or not user.check_password(password):
+    # 先归还数据库连接再计算哈希，登录高峰时不占用连接池（已加载的属性仍可使用）
+    db.session.close()
+    
+    if not password_hasher.verify(stored, password):
         return jsonify({'error': '用户名或密码错误'}), 401
     
-    session['user_id'] = user.user_id
-    session['role'] = user.role
+    # 旧的 MD5 哈希或成本参数已调整：用当前配置重新计算
+    if password_hasher.needs_rehash(stored):
+        new_hash = password_hasher.hash(password)
+        try:
+            # 条件中带上旧哈希，期间密码被修改时不覆盖
+            User.query.filter_by(user_id=user.user_id, password=stored).update(
+                {'password': new_hash}, synchronize_session=False
+            )
+            db.session.commit()
+        except Exception:
+            # 升级失败不影响本次登录，下次登录时再试
+            db.session.rollback()
+    
+    issue_claim(user)
+    auth_versions.set(user.user_id, user.auth_version)
     
     return jsonify({
         'message': '登录成功',
@@ -54,15 +51,14 @@ def login():
 # 用户登出
 @user_bp.route('/logout', methods=['POST'])
 def logout():
-    session.pop('user_id', None)
-    session.pop('role', None)
+    clear_claim()
     return jsonify({'message': '已成功登出'})
 
 # 获取当前用户信息
 @user_bp.route('/profile', methods=['GET'])
 @login_required
 def get_profile():
-    user = User.query.get(session['user_id'])
+    user = current_user()
     if not user:
         return jsonify({'error': '用户不存在'}), 404
     
@@ -121,11 +117,12 @@ def create_user():
 @login_required
 def update_user(user_id):
     # 检查权限
-    current_user = User.query.get(session['user_id'])
-    if current_user.user_id != user_id and current_user.role != '超级管理员':
+    is_admin = current_role() == ADMIN_ROLE
+    if session['user_id'] != user_id and not is_admin:
         return jsonify({'error': '没有权限修改此用户信息'}), 403
     
-    user = User.query.get(user_id)
+    # 修改自己的信息时复用本次请求已加载的用户
+    user = current_user() if session['user_id'] == user_id else User.query.get(user_id)
     if not user:
         return jsonify({'error': '用户不存在'}), 404
     
@@ -142,8 +139,12 @@ def update_user(user_id):
         user.age = data['age']
     
     # 只有超级管理员可以更新角色
-    if 'role' in data and current_user.role == '超级管理员':
+    role_changed = False
+    if 'role' in data and is_admin and data['role'] != user.role:
         user.role = data['role']
+        # 该用户已登录的会话需要重新签发授权声明
+        user.auth_version = User.auth_version + 1
+        role_changed = True
     
     # 更新密码需要单独处理
     if 'password' in data:
@@ -151,6 +152,10 @@ def update_user(user_id):
     
     try:
         db.session.commit()
+        if role_changed:
+            auth_versions.set(user.user_id, user.auth_version)
+            if user.user_id == session['user_id']:
+                issue_claim(user)
         return jsonify({
             'message': '用户信息更新成功',
             'user': user.to_dict()
@@ -176,6 +181,8 @@ def delete_user(user_id):
     
     try:
         db.session.commit()
+        # 被删除用户的会话在下一次请求时失效
+        auth_versions.remove(user_id)
         return jsonify({'message': '用户删除成功'})
     except Exception as e:
         db.session.rollback()
@@ -0,0 +1,65 @@
+import re
+from sqlalchemy import func, or_, literal_column
+from backend.models import Book
+
+# 形如ISBN的关键词（10或13位数字，可带连字符，末位可为X）
+ISBN_PATTERN = re.compile(r'^(?=(?:[0-9Xx]-?){10}$|(?:[0-9]-?){13}$)[0-9Xx-]+$')
+
+# 三元组至少3个字符，更短的关键词（如“数据”“中国”）无法用三元组索引过滤，
+# 改为逐行子串匹配（图书表规模有限，顺序扫描的代价可以接受）
+TRIGRAM_MIN_LENGTH = 3
+
+# 与 idx_book_search_trgm 的索引表达式完全一致，查询才能使用该索引
+SEARCH_TEXT = literal_column("(title || ' ' || author || ' ' || publisher || ' ' || isbn)")
+
+def escape_like(value):
+    # 转义 LIKE 通配符，避免用户输入的 % 和 _ 被当作通配符
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+def prefix_search(prefix, limit):
+    """书名或作者前缀匹配（lower(...) text_pattern_ops 索引）"""
+    pattern = escape_like(prefix.lower()) + '%'
+    return Book.query.filter(
+        or_(
+            func.lower(Book.title).like(pattern, escape='\\'),
+            func.lower(Book.author).like(pattern, escape='\\')
+        )
+    ).order_by(func.lower(Book.title), Book.book_id).limit(limit).all()
+
+def search_books(keyword, limit=None):
+    """
+    图书搜索，按代价从低到高依次尝试：
+    1. 关键词形如ISBN时先按ISBN精确匹配（唯一索引）
+    2. 以 * 结尾时按书名或作者前缀匹配（lower(...) text_pattern_ops 索引）
+    3. 不足3个字符时在书名、作者、出版社、ISBN中做子串匹配，按书名排序
+    4. 否则在书名、作者、出版社、ISBN拼接的文本中做子串匹配，
+       按关键词与文本的词相似度距离（<->>）排序。过滤和排序都由同一个
+       GiST 三元组索引完成（KNN 扫描），只读取前 limit 条，不需要先取出全部匹配再排序
+    limit 为 None 时返回全部匹配。
+    """
+    keyword = keyword.strip()
+
+    if ISBN_PATTERN.match(keyword):
+        candidates = {keyword, keyword.replace('-', '').upper()}
+        books = Book.query.filter(Book.isbn.in_(candidates)).limit(limit).all()
+        if books:
+            return books
+
+    if keyword.endswith('*') and len(keyword) > 1:
+        return prefix_search(keyword[:-1], limit)
+
+    pattern = f'%{escape_like(keyword)}%'
+
+    if len(keyword) < TRIGRAM_MIN_LENGTH:
+        return Book.query.filter(
+            or_(
+                Book.title.ilike(pattern, escape='\\'),
+                Book.author.ilike(pattern, escape='\\'),
+                Book.publisher.ilike(pattern, escape='\\'),
+                Book.isbn.ilike(pattern, escape='\\')
+            )
+        ).order_by(Book.title, Book.book_id).limit(limit).all()
+
+    return Book.query.filter(
+        SEARCH_TEXT.ilike(pattern, escape='\\')
+    ).order_by(SEARCH_TEXT.op('<->>')(keyword)).limit(limit).all()
@@ -0,0 +1,107 @@
+import gzip
+import mimetypes
+import os
+from flask import request, send_file, abort
+
+try:
+    from werkzeug.utils import safe_join
+except ImportError:  # Werkzeug 2.0 以前位于 security 模块
+    from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:  # 可选依赖，没有安装时只生成 gzip
+    brotli = None
+
+# 预压缩文件的扩展名，按优先顺序
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+
+# 需要预压缩的文本类资源
+COMPRESSIBLE_EXTENSIONS = ('.html', '.css', '.js', '.json', '.svg', '.txt')
+
+def _accepted_encodings():
+    header = request.headers.get('Accept-Encoding', '')
+    return {part.split(';')[0].strip() for part in header.split(',')}
+
+def _send_static(frontend_dir, path, max_age, precompressed):
+    full_path = safe_join(frontend_dir, path)
+    if full_path is None or not os.path.isfile(full_path):
+        abort(404)
+
+    # HTML 每次向服务器确认（ETag / Last-Modified 未变时返回304），其他资源按 max_age 缓存
+    if path.endswith('.html'):
+        cache_seconds = 0
+    else:
+        cache_seconds = max_age
+
+    mimetype = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+    encoding = None
+    if precompressed:
+        accepted = _accepted_encodings()
+        for name, suffix in ENCODINGS:
+            candidate = full_path + suffix
+            # 压缩文件比原文件旧时说明原文件已修改，不再使用
+            if name in accepted and os.path.isfile(candidate) \
+                    and os.path.getmtime(candidate) >= os.path.getmtime(full_path):
+                full_path, encoding = candidate, name
+                break
+
+    response = send_file(full_path, mimetype=mimetype, conditional=True, etag=True, max_age=cache_seconds)
+    if cache_seconds == 0:
+        response.headers['Cache-Control'] = 'no-cache'
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    if precompressed:
+        response.vary.add('Accept-Encoding')
+    return response
+
+def init_static_files(app, frontend_dir):
+    """
+    由 Flask 提供前端文件（SERVE_STATIC=0 时不注册，交给 Nginx 等前置服务器）。
+    STATIC_MAX_AGE 为 css/js 等资源的缓存秒数；STATIC_PRECOMPRESSED=1 时
+    优先返回 flask static compress 生成的 .br / .gz 文件。
+    """
+    app.config.setdefault('FRONTEND_DIR', frontend_dir)
+    app.config.setdefault('SERVE_STATIC', os.getenv('SERVE_STATIC', '1') == '1')
+    app.config.setdefault('STATIC_MAX_AGE', int(os.getenv('STATIC_MAX_AGE', 86400)))
+    app.config.setdefault('STATIC_PRECOMPRESSED', os.getenv('STATIC_PRECOMPRESSED', '1') == '1')
+
+    if not app.config['SERVE_STATIC']:
+        return
+
+    def serve(path):
+        return _send_static(
+            app.config['FRONTEND_DIR'], path,
+            app.config['STATIC_MAX_AGE'], app.config['STATIC_PRECOMPRESSED']
+        )
+
+    @app.route('/')
+    def serve_index():
+        return serve('index.html')
+
+    @app.route('/<path:path>')
+    def serve_static_files(path):
+        return serve(path)
+
+def compress_static_files(frontend_dir, level=9):
+    """为前端文本资源生成 .gz（以及安装了 brotli 时的 .br）文件，返回生成的文件数"""
+    written = 0
+    for root, _, files in os.walk(frontend_dir):
+        for name in files:
+            if not name.endswith(COMPRESSIBLE_EXTENSIONS):
+                continue
+            path = os.path.join(root, name)
+            with open(path, 'rb') as f:
+                data = f.read()
+
+            outputs = [('.gz', gzip.compress(data, compresslevel=level, mtime=0))]
+            if brotli is not None:
+                outputs.append(('.br', brotli.compress(data, quality=11)))
+            for suffix, compressed in outputs:
+                # 压缩后没有变小的文件不保留
+                if len(compressed) >= len(data):
+                    continue
+                with open(path + suffix, 'wb') as f:
+                    f.write(compressed)
+                written += 1
+    return written
@@ -0,0 +1,29 @@
+from flask import Response, json, stream_with_context
+
+# 服务器端游标每批读取的行数，同时也是每次写出的行数
+STREAM_BATCH_SIZE = 1000
+
+def wants_ndjson(args):
+    return args.get('format') == 'ndjson'
+
+def ndjson_response(query, serialize=None):
+    """
+    以 NDJSON（每行一个JSON对象）流式返回查询结果。
+    通过 yield_per 使用服务器端游标分批读取，每批序列化后立即写出，
+    内存占用只与批大小有关，与结果总行数无关。
+    """
+    if serialize is None:
+        serialize = lambda obj: obj.to_dict()
+
+    def generate():
+        lines = []
+        for obj in query.yield_per(STREAM_BATCH_SIZE):
+            lines.append(json.dumps(serialize(obj)))
+            if len(lines) >= STREAM_BATCH_SIZE:
+                yield '\n'.join(lines) + '\n'
+                lines = []
+        if lines:
+            yield '\n'.join(lines) + '\n'
+
+    # stream_with_context 保证生成器运行期间请求上下文和数据库会话仍然有效
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
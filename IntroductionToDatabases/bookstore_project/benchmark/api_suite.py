@@ -0,0 +1,509 @@
+"""
+端到端接口基准测试：对 create_app 注册的每个接口发送请求，分别经过 Flask 测试客户端（进程内）
+和真实的 HTTP 服务器（werkzeug，本进程内的线程），统计每个接口的
+p50/p95/p99 耗时、每个请求的SQL语句数（X-Query-Count）和进程内存（RSS），
+结果写入 JSON 文件，可以在不同提交之间比较。
+
+先用 benchmark.seed 生成数据（会真实提交，请用 BENCH_DATABASE_URI 指向测试库）：
+
+    python -m benchmark.seed --books 20000 --sales 500000
+    python -m benchmark.api_suite --requests 50 --output bench-$(git rev-parse --short HEAD).json
+    python -m benchmark.api_suite --compare bench-old.json bench-new.json
+
+写接口（销售、进货、付款、删除等）同样会执行，每次请求前在计时之外准备好需要的数据
+（例如先创建一张进货单再计时付款）。新增的接口需要在 SCENARIOS 中加入请求，
+未覆盖的接口会在结果的 uncovered 中列出。
+
+默认保留应用内的缓存（与线上一致）；--cold 关闭图书缓存、统计结果缓存和仪表盘快照，
+每次请求都查询数据库，便于比较SQL本身的变化。
+"""
+import argparse
+import http.cookiejar
+import json
+import logging
+import os
+import platform
+import secrets
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import date, datetime, timedelta
+from sqlalchemy import text
+from benchmark.common import get_engine, percentile, print_table
+from benchmark.seed import ADMIN_USERNAME, SEED_PASSWORD
+
+MODES = ('client', 'http')
+
+def current_rss_kb():
+    """当前进程的常驻内存（KB）；没有 /proc 时退回为峰值内存"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 的单位是字节
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+def build_app(cold):
+    # 必须在导入 backend.app 之前设置，create_app 从环境变量读取配置
+    os.environ['SQL_QUERY_COUNT'] = '1'
+    # 物化视图由 benchmark.seed 刷新，测试期间不在后台刷新，避免干扰耗时
+    os.environ['REPORT_REFRESH_INTERVAL'] = '0'
+    if os.getenv('BENCH_DATABASE_URI'):
+        os.environ['DATABASE_URI'] = os.environ['BENCH_DATABASE_URI']
+    if cold:
+        os.environ['BOOK_CACHE_SIZE'] = '0'
+        os.environ['AGGREGATE_CACHE_TTL'] = '0'
+        os.environ['DASHBOARD_SNAPSHOT_TTL'] = '0'
+
+    from backend.app import create_app
+    return create_app()
+
+class ClientSession:
+    """Flask 测试客户端，进程内调用，不经过网络"""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, json_body=None, data=None, content_type=None):
+        response = self.client.open(path, method=method, json=json_body, data=data, content_type=content_type)
+        return response.status_code, response.headers, response.get_data()
+
+class HttpSession:
+    """通过 urllib 访问 HTTP 服务器，每个会话有自己的 Cookie"""
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar())
+        )
+
+    def request(self, method, path, json_body=None, data=None, content_type=None):
+        if json_body is not None:
+            data, content_type = json.dumps(json_body).encode(), 'application/json'
+        elif isinstance(data, str):
+            data = data.encode()
+        headers = {'Content-Type': content_type} if content_type else {}
+        req = urllib.request.Request(self.base_url + path, data=data, method=method, headers=headers)
+        try:
+            with self.opener.open(req) as response:
+                return response.status, response.headers, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.headers, e.read()
+
+class HttpServer:
+    """在后台线程中运行多线程的 werkzeug 服务器，监听随机端口"""
+
+    def __init__(self, app):
+        from werkzeug.serving import make_server
+        logging.getLogger('werkzeug').setLevel(logging.ERROR)
+        self.server = make_server('127.0.0.1', 0, app, threaded=True)
+        self.thread = threading.Thread(target=self.server.serve_forever, name='bench-http', daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return f'http://127.0.0.1:{self.server.server_port}'
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.thread.join()
+
+FIXTURES_SQL = {
+    # 编号最小的图书最热门（见 benchmark.seed 的热度偏斜），库存充足，可以反复销售
+    'book_ids': """
+        SELECT array_agg(book_id) FROM (
+            SELECT book_id FROM book WHERE isbn ~ '^SEED-[0-9]+$' AND stock >= 1000 ORDER BY book_id LIMIT 3
+        ) AS t
+    """,
+    'seller_id': """SELECT MIN(user_id) FROM "user" WHERE username LIKE 'seed\\_seller\\_%'""",
+    'seller_username': """SELECT MIN(username) FROM "user" WHERE username LIKE 'seed\\_seller\\_%'""",
+    'sale_id': "SELECT MAX(sale_id) FROM sale_record WHERE remark = 'seed'",
+    'order_id': "SELECT MAX(order_id) FROM purchase_order WHERE remark = 'seed' AND status = '已付款'",
+}
+
+DATASET_SQL = {
+    'books': 'SELECT COUNT(*) FROM book',
+    'sales': 'SELECT COUNT(*) FROM sale_record',
+    'purchase_orders': 'SELECT COUNT(*) FROM purchase_order',
+    'purchase_details': 'SELECT COUNT(*) FROM purchase_detail',
+    'financial_records': 'SELECT COUNT(*) FROM financial_record',
+    'users': 'SELECT COUNT(*) FROM "user"',
+}
+
+def load_fixtures(engine):
+    with engine.connect() as conn:
+        fixtures = {name: conn.execute(text(sql)).scalar() for name, sql in FIXTURES_SQL.items()}
+        dataset = {name: conn.execute(text(sql)).scalar() for name, sql in DATASET_SQL.items()}
+    if not fixtures['book_ids'] or fixtures['sale_id'] is None or fixtures['order_id'] is None:
+        raise SystemExit('测试库中没有生成的数据，请先执行 python -m benchmark.seed')
+    return fixtures, dataset
+
+class Context:
+    """一次测试运行的会话和数据：admin 以超级管理员登录，anon 未登录，其他会话以售货员登录"""
+
+    def __init__(self, new_session, fixtures, mode):
+        self.new_session = new_session
+        self.fixtures = fixtures
+        # 本次运行创建的用户名、ISBN 的后缀，避免与之前的运行冲突（ISBN 最长20个字符）
+        self.tag = mode[0] + secrets.token_hex(2)
+        self.sessions = {}
+
+    def session(self, name):
+        if name not in self.sessions:
+            session = self.new_session()
+            if name == 'admin':
+                self.login(session, ADMIN_USERNAME)
+            elif name != 'anon':
+                self.login(session, self.fixtures['seller_username'])
+            self.sessions[name] = session
+        return self.sessions[name]
+
+    def login(self, session, username):
+        status, _, body = session.request('POST', '/api/users/login',
+                                          json_body={'username': username, 'password': SEED_PASSWORD})
+        if status != 200:
+            raise RuntimeError(f'{username} 登录失败: {status} {body[:200]!r}')
+
+    def call(self, method, path, json_body=None, key=None):
+        """准备数据用的请求（不计时），返回响应 JSON 中 key 对应的对象"""
+        status, _, body = self.session('admin').request(method, path, json_body=json_body)
+        if status >= 400:
+            raise RuntimeError(f'准备数据失败: {method} {path} {status} {body[:200]!r}')
+        data = json.loads(body)
+        return data[key] if key else data
+
+    @property
+    def book_id(self):
+        return self.fixtures['book_ids'][0]
+
+    def new_book_detail(self, i, suffix):
+        return {
+            'isbn': f'SEED-API-{self.tag}-{i}{suffix}', 'title': f'接口测试新书 {i}{suffix}',
+            'author': 'benchmark', 'publisher': 'benchmark', 'quantity': 5, 'purchase_price': 20
+        }
+
+    def create_order(self, details, pay=False):
+        order = self.call('POST', '/api/purchases/', {'details': details, 'remark': 'api_suite'}, 'order')
+        if pay:
+            order = self.call('POST', f"/api/purchases/{order['order_id']}/pay", key='order')
+        return order
+
+def query(path, **params):
+    return f'{path}?{urllib.parse.urlencode(params)}' if params else path
+
+def last_month():
+    end = date.today().replace(day=1)
+    return (end - timedelta(days=1)).replace(day=1).isoformat(), end.isoformat()
+
+def relogin_then_logout(ctx, i):
+    ctx.login(ctx.session('logout'), ctx.fixtures['seller_username'])
+    return 'POST', '/api/users/logout', None
+
+def delete_new_user(ctx, i):
+    user = ctx.call('POST', '/api/users/', {
+        'username': f'seed_api_{ctx.tag}_d{i}', 'password': SEED_PASSWORD, 'real_name': '接口测试',
+        'employee_id': f'APID{i}', 'gender': '女', 'role': '普通管理员'
+    }, 'user')
+    return 'DELETE', f"/api/users/{user['user_id']}", None
+
+def delete_new_book(ctx, i):
+    book = ctx.call('POST', '/api/books/', {
+        'isbn': f'SEED-API-{ctx.tag}-{i}d', 'title': f'待删除图书 {i}', 'author': 'benchmark',
+        'publisher': 'benchmark', 'retail_price': 30
+    }, 'book')
+    return 'DELETE', f"/api/books/{book['book_id']}", None
+
+def pay_new_order(ctx, i):
+    order = ctx.create_order([{'book_id': ctx.book_id, 'quantity': 10, 'purchase_price': 20}])
+    return 'POST', f"/api/purchases/{order['order_id']}/pay", None
+
+def add_new_book_to_stock(ctx, i):
+    order = ctx.create_order([ctx.new_book_detail(i, 'a')], pay=True)
+    return 'POST', f"/api/purchases/detail/{order['details'][0]['detail_id']}/add-to-stock", {'retail_price': 39.8}
+
+def receive_new_books(ctx, i):
+    order = ctx.create_order([ctx.new_book_detail(i, 'r'), ctx.new_book_detail(i, 's')], pay=True)
+    return 'POST', f"/api/purchases/{order['order_id']}/receive-new-books", {'default_retail_price': 39.8}
+
+def update_new_order(ctx, i):
+    order = ctx.create_order([{'book_id': ctx.book_id, 'quantity': 10, 'purchase_price': 20}])
+    return 'PUT', f"/api/purchases/{order['order_id']}", {'remark': 'api_suite 修改', 'details': [
+        {'book_id': ctx.book_id, 'quantity': 12, 'purchase_price': 20},
+        {'book_id': ctx.fixtures['book_ids'][1], 'quantity': 5, 'purchase_price': 18}
+    ]}
+
+def cancel_new_order(ctx, i):
+    order = ctx.create_order([{'book_id': ctx.book_id, 'quantity': 10, 'purchase_price': 20}])
+    return 'POST', f"/api/purchases/{order['order_id']}/cancel", None
+
+# 每个场景：(端点, 标签, 会话, 构造请求的函数)
+# 构造函数接收 (ctx, i)，可以先用 ctx.call 准备数据（不计时），返回 (方法, 路径, JSON请求体或 None)；
+# 写接口的构造函数（上面的 *_new_* 等）每次先创建一份新数据，保证每个计时的请求都能成功
+SCENARIOS = [
+    ('user_bp.login', 'POST /api/users/login', 'anon',
+     lambda ctx, i: ('POST', '/api/users/login',
+                     {'username': ctx.fixtures['seller_username'], 'password': SEED_PASSWORD})),
+    ('user_bp.logout', 'POST /api/users/logout', 'logout', relogin_then_logout),
+    ('user_bp.get_profile', 'GET /api/users/profile', 'admin',
+     lambda ctx, i: ('GET', '/api/users/profile', None)),
+    ('user_bp.get_all_users', 'GET /api/users/', 'admin',
+     lambda ctx, i: ('GET', '/api/users/', None)),
+    ('user_bp.create_user', 'POST /api/users/', 'admin',
+     lambda ctx, i: ('POST', '/api/users/', {
+         'username': f'seed_api_{ctx.tag}_{i}', 'password': SEED_PASSWORD, 'real_name': '接口测试',
+         'employee_id': f'API{i}', 'gender': '男', 'role': '普通管理员'
+     })),
+    ('user_bp.update_user', 'PUT /api/users/<id>', 'admin',
+     lambda ctx, i: ('PUT', f"/api/users/{ctx.fixtures['seller_id']}", {'age': 25 + i % 10})),
+    ('user_bp.delete_user', 'DELETE /api/users/<id>', 'admin', delete_new_user),
+
+    ('book_bp.get_all_books', 'GET /api/books/?limit=20', 'admin',
+     lambda ctx, i: ('GET', query('/api/books/', limit=20), None)),
+    ('book_bp.get_all_books', 'GET /api/books/?search=', 'admin',
+     lambda ctx, i: ('GET', query('/api/books/', search='数据库', limit=20), None)),
+    ('book_bp.get_book', 'GET /api/books/<id>', 'admin',
+     lambda ctx, i: ('GET', f'/api/books/{ctx.book_id}', None)),
+    ('book_bp.create_book', 'POST /api/books/', 'admin',
+     lambda ctx, i: ('POST', '/api/books/', {
+         'isbn': f'SEED-API-{ctx.tag}-{i}', 'title': f'接口测试图书 {i}', 'author': 'benchmark',
+         'publisher': 'benchmark', 'retail_price': 30, 'stock': 10
+     })),
+    ('book_bp.update_book', 'PUT /api/books/<id>', 'admin',
+     lambda ctx, i: ('PUT', f'/api/books/{ctx.book_id}', {'retail_price': 30 + i % 5})),
+    ('book_bp.delete_book', 'DELETE /api/books/<id>', 'admin', delete_new_book),
+    ('book_bp.get_low_stock_books', 'GET /api/books/low-stock', 'admin',
+     lambda ctx, i: ('GET', '/api/books/low-stock', None)),
+    ('book_bp.get_book_cache_stats', 'GET /api/books/cache-stats', 'admin',
+     lambda ctx, i: ('GET', '/api/books/cache-stats', None)),
+
+    ('sale_bp.get_all_sales', 'GET /api/sales/?limit=20', 'admin',
+     lambda ctx, i: ('GET', query('/api/sales/', limit=20), None)),
+    ('sale_bp.get_all_sales', 'GET /api/sales/?seller_id=', 'admin',
+     lambda ctx, i: ('GET', query('/api/sales/', seller_id=ctx.fixtures['seller_id'], limit=20), None)),
+    ('sale_bp.get_sale', 'GET /api/sales/<id>', 'admin',
+     lambda ctx, i: ('GET', f"/api/sales/{ctx.fixtures['sale_id']}", None)),
+    ('sale_bp.create_sale', 'POST /api/sales/', 'seller',
+     lambda ctx, i: ('POST', '/api/sales/', {'book_id': ctx.book_id, 'quantity': 1, 'sale_price': 30})),
+    ('sale_bp.create_sales_batch', 'POST /api/sales/batch', 'seller',
+     lambda ctx, i: ('POST', '/api/sales/batch', {'items': [
+         {'book_id': book_id, 'quantity': 1, 'sale_price': 30} for book_id in ctx.fixtures['book_ids']
+     ]})),
+    ('sale_bp.get_sales_statistics', 'GET /api/sales/statistics', 'admin',
+     lambda ctx, i: ('GET', '/api/sales/statistics', None)),
+    ('sale_bp.get_sales_statistics', 'GET /api/sales/statistics?start_date=', 'admin',
+     lambda ctx, i: ('GET', query('/api/sales/statistics', start_date=last_month()[0], end_date=last_month()[1]), None)),
+    ('sale_bp.get_user_performance', 'GET /api/sales/performance', 'admin',
+     lambda ctx, i: ('GET', '/api/sales/performance', None)),
+
+    ('purchase_bp.get_all_purchase_orders', 'GET /api/purchases/?limit=20', 'admin',
+     lambda ctx, i: ('GET', query('/api/purchases/', limit=20), None)),
+    ('purchase_bp.get_all_purchase_orders', 'GET /api/purchases/?status=未付款', 'admin',
+     lambda ctx, i: ('GET', query('/api/purchases/', status='未付款', limit=20), None)),
+    ('purchase_bp.get_purchase_order', 'GET /api/purchases/<id>', 'admin',
+     lambda ctx, i: ('GET', f"/api/purchases/{ctx.fixtures['order_id']}", None)),
+    ('purchase_bp.get_purchase_statistics', 'GET /api/purchases/statistics', 'admin',
+     lambda ctx, i: ('GET', '/api/purchases/statistics', None)),
+    ('purchase_bp.create_purchase_order', 'POST /api/purchases/', 'admin',
+     lambda ctx, i: ('POST', '/api/purchases/', {'remark': 'api_suite', 'details': [
+         {'book_id': ctx.book_id, 'quantity': 10, 'purchase_price': 20},
+         ctx.new_book_detail(i, 'c')
+     ]})),
+    ('purchase_bp.import_purchase_manifest', 'POST /api/purchases/import', 'admin',
+     lambda ctx, i: ('POST', '/api/purchases/import', {'remark': 'api_suite', 'details': [
+         {'isbn': f'SEED-{1:09d}', 'quantity': 10, 'purchase_price': 20},
+         ctx.new_book_detail(i, 'i')
+     ]})),
+    ('purchase_bp.pay_purchase_order', 'POST /api/purchases/<id>/pay', 'admin', pay_new_order),
+    ('purchase_bp.add_new_book_to_stock', 'POST /api/purchases/detail/<id>/add-to-stock', 'admin',
+     add_new_book_to_stock),
+    ('purchase_bp.receive_new_books', 'POST /api/purchases/<id>/receive-new-books', 'admin',
+     receive_new_books),
+    ('purchase_bp.update_purchase_order', 'PUT /api/purchases/<id>', 'admin', update_new_order),
+    ('purchase_bp.cancel_purchase_order', 'POST /api/purchases/<id>/cancel', 'admin', cancel_new_order),
+
+    ('finance_bp.get_all_financial_records', 'GET /api/finance/?limit=20', 'admin',
+     lambda ctx, i: ('GET', query('/api/finance/', limit=20), None)),
+    ('finance_bp.get_monthly_statistics', 'GET /api/finance/monthly', 'admin',
+     lambda ctx, i: ('GET', query('/api/finance/monthly', year=date.today().year), None)),
+    ('finance_bp.get_finance_summary', 'GET /api/finance/summary', 'admin',
+     lambda ctx, i: ('GET', '/api/finance/summary', None)),
+    ('finance_bp.get_sales_profit', 'GET /api/finance/sales-profit', 'admin',
+     lambda ctx, i: ('GET', '/api/finance/sales-profit', None)),
+    ('finance_bp.get_sales_profit', 'GET /api/finance/sales-profit?cost_method=fifo', 'admin',
+     lambda ctx, i: ('GET', query('/api/finance/sales-profit', cost_method='fifo'), None)),
+
+    ('dashboard_bp.get_overview', 'GET /api/dashboard/overview', 'admin',
+     lambda ctx, i: ('GET', '/api/dashboard/overview', None)),
+    ('dashboard_bp.get_sales_ranking', 'GET /api/dashboard/sales-ranking', 'admin',
+     lambda ctx, i: ('GET', '/api/dashboard/sales-ranking', None)),
+    ('dashboard_bp.get_db_pool_status', 'GET /api/dashboard/db-pool', 'admin',
+     lambda ctx, i: ('GET', '/api/dashboard/db-pool', None)),
+    ('dashboard_bp.get_aggregate_cache_stats', 'GET /api/dashboard/aggregate-cache', 'admin',
+     lambda ctx, i: ('GET', '/api/dashboard/aggregate-cache', None)),
+    ('dashboard_bp.get_report_views_status', 'GET /api/dashboard/report-views', 'admin',
+     lambda ctx, i: ('GET', '/api/dashboard/report-views', None)),
+]
+
+def uncovered_endpoints(app):
+    covered = {endpoint for endpoint, _, _, _ in SCENARIOS}
+    return sorted(
+        f"{','.join(sorted(rule.methods - {'HEAD', 'OPTIONS'}))} {rule.rule}"
+        for rule in app.url_map.iter_rules()
+        if rule.endpoint != 'static' and rule.endpoint not in covered
+    )
+
+def run_scenario(ctx, scenario, requests, warmup):
+    endpoint, label, session_name, build = scenario
+    session = ctx.session(session_name)
+    timings, queries, statuses = [], [], {}
+
+    for i in range(warmup + requests):
+        method, path, body = build(ctx, i)
+        start = time.perf_counter()
+        status, headers, _ = session.request(method, path, json_body=body)
+        elapsed = (time.perf_counter() - start) * 1000
+        if i < warmup:
+            continue
+        timings.append(elapsed)
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+        if headers.get('X-Query-Count') is not None:
+            queries.append(int(headers['X-Query-Count']))
+
+    timings.sort()
+    return {
+        'endpoint': endpoint,
+        'label': label,
+        'requests': requests,
+        'errors': sum(count for status, count in statuses.items() if int(status) >= 400),
+        'status': statuses,
+        'p50_ms': round(percentile(timings, 0.50), 3),
+        'p95_ms': round(percentile(timings, 0.95), 3),
+        'p99_ms': round(percentile(timings, 0.99), 3),
+        'mean_ms': round(statistics.mean(timings), 3),
+        'queries_median': statistics.median(queries) if queries else None,
+        'queries_max': max(queries) if queries else None,
+        'rss_kb': current_rss_kb(),
+    }
+
+def run_mode(mode, app, fixtures, args):
+    if mode == 'client':
+        return run_scenarios(lambda: ClientSession(app), fixtures, mode, args)
+    with HttpServer(app) as base_url:
+        return run_scenarios(lambda: HttpSession(base_url), fixtures, mode, args)
+
+def run_scenarios(new_session, fixtures, mode, args):
+    ctx = Context(new_session, fixtures, mode)
+    results = []
+    for scenario in SCENARIOS:
+        if args.only and args.only not in scenario[1]:
+            continue
+        result = run_scenario(ctx, scenario, args.requests, args.warmup)
+        result['mode'] = mode
+        results.append(result)
+        print(f"  [{mode}] {result['label']}: p50 {result['p50_ms']:.1f}ms, "
+              f"p95 {result['p95_ms']:.1f}ms, SQL {result['queries_median']}, 错误 {result['errors']}")
+    return results
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(old_path, new_path, threshold):
+    """按 (模式, 接口) 对比两次结果，p95 变慢超过 threshold 或SQL语句数增加的接口标记出来"""
+    with open(old_path, encoding='utf-8') as f:
+        old = {(r['mode'], r['label']): r for r in json.load(f)['results']}
+    with open(new_path, encoding='utf-8') as f:
+        new = {(r['mode'], r['label']): r for r in json.load(f)['results']}
+
+    rows = []
+    regressions = 0
+    for key in sorted(old.keys() & new.keys()):
+        before, after = old[key], new[key]
+        change = after['p95_ms'] / before['p95_ms'] - 1 if before['p95_ms'] else 0
+        more_queries = (after['queries_max'] or 0) > (before['queries_max'] or 0)
+        flag = '变慢' if change > threshold else ('变快' if change < -threshold else '')
+        if more_queries:
+            flag = (flag + ' SQL增加').strip()
+        if change > threshold or more_queries:
+            regressions += 1
+        rows.append((
+            key[0], key[1], f"{before['p95_ms']:.1f}", f"{after['p95_ms']:.1f}", f'{change:+.0%}',
+            before['queries_max'], after['queries_max'], flag
+        ))
+    print_table(['模式', '接口', '原p95(ms)', '新p95(ms)', '变化', '原SQL', '新SQL', ''], rows)
+    for key in sorted(old.keys() ^ new.keys()):
+        print(f"只在{'旧' if key in old else '新'}结果中: [{key[0]}] {key[1]}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=50, help='每个接口计时的请求数')
+    parser.add_argument('--warmup', type=int, default=3, help='每个接口计时前的预热请求数')
+    parser.add_argument('--mode', choices=MODES + ('both',), default='both')
+    parser.add_argument('--only', help='只测试标签中包含该字符串的接口')
+    parser.add_argument('--cold', action='store_true', help='关闭应用内缓存')
+    parser.add_argument('--output', default='api-benchmark.json', help='结果文件（JSON）')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='比较两个结果文件')
+    parser.add_argument('--threshold', type=float, default=0.2, help='比较时 p95 变化超过该比例才标记')
+    args = parser.parse_args()
+
+    if args.compare:
+        regressions = compare(*args.compare, args.threshold)
+        sys.exit(1 if regressions else 0)
+
+    app = build_app(args.cold)
+    fixtures, dataset = load_fixtures(get_engine())
+    uncovered = uncovered_endpoints(app)
+    for rule in uncovered:
+        print(f'未覆盖的接口: {rule}')
+
+    rss_start = current_rss_kb()
+    results = []
+    for mode in (MODES if args.mode == 'both' else (args.mode,)):
+        results.extend(run_mode(mode, app, fixtures, args))
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'requests': args.requests,
+            'warmup': args.warmup,
+            'cold': args.cold,
+            'dataset': dataset,
+            'rss_start_kb': rss_start,
+            'rss_end_kb': current_rss_kb(),
+        },
+        'uncovered': uncovered,
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2, sort_keys=True)
+        f.write('\n')
+
+    print()
+    print_table(
+        ['模式', '接口', 'p50(ms)', 'p95(ms)', 'p99(ms)', 'SQL', '错误', 'RSS(MB)'],
+        [(r['mode'], r['label'], f"{r['p50_ms']:.1f}", f"{r['p95_ms']:.1f}", f"{r['p99_ms']:.1f}",
+          r['queries_median'], r['errors'], f"{r['rss_kb'] / 1024:.0f}" if r['rss_kb'] else '-')
+         for r in results]
+    )
+    print(f'\n结果已写入 {args.output}')
+
+if __name__ == '__main__':
+    main()
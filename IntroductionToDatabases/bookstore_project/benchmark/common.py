@@ -0,0 +1,31 @@
+import os
+import statistics
+import time
+from dotenv import load_dotenv
+from sqlalchemy import create_engine
+
+# 与后端共用 backend/.env，可用 BENCH_DATABASE_URI 指向单独的测试库
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+load_dotenv(os.path.join(PROJECT_DIR, 'backend', '.env'))
+
+def get_engine(**engine_options):
+    return create_engine(os.getenv('BENCH_DATABASE_URI') or os.getenv('DATABASE_URI'), **engine_options)
+
+def measure(conn, statement, params=None, repeat=5):
+    """执行 repeat 次，返回耗时中位数（毫秒）"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        conn.execute(statement, params or {}).fetchall()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+def percentile(sorted_values, p):
+    """已排序数据的百分位数（p 为 0~1）"""
+    return sorted_values[min(int(len(sorted_values) * p), len(sorted_values) - 1)]
+
+def print_table(headers, rows):
+    widths = [max(len(str(h)), *(len(str(r[i])) for r in rows)) for i, h in enumerate(headers)]
+    print('  '.join(str(h).rjust(w) for h, w in zip(headers, widths)))
+    for r in rows:
+        print('  '.join(str(v).rjust(w) for v, w in zip(r, widths)))
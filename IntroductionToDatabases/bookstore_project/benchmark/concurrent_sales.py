@@ -0,0 +1,139 @@
+"""
+并发销售压力测试：多个线程同时销售同一本图书，直到库存售罄，
+统计每秒成功销售数，并检查库存没有变为负数、成功销售数量与扣减的库存一致。
+
+测试会创建一本临时图书并真实提交销售（多个连接之间无法共用一个事务），
+结束后删除产生的销售记录、财务记录和图书。
+
+    # 直接调用 proc_sell_book
+    python -m benchmark.concurrent_sales --threads 16 --stock 2000
+
+    # 通过 Flask 测试客户端调用 POST /api/sales/（包含路由中的重试逻辑）
+    python -m benchmark.concurrent_sales --via-api --username admin --password admin123
+"""
+import argparse
+import threading
+import time
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from benchmark.common import get_engine, print_table
+from backend.db_errors import INSUFFICIENT_STOCK_SQLSTATE, TRANSIENT_SQLSTATES
+
+SELL_SQL = text("SELECT * FROM proc_sell_book(:book_id, :quantity, :seller_id, 30, 'benchmark')")
+
+def create_test_book(engine, stock):
+    with engine.begin() as conn:
+        return conn.execute(text("""
+            INSERT INTO book (isbn, title, author, publisher, retail_price, stock)
+            VALUES ('BENCH-' || floor(random() * 1e9)::BIGINT, '并发测试图书', 'benchmark', 'benchmark', 30, :stock)
+            RETURNING book_id
+        """), {'stock': stock}).scalar()
+
+def cleanup(engine, book_id):
+    with engine.begin() as conn:
+        conn.execute(text("""
+            DELETE FROM financial_record
+            WHERE source_type = '销售'
+              AND source_id IN (SELECT sale_id FROM sale_record WHERE book_id = :book_id)
+        """), {'book_id': book_id})
+        conn.execute(text('DELETE FROM sale_record WHERE book_id = :book_id'), {'book_id': book_id})
+        conn.execute(text('DELETE FROM book WHERE book_id = :book_id'), {'book_id': book_id})
+
+def db_worker(engine, book_id, seller_id, quantity, stats):
+    # 每个线程使用自己的连接，一直销售到库存不足为止
+    with engine.connect() as conn:
+        while True:
+            trans = conn.begin()
+            try:
+                conn.execute(SELL_SQL, {'book_id': book_id, 'quantity': quantity, 'seller_id': seller_id})
+                trans.commit()
+                stats['sold'] += 1
+            except DBAPIError as e:
+                trans.rollback()
+                code = getattr(e.orig, 'pgcode', None)
+                if code == INSUFFICIENT_STOCK_SQLSTATE:
+                    stats['rejected'] += 1
+                    return
+                if code in TRANSIENT_SQLSTATES:
+                    stats['retried'] += 1
+                    continue
+                raise
+
+def api_worker(app, book_id, quantity, username, password, stats):
+    client = app.test_client()
+    login = client.post('/api/users/login', json={'username': username, 'password': password})
+    if login.status_code != 200:
+        raise RuntimeError(f'登录失败: {login.get_json()}')
+    while True:
+        response = client.post('/api/sales/', json={
+            'book_id': book_id, 'quantity': quantity, 'sale_price': 30, 'remark': 'benchmark'
+        })
+        if response.status_code == 201:
+            stats['sold'] += 1
+        elif response.status_code == 409:
+            stats['rejected'] += 1
+            return
+        else:
+            raise RuntimeError(f'销售失败: {response.status_code} {response.get_json()}')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--stock', type=int, default=2000)
+    parser.add_argument('--quantity', type=int, default=1, help='每笔销售数量')
+    parser.add_argument('--via-api', action='store_true', help='通过 Flask 测试客户端调用销售接口')
+    parser.add_argument('--username', default='admin')
+    parser.add_argument('--password', default='admin123')
+    args = parser.parse_args()
+
+    # 连接池要能容纳所有线程
+    engine = get_engine(pool_size=args.threads + 1, max_overflow=0)
+    with engine.connect() as conn:
+        seller_id = conn.execute(text('SELECT MIN(user_id) FROM "user"')).scalar()
+
+    app = None
+    if args.via_api:
+        from backend.app import create_app
+        app = create_app()
+
+    book_id = create_test_book(engine, args.stock)
+    try:
+        thread_stats = [{'sold': 0, 'rejected': 0, 'retried': 0} for _ in range(args.threads)]
+        threads = []
+        for stats in thread_stats:
+            if args.via_api:
+                target, target_args = api_worker, (app, book_id, args.quantity, args.username, args.password, stats)
+            else:
+                target, target_args = db_worker, (engine, book_id, seller_id, args.quantity, stats)
+            threads.append(threading.Thread(target=target, args=target_args))
+
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+
+        sold = sum(s['sold'] for s in thread_stats)
+        retried = sum(s['retried'] for s in thread_stats)
+        with engine.connect() as conn:
+            final_stock = conn.execute(text('SELECT stock FROM book WHERE book_id = :id'), {'id': book_id}).scalar()
+            sale_rows = conn.execute(
+                text('SELECT COUNT(*) FROM sale_record WHERE book_id = :id'), {'id': book_id}
+            ).scalar()
+
+        print_table(
+            ['线程数', '初始库存', '成功销售', '重试次数', '剩余库存', '耗时(s)', '销售/秒'],
+            [(args.threads, args.stock, sold, retried, final_stock, f'{elapsed:.2f}', f'{sold / elapsed:.0f}')]
+        )
+
+        assert final_stock >= 0, f'库存变为负数: {final_stock}'
+        assert sold == sale_rows, f'成功销售 {sold} 笔，但销售记录有 {sale_rows} 条'
+        assert args.stock - final_stock == sold * args.quantity, '扣减的库存与成功销售数量不一致'
+        assert final_stock < args.quantity, f'库存仍足够却被拒绝销售: {final_stock}'
+        print('检查通过：没有超卖，库存与销售记录一致')
+    finally:
+        cleanup(engine, book_id)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,329 @@
+"""
+索引建议：在事务中写入合成数据，用 EXPLAIN (ANALYZE, BUFFERS) 检查各接口的热点查询，
+逐个尝试候选索引（部分索引、覆盖索引、替换已有索引的复合索引），
+保留被执行计划使用、并且明显减少耗时或缓冲区访问的索引，最后可生成迁移脚本。
+
+结束后回滚，不修改数据库；尝试索引时会锁住相关表，请用 BENCH_DATABASE_URI 指向本地测试库。
+
+    python -m benchmark.index_advisor --books 20000 --orders 5000 --sales 200000
+    python -m benchmark.index_advisor --emit db/migrations/014_hot_query_indexes.sql
+
+新的接口查询加入 PROBES，新的候选索引加入 CANDIDATES 即可一起检查。
+"""
+import argparse
+import json
+import statistics
+from datetime import date, datetime, timedelta
+from sqlalchemy import text
+from benchmark.common import get_engine, print_table
+from backend.cost_basis import sales_profit_sql
+
+# 候选索引：名称 -> (表, 索引定义, 被替换的已有索引, 说明)
+CANDIDATES = {
+    'idx_book_low_stock': (
+        'book', '(stock) WHERE stock < 10', [],
+        '库存预警只读取 stock < 10 的少量图书，部分索引只包含这些行'
+    ),
+    'idx_purchase_order_status_time': (
+        'purchase_order', '(status, create_time, order_id)', ['idx_purchase_order_status'],
+        '进货单按状态筛选后按 (create_time, order_id) 键集分页，索引顺序即结果顺序，不需要排序'
+    ),
+    'idx_purchase_detail_order': (
+        'purchase_detail', '(order_id)', [],
+        '加载进货单明细、付款汇总金额、整单入库都按 order_id 查找明细'
+    ),
+    'idx_purchase_detail_book': (
+        'purchase_detail', '(book_id) WHERE book_id IS NOT NULL', [],
+        '删除图书前的关联检查、进货统计按 book_id 查找明细；未入库新书的明细 book_id 为空，不进入索引'
+    ),
+    'idx_sale_book': (
+        'sale_record', '(book_id) INCLUDE (quantity, sale_price)', [],
+        '删除图书前的关联检查和按图书汇总销量，INCLUDE 后可只扫描索引'
+    ),
+    'idx_sale_seller_time': (
+        'sale_record', '(seller_id, sale_time, sale_id)', ['idx_sale_seller'],
+        '按售货员筛选销售记录并按 (sale_time, sale_id) 键集分页'
+    ),
+}
+
+# 各接口的热点查询：(接口, SQL, 候选索引)
+PROBES = [
+    (
+        'GET /api/books/low-stock',
+        """SELECT book_id, isbn, title, author, publisher, retail_price, stock, created_at, updated_at
+           FROM book WHERE stock < 10 ORDER BY stock""",
+        ['idx_book_low_stock']
+    ),
+    (
+        'GET /api/dashboard/overview（库存汇总）',
+        """SELECT COUNT(*), COALESCE(SUM(stock), 0), COUNT(*) FILTER (WHERE stock < 10) FROM book""",
+        []
+    ),
+    (
+        'GET /api/purchases/?status=未付款',
+        """SELECT * FROM purchase_order WHERE status = '未付款'
+           ORDER BY create_time DESC, order_id DESC LIMIT 21""",
+        ['idx_purchase_order_status_time']
+    ),
+    (
+        'GET /api/purchases/（加载明细）',
+        """SELECT * FROM purchase_detail WHERE order_id IN (
+               SELECT order_id FROM purchase_order ORDER BY create_time DESC, order_id DESC LIMIT 20
+           )""",
+        ['idx_purchase_detail_order']
+    ),
+    (
+        'POST /api/purchases/<id>/pay（汇总金额）',
+        """SELECT SUM(quantity * purchase_price) FROM purchase_detail WHERE order_id = :order_id""",
+        ['idx_purchase_detail_order']
+    ),
+    (
+        'DELETE /api/books/<id>（关联检查）',
+        """SELECT EXISTS (SELECT 1 FROM sale_record WHERE book_id = :unsold_book_id)
+               OR EXISTS (SELECT 1 FROM purchase_detail WHERE book_id = :unsold_book_id)""",
+        ['idx_sale_book', 'idx_purchase_detail_book']
+    ),
+    (
+        'GET /api/sales/?seller_id=',
+        """SELECT * FROM sale_record WHERE seller_id = :seller_id
+           ORDER BY sale_time DESC, sale_id DESC LIMIT 21""",
+        ['idx_sale_seller_time']
+    ),
+    (
+        'GET /api/sales/statistics?start_date=&end_date=',
+        """SELECT b.book_id, b.isbn, b.title, b.author,
+                  SUM(s.quantity) AS total_sold, SUM(s.quantity * s.sale_price) AS total_revenue
+           FROM book b JOIN sale_record s ON b.book_id = s.book_id
+           WHERE s.sale_time >= :month_start AND s.sale_time < :month_end
+           GROUP BY b.book_id, b.isbn, b.title, b.author
+           ORDER BY total_revenue DESC""",
+        ['idx_sale_book']
+    ),
+    (
+        'GET /api/finance/sales-profit',
+        sales_profit_sql('average').text,
+        ['idx_sale_book', 'idx_purchase_detail_book']
+    ),
+]
+
+SEED_SQL = [
+    text("""
+        INSERT INTO "user" (username, password, real_name, employee_id, gender, age, role)
+        SELECT 'idx_advisor_' || g, 'x', '索引测试' || g, 'IA' || g, '男', 30, '普通管理员'
+        FROM generate_series(1, :sellers) AS g
+    """),
+    text("""
+        INSERT INTO book (isbn, title, author, publisher, retail_price, stock)
+        SELECT 'IDXADV-' || g, '索引测试图书' || g, 'benchmark', 'benchmark', 50, (g * 7919) % 200
+        FROM generate_series(1, :books) AS g
+    """),
+    text("""
+        INSERT INTO purchase_order (creator_id, create_time, status, total_amount)
+        SELECT
+            :first_seller,
+            LOCALTIMESTAMP - g * INTERVAL '1 hour',
+            CASE WHEN g % 10 = 0 THEN '未付款' WHEN g % 20 = 1 THEN '已退货' ELSE '已付款' END,
+            0
+        FROM generate_series(1, :orders) AS g
+    """),
+    # 每单4条明细；只使用前90%的图书，其余图书没有进货和销售（用于删除检查）
+    text("""
+        INSERT INTO purchase_detail (order_id, book_id, quantity, purchase_price, is_new_book)
+        SELECT o.order_id, :first_book + ((o.order_id * 4 + d) * 7919) % (:books * 9 / 10), 10, 20, FALSE
+        FROM purchase_order o CROSS JOIN generate_series(1, 4) AS d
+        WHERE o.order_id >= :first_order
+    """),
+    text("SELECT proc_create_monthly_partitions('sale_record', :history_start, LOCALTIMESTAMP::DATE)"),
+    text("SELECT proc_create_monthly_partitions('financial_record', :history_start, LOCALTIMESTAMP::DATE)"),
+    text("""
+        INSERT INTO sale_record (book_id, quantity, sale_price, sale_time, seller_id, remark)
+        SELECT
+            :first_book + (g * 7919) % (:books * 9 / 10),
+            1 + g % 3,
+            30,
+            LOCALTIMESTAMP - (g % 720) * INTERVAL '1 day' - (g % 86400) * INTERVAL '1 second',
+            :first_seller + g % :sellers,
+            'benchmark'
+        FROM generate_series(1, :sales) AS g
+    """),
+]
+
+PARENT_INDEX_SQL = text("""
+    SELECT child.relname AS partition_index, parent.relname AS parent_index
+    FROM pg_inherits i
+    JOIN pg_class child ON child.oid = i.inhrelid
+    JOIN pg_class parent ON parent.oid = i.inhparent
+    WHERE child.relname = ANY(:names)
+""")
+
+def seed(conn, args):
+    conn.execute(SEED_SQL[0], {'sellers': args.sellers})
+    first_seller = conn.execute(
+        text("""SELECT MIN(user_id) FROM "user" WHERE username LIKE 'idx\\_advisor\\_%'""")
+    ).scalar()
+    conn.execute(SEED_SQL[1], {'books': args.books})
+    first_book = conn.execute(text("SELECT MIN(book_id) FROM book WHERE isbn LIKE 'IDXADV-%'")).scalar()
+    conn.execute(SEED_SQL[2], {'orders': args.orders, 'first_seller': first_seller})
+    first_order = conn.execute(
+        text('SELECT MIN(order_id) FROM purchase_order WHERE creator_id = :seller'), {'seller': first_seller}
+    ).scalar()
+    conn.execute(SEED_SQL[3], {'first_book': first_book, 'books': args.books, 'first_order': first_order})
+    this_month = date.today().replace(day=1)
+    history_start = this_month.replace(year=this_month.year - 2)
+    conn.execute(SEED_SQL[4], {'history_start': history_start})
+    conn.execute(SEED_SQL[5], {'history_start': history_start})
+    conn.execute(SEED_SQL[6], {
+        'first_book': first_book, 'books': args.books,
+        'first_seller': first_seller, 'sellers': args.sellers, 'sales': args.sales
+    })
+    for table in ('"user"', 'book', 'purchase_order', 'purchase_detail', 'sale_record', 'financial_record'):
+        conn.execute(text(f'ANALYZE {table}'))
+
+    # 日期筛选的统计查询取上个整月
+    month_end = datetime.combine(this_month, datetime.min.time())
+    return {
+        'order_id': first_order,
+        'unsold_book_id': first_book + args.books - 1,
+        'seller_id': first_seller,
+        'month_start': (month_end - timedelta(days=1)).replace(day=1),
+        'month_end': month_end
+    }
+
+def _walk(node):
+    yield node
+    for child in node.get('Plans', []):
+        yield from _walk(child)
+
+def explain(conn, sql, params, repeat):
+    """执行 repeat 次 EXPLAIN ANALYZE，返回 (耗时中位数ms, 缓冲区访问块数, 使用的索引, 最后一次的计划)"""
+    timings = []
+    for _ in range(repeat):
+        raw = conn.execute(text(f'EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}'), params).scalar()
+        result = (json.loads(raw) if isinstance(raw, str) else raw)[0]
+        timings.append(result['Execution Time'])
+    plan = result['Plan']
+    buffers = plan.get('Shared Hit Blocks', 0) + plan.get('Shared Read Blocks', 0)
+
+    used = {node['Index Name'] for node in _walk(plan) if 'Index Name' in node}
+    # 分区表上的索引在各分区上的名称不同，换算为父表上的索引名
+    if used:
+        for r in conn.execute(PARENT_INDEX_SQL, {'names': list(used)}):
+            used.add(r.parent_index)
+    return statistics.median(timings), buffers, used, plan
+
+def findings(plan):
+    """执行计划中值得注意的节点：过滤掉大部分行的顺序扫描、写入磁盘的排序"""
+    notes = []
+    for node in _walk(plan):
+        if node['Node Type'] == 'Seq Scan':
+            removed = node.get('Rows Removed by Filter', 0) * node.get('Actual Loops', 1)
+            kept = node.get('Actual Rows', 0) * node.get('Actual Loops', 1)
+            if removed > 1000 and removed > kept * 10:
+                notes.append(f"顺序扫描 {node['Relation Name']} 过滤掉 {removed} 行、保留 {kept} 行"
+                             f"（{node.get('Filter', '')}）")
+        elif node['Node Type'] == 'Sort' and node.get('Sort Space Type') == 'Disk':
+            notes.append(f"排序使用磁盘 {node.get('Sort Space Used')} kB（{', '.join(node.get('Sort Key', []))}）")
+    return notes
+
+def create_index(conn, name):
+    table, definition, replaces, _ = CANDIDATES[name]
+    for old in replaces:
+        conn.execute(text(f'DROP INDEX IF EXISTS {old}'))
+    conn.execute(text(f'CREATE INDEX {name} ON {table} {definition}'))
+    conn.execute(text(f'ANALYZE {table}'))
+
+def try_candidate(conn, name, probes, params, baseline, repeat, min_gain):
+    """在保存点中建立候选索引并重新检查相关查询，返回 (是否采用, 各查询的结果)"""
+    savepoint = conn.begin_nested()
+    try:
+        create_index(conn, name)
+        results = []
+        accepted = False
+        for route, sql in probes:
+            before_ms, before_buffers = baseline[route][:2]
+            after_ms, after_buffers, used, _ = explain(conn, sql, params, repeat)
+            gain = max(1 - after_ms / before_ms if before_ms else 0,
+                       1 - after_buffers / before_buffers if before_buffers else 0)
+            if name in used and gain >= min_gain:
+                accepted = True
+            results.append((route, before_ms, after_ms, before_buffers, after_buffers, name in used))
+        return accepted, results
+    finally:
+        savepoint.rollback()
+
+def emit_migration(path, accepted, evidence):
+    lines = [
+        '-- 连接到数据库',
+        '\\c bookstore_management;',
+        '',
+        '-- 热点查询索引（由 python -m benchmark.index_advisor 检查生成）',
+    ]
+    for name in accepted:
+        table, definition, replaces, reason = CANDIDATES[name]
+        lines.append('')
+        lines.append(f'-- {reason}')
+        for route, before_ms, after_ms, before_buffers, after_buffers, _ in evidence[name]:
+            lines.append(f'-- {route}: {before_ms:.2f}ms/{before_buffers}块 -> {after_ms:.2f}ms/{after_buffers}块')
+        lines.append(f'CREATE INDEX IF NOT EXISTS {name} ON {table} {definition};')
+        for old in replaces:
+            lines.append('')
+            lines.append(f'-- {name} 的前缀可以替代 {old}')
+            lines.append(f'DROP INDEX IF EXISTS {old};')
+    # 与 db/ 下其他SQL脚本的编码一致
+    with open(path, 'w', encoding='gbk') as f:
+        f.write('\n'.join(lines) + '\n')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--books', type=int, default=20000)
+    parser.add_argument('--orders', type=int, default=5000)
+    parser.add_argument('--sales', type=int, default=200000)
+    parser.add_argument('--sellers', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--min-gain', type=float, default=0.3,
+                        help='耗时或缓冲区访问至少减少的比例（默认0.3）')
+    parser.add_argument('--emit', metavar='PATH', help='把采用的索引写成迁移脚本')
+    args = parser.parse_args()
+
+    engine = get_engine()
+    with engine.connect() as conn:
+        trans = conn.begin()
+        try:
+            params = seed(conn, args)
+
+            baseline = {}
+            print('当前执行计划：')
+            for route, sql, _ in PROBES:
+                ms, buffers, used, plan = explain(conn, sql, params, args.repeat)
+                baseline[route] = (ms, buffers)
+                print(f'  {route}: {ms:.2f}ms, {buffers}块, 索引: {", ".join(sorted(used)) or "无"}')
+                for note in findings(plan):
+                    print(f'    - {note}')
+
+            accepted = []
+            evidence = {}
+            rows = []
+            for name in CANDIDATES:
+                probes = [(route, sql) for route, sql, candidates in PROBES if name in candidates]
+                ok, results = try_candidate(conn, name, probes, params, baseline, args.repeat, args.min_gain)
+                evidence[name] = results
+                if ok:
+                    accepted.append(name)
+                for route, before_ms, after_ms, before_buffers, after_buffers, used in results:
+                    rows.append((
+                        name, route, f'{before_ms:.2f}', f'{after_ms:.2f}',
+                        before_buffers, after_buffers, '是' if used else '否', '采用' if ok else ''
+                    ))
+
+            print()
+            print_table(['候选索引', '接口', '原耗时(ms)', '新耗时(ms)', '原缓冲区', '新缓冲区', '被使用', '结论'], rows)
+
+            if args.emit:
+                emit_migration(args.emit, accepted, evidence)
+                print(f'\n已写入 {args.emit}（{len(accepted)} 个索引）')
+        finally:
+            # 回滚，不保留测试数据和尝试的索引
+            trans.rollback()
+
+if __name__ == '__main__':
+    main()
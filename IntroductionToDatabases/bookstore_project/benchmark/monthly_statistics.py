@@ -0,0 +1,133 @@
+"""
+月度财务统计基准测试：对比原来的 EXTRACT(YEAR ...) 查询、按时间范围过滤的查询，
+以及现在接口读取的月度财务物化视图（另列出刷新物化视图的耗时）。
+
+在一个事务中逐步写入越来越长的历史财务记录（每年行数固定），每一步都查询同一年份，
+结束后回滚，不会修改数据库。原查询耗时随历史总量增长，新查询只与所选年份的数据量有关。
+写入每一年之前先创建该年的月份分区，与生产环境的分区布局一致。
+
+    python -m benchmark.monthly_statistics --rows-per-year 200000 --years 1,2,4,8
+"""
+import argparse
+import time
+from datetime import datetime
+from sqlalchemy import text
+from benchmark.common import get_engine, measure, print_table
+from backend.routes.finance_routes import MONTHLY_STATISTICS_SQL
+
+# 优化前的查询
+LEGACY_MONTHLY_SQL = text("""
+    SELECT
+        TO_CHAR(record_time, 'YYYY-MM') AS month,
+        type,
+        SUM(amount) AS total_amount
+    FROM financial_record
+    WHERE EXTRACT(YEAR FROM record_time) = :year
+    GROUP BY TO_CHAR(record_time, 'YYYY-MM'), type
+    ORDER BY month, type
+""")
+
+# 改为物化视图之前的查询：按时间范围过滤，只扫描所选年份的月份分区
+RANGED_MONTHLY_SQL = text("""
+    SELECT
+        TO_CHAR(m.month_start, 'YYYY-MM') AS month,
+        t.type,
+        COALESCE(SUM(f.amount), 0) AS total_amount
+    FROM generate_series(
+        CAST(:year_start AS TIMESTAMP),
+        CAST(:year_end AS TIMESTAMP) - INTERVAL '1 month',
+        INTERVAL '1 month'
+    ) AS m(month_start)
+    CROSS JOIN (VALUES ('收入'), ('支出')) AS t(type)
+    LEFT JOIN financial_record f
+        ON f.type = t.type
+        AND f.record_time >= CAST(:year_start AS TIMESTAMP)
+        AND f.record_time < CAST(:year_end AS TIMESTAMP)
+        AND f.record_time >= m.month_start
+        AND f.record_time < m.month_start + INTERVAL '1 month'
+    GROUP BY m.month_start, t.type
+    ORDER BY month, t.type
+""")
+
+SEED_YEAR_SQL = text("""
+    INSERT INTO financial_record (type, amount, source_type, source_id, record_time, operator_id, description)
+    SELECT
+        CASE WHEN g % 3 = 0 THEN '支出' ELSE '收入' END,
+        (random() * 500)::DECIMAL(12, 2),
+        CASE WHEN g % 3 = 0 THEN '进货' ELSE '销售' END,
+        -- 负数来源ID，不与真实记录及前几年的测试数据冲突（uq_financial_source）
+        -(g + :offset),
+        CAST(:year_start AS TIMESTAMP) + (g * (365.0 * 86400 / :rows)) * INTERVAL '1 second',
+        :operator_id,
+        'benchmark'
+    FROM generate_series(1, :rows) AS g
+""")
+
+CREATE_PARTITIONS_SQL = text(
+    "SELECT proc_create_monthly_partitions('financial_record', :from_date, :to_date)"
+)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows-per-year', type=int, default=100000)
+    parser.add_argument('--years', default='1,2,4,8', help='逐步增长到的历史年数')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    steps = sorted(int(y) for y in args.years.split(','))
+    target_year = datetime.now().year
+
+    engine = get_engine()
+    with engine.connect() as conn:
+        trans = conn.begin()
+        try:
+            operator_id = conn.execute(text('SELECT MIN(user_id) FROM "user"')).scalar()
+            params = {
+                'year': target_year,
+                'year_start': datetime(target_year, 1, 1),
+                'year_end': datetime(target_year + 1, 1, 1)
+            }
+
+            rows = []
+            seeded_years = 0
+            for years in steps:
+                # 所查询的年份始终是最新一年，新增的都是更早的历史
+                while seeded_years < years:
+                    seed_year = target_year - seeded_years
+                    conn.execute(CREATE_PARTITIONS_SQL, {
+                        'from_date': datetime(seed_year, 1, 1),
+                        'to_date': datetime(seed_year + 1, 1, 1)
+                    })
+                    conn.execute(SEED_YEAR_SQL, {
+                        'year_start': datetime(seed_year, 1, 1),
+                        'rows': args.rows_per_year,
+                        'offset': seeded_years * args.rows_per_year,
+                        'operator_id': operator_id
+                    })
+                    seeded_years += 1
+                conn.execute(text('ANALYZE financial_record'))
+
+                total = conn.execute(text('SELECT COUNT(*) FROM financial_record')).scalar()
+                legacy_ms = measure(conn, LEGACY_MONTHLY_SQL, params, args.repeat)
+                ranged_ms = measure(conn, RANGED_MONTHLY_SQL, params, args.repeat)
+
+                start = time.perf_counter()
+                conn.execute(text('REFRESH MATERIALIZED VIEW view_monthly_finance'))
+                refresh_ms = (time.perf_counter() - start) * 1000
+                view_ms = measure(conn, MONTHLY_STATISTICS_SQL, params, args.repeat)
+
+                rows.append((
+                    years, total, f'{legacy_ms:.1f}', f'{ranged_ms:.1f}',
+                    f'{view_ms:.1f}', f'{refresh_ms:.1f}'
+                ))
+
+            print_table(
+                ['历史年数', '财务记录总数', '原查询(ms)', '范围查询(ms)', '物化视图(ms)', '刷新视图(ms)'],
+                rows
+            )
+        finally:
+            # 回滚，不保留测试数据
+            trans.rollback()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+密码哈希成本测试：模拟多个用户同时登录，测量不同成本参数下校验密码的
+p50/p95/p99 耗时（包括在哈希线程池中排队的时间），并给出在预算内的最强配置。
+不需要数据库。
+
+    python -m benchmark.password_hashing --threads 16 --logins 64 --budget-ms 500
+
+结果中满足预算的配置可写入 backend/.env：
+    PASSWORD_HASH_METHOD / PASSWORD_SCRYPT_N / PASSWORD_PBKDF2_ITERATIONS / PASSWORD_HASH_CONCURRENCY
+"""
+import argparse
+import os
+import threading
+import time
+from benchmark.common import percentile, print_table
+from backend.passwords import PasswordHasher
+
+# 从弱到强排列
+CANDIDATES = [
+    {'method': 'scrypt', 'scrypt_n': 2 ** 13},
+    {'method': 'scrypt', 'scrypt_n': 2 ** 14},
+    {'method': 'scrypt', 'scrypt_n': 2 ** 15},
+    {'method': 'scrypt', 'scrypt_n': 2 ** 16},
+    {'method': 'pbkdf2_sha256', 'pbkdf2_iterations': 300000},
+    {'method': 'pbkdf2_sha256', 'pbkdf2_iterations': 600000},
+    {'method': 'pbkdf2_sha256', 'pbkdf2_iterations': 1200000},
+]
+
+def describe(candidate):
+    if candidate['method'] == 'scrypt':
+        return f"scrypt n=2^{candidate['scrypt_n'].bit_length() - 1}"
+    return f"pbkdf2 {candidate['pbkdf2_iterations']}"
+
+def run(candidate, threads, logins, concurrency):
+    hasher = PasswordHasher(concurrency=concurrency, **candidate)
+    stored = hasher.hash('benchmark-password')
+
+    timings = []
+    timings_lock = threading.Lock()
+    per_thread = max(logins // threads, 1)
+
+    def login():
+        for _ in range(per_thread):
+            start = time.perf_counter()
+            assert hasher.verify(stored, 'benchmark-password')
+            elapsed = (time.perf_counter() - start) * 1000
+            with timings_lock:
+                timings.append(elapsed)
+
+    workers = [threading.Thread(target=login) for _ in range(threads)]
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    timings.sort()
+    return {
+        'p50': percentile(timings, 0.50),
+        'p95': percentile(timings, 0.95),
+        'p99': percentile(timings, 0.99),
+        'throughput': len(timings) / elapsed
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=16, help='同时登录的请求数')
+    parser.add_argument('--logins', type=int, default=64, help='每种配置的登录总次数')
+    parser.add_argument('--concurrency', type=int,
+                        default=int(os.getenv('PASSWORD_HASH_CONCURRENCY', 2)),
+                        help='哈希线程池大小（PASSWORD_HASH_CONCURRENCY）')
+    parser.add_argument('--budget-ms', type=float, default=500, help='登录 p99 耗时预算（毫秒）')
+    args = parser.parse_args()
+
+    rows = []
+    passed = []
+    for candidate in CANDIDATES:
+        result = run(candidate, args.threads, args.logins, args.concurrency)
+        within = result['p99'] <= args.budget_ms
+        if within:
+            passed.append(candidate)
+        rows.append((
+            describe(candidate),
+            f"{result['p50']:.1f}", f"{result['p95']:.1f}", f"{result['p99']:.1f}",
+            f"{result['throughput']:.1f}", '是' if within else '否'
+        ))
+
+    print(f'{args.threads} 个并发登录，哈希线程池 {args.concurrency}')
+    print_table(['配置', 'p50(ms)', 'p95(ms)', 'p99(ms)', '登录/秒', '预算内'], rows)
+    # 优先选择抗GPU/专用硬件的 scrypt，同一方法内选成本最高的
+    scrypt_passed = [c for c in passed if c['method'] == 'scrypt']
+    best = (scrypt_passed or passed or [None])[-1]
+    if best is None:
+        print(f'没有配置满足 p99 <= {args.budget_ms}ms，可增大 --concurrency 或放宽预算')
+    else:
+        print(f'预算内最强的配置: {describe(best)}')
+
+if __name__ == '__main__':
+    main()
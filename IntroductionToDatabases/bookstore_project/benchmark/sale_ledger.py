@@ -0,0 +1,105 @@
+"""
+销售写入吞吐量：对比原来的双重写入（proc_sell_book 和 trg_after_sale_insert 各写一条财务记录，
+触发器先查询一次是否已有记录）与现在只由触发器写入一次、由唯一约束保证不重复的方式。
+
+两种方式各在一个事务中执行并回滚；“改进前”在事务内临时恢复旧的存储过程和触发器函数、
+去掉唯一约束（会锁住 financial_record），请用 BENCH_DATABASE_URI 指向测试库运行。
+
+    python -m benchmark.sale_ledger --sales 5000
+"""
+import argparse
+import time
+from sqlalchemy import text
+from benchmark.common import get_engine, print_table
+
+LEGACY_DDL = [
+    text("ALTER TABLE financial_record DROP CONSTRAINT IF EXISTS uq_financial_source"),
+    text("""
+        CREATE OR REPLACE FUNCTION trg_after_sale_insert_func()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            IF NOT EXISTS (SELECT 1 FROM financial_record
+                           WHERE source_type = '销售' AND source_id = NEW.sale_id) THEN
+                INSERT INTO financial_record (type, amount, source_type, source_id, operator_id, description)
+                VALUES ('收入', NEW.quantity * NEW.sale_price, '销售', NEW.sale_id, NEW.seller_id,
+                        CONCAT('销售图书ID: ', NEW.book_id, ', 数量: ', NEW.quantity));
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """),
+    text("""
+        CREATE OR REPLACE FUNCTION proc_sell_book(
+            p_book_id INT, p_quantity INT, p_seller_id INT, p_sale_price DECIMAL(10, 2),
+            p_remark VARCHAR(500), OUT p_sale_id INT
+        ) AS $$
+        BEGIN
+            UPDATE book SET stock = stock - p_quantity
+            WHERE book_id = p_book_id AND stock >= p_quantity;
+            IF NOT FOUND THEN
+                RAISE EXCEPTION '库存不足' USING ERRCODE = 'BK001';
+            END IF;
+            INSERT INTO sale_record (book_id, quantity, sale_price, seller_id, remark)
+            VALUES (p_book_id, p_quantity, p_sale_price, p_seller_id, p_remark)
+            RETURNING sale_id INTO p_sale_id;
+            INSERT INTO financial_record (type, amount, source_type, source_id, operator_id, description)
+            VALUES ('收入', p_quantity * p_sale_price, '销售', p_sale_id, p_seller_id,
+                    CONCAT('销售图书ID: ', p_book_id, ', 数量: ', p_quantity));
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+]
+
+CREATE_BOOK_SQL = text("""
+    INSERT INTO book (isbn, title, author, publisher, retail_price, stock)
+    VALUES ('BENCH-' || floor(random() * 1e9)::BIGINT, '销售写入测试图书', 'benchmark', 'benchmark', 30, :stock)
+    RETURNING book_id
+""")
+
+SELL_SQL = text("SELECT * FROM proc_sell_book(:book_id, 1, :seller_id, 30, 'benchmark')")
+
+LEDGER_ROWS_SQL = text("""
+    SELECT COUNT(*) FROM financial_record
+    WHERE source_type = '销售'
+      AND source_id IN (SELECT sale_id FROM sale_record WHERE book_id = :book_id)
+""")
+
+def run(engine, sales, legacy):
+    with engine.connect() as conn:
+        trans = conn.begin()
+        try:
+            if legacy:
+                for statement in LEGACY_DDL:
+                    conn.execute(statement)
+            seller_id = conn.execute(text('SELECT MIN(user_id) FROM "user"')).scalar()
+            book_id = conn.execute(CREATE_BOOK_SQL, {'stock': sales}).scalar()
+
+            start = time.perf_counter()
+            for _ in range(sales):
+                conn.execute(SELL_SQL, {'book_id': book_id, 'seller_id': seller_id})
+            elapsed = time.perf_counter() - start
+
+            ledger_rows = conn.execute(LEDGER_ROWS_SQL, {'book_id': book_id}).scalar()
+            return elapsed, ledger_rows
+        finally:
+            # 回滚，不保留测试数据，也撤销临时恢复的旧函数
+            trans.rollback()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sales', type=int, default=5000)
+    args = parser.parse_args()
+
+    engine = get_engine()
+    rows = []
+    for label, legacy in (('改进前（双重写入）', True), ('改进后（触发器单次写入）', False)):
+        elapsed, ledger_rows = run(engine, args.sales, legacy)
+        rows.append((
+            label, args.sales, f'{elapsed:.2f}', f'{args.sales / elapsed:.0f}',
+            f'{ledger_rows / args.sales:.1f}'
+        ))
+
+    print_table(['方式', '销售笔数', '耗时(s)', '销售/秒', '每笔财务记录数'], rows)
+
+if __name__ == '__main__':
+    main()
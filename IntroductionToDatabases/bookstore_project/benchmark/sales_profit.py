@@ -0,0 +1,108 @@
+"""
+销售利润报表基准测试：对比原来的 sale_record LEFT JOIN purchase_detail 查询
+与先分别汇总再连接的成本计算（加权平均、先进先出）。
+
+在事务中写入合成数据：books 本图书，每本图书 purchases 条已付款进货明细和 sales 条销售记录，
+结束后回滚。原查询每本图书要处理 sales × purchases 行，并且收入、利润被放大 purchases 倍。
+
+    python -m benchmark.sales_profit --books 200 --purchases 20 --sales 100
+"""
+import argparse
+from sqlalchemy import text
+from benchmark.common import get_engine, measure, print_table
+from backend.cost_basis import sales_profit_sql
+
+# 优化前的查询
+LEGACY_SALES_PROFIT_SQL = text("""
+    SELECT
+        b.book_id,
+        b.isbn,
+        b.title,
+        SUM(s.quantity) AS total_sold,
+        SUM(s.quantity * s.sale_price) AS total_revenue,
+        AVG(pd.purchase_price) AS avg_purchase_price,
+        AVG(s.sale_price) AS avg_sale_price,
+        AVG(s.sale_price - pd.purchase_price) AS avg_profit_per_book,
+        SUM(s.quantity * (s.sale_price - pd.purchase_price)) AS total_profit
+    FROM sale_record s
+    JOIN book b ON s.book_id = b.book_id
+    LEFT JOIN purchase_detail pd ON b.book_id = pd.book_id
+    GROUP BY b.book_id, b.isbn, b.title
+    ORDER BY total_profit DESC
+""")
+
+SEED_SQL = [
+    text("""
+        INSERT INTO book (isbn, title, author, publisher, retail_price, stock)
+        SELECT 'BENCH' || g, '基准测试图书' || g, 'benchmark', 'benchmark', 50, 1000000
+        FROM generate_series(1, :books) AS g
+    """),
+    text("""
+        INSERT INTO purchase_order (creator_id, create_time, status, total_amount, remark)
+        SELECT :user_id, NOW() - g * INTERVAL '1 day', '已付款', 0, 'benchmark'
+        FROM generate_series(1, :purchases) AS g
+    """),
+    text("""
+        INSERT INTO purchase_detail (order_id, book_id, quantity, purchase_price, is_new_book)
+        SELECT po.order_id, b.book_id, 10 + (random() * 50)::INT, (10 + random() * 30)::DECIMAL(10, 2), FALSE
+        FROM purchase_order po
+        CROSS JOIN book b
+        WHERE po.remark = 'benchmark' AND b.isbn LIKE 'BENCH%'
+    """),
+    text("""
+        INSERT INTO sale_record (book_id, quantity, sale_price, seller_id, remark)
+        SELECT b.book_id, 1 + (random() * 3)::INT, (40 + random() * 20)::DECIMAL(10, 2), :user_id, 'benchmark'
+        FROM book b
+        CROSS JOIN generate_series(1, :sales)
+        WHERE b.isbn LIKE 'BENCH%'
+    """)
+]
+
+# 合成图书的实际销售收入，用于检查报表是否重复计数
+ACTUAL_REVENUE_SQL = text("""
+    SELECT SUM(s.quantity * s.sale_price)
+    FROM sale_record s JOIN book b ON b.book_id = s.book_id
+    WHERE b.isbn LIKE 'BENCH%'
+""")
+
+def report_revenue(conn, statement):
+    rows = conn.execute(statement).fetchall()
+    return sum(r.total_revenue for r in rows if r.isbn.startswith('BENCH'))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--books', type=int, default=200)
+    parser.add_argument('--purchases', type=int, default=20, help='每本图书的进货明细数')
+    parser.add_argument('--sales', type=int, default=100, help='每本图书的销售记录数')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    engine = get_engine()
+    with engine.connect() as conn:
+        trans = conn.begin()
+        try:
+            user_id = conn.execute(text('SELECT MIN(user_id) FROM "user"')).scalar()
+            params = {'books': args.books, 'purchases': args.purchases, 'sales': args.sales, 'user_id': user_id}
+            for statement in SEED_SQL:
+                conn.execute(statement, params)
+            conn.execute(text('ANALYZE book, purchase_order, purchase_detail, sale_record'))
+
+            actual = conn.execute(ACTUAL_REVENUE_SQL).scalar()
+            rows = []
+            for name, statement in [
+                ('原查询', LEGACY_SALES_PROFIT_SQL),
+                ('加权平均', sales_profit_sql('average')),
+                ('先进先出', sales_profit_sql('fifo'))
+            ]:
+                elapsed = measure(conn, statement, repeat=args.repeat)
+                revenue = report_revenue(conn, statement)
+                rows.append((name, f'{elapsed:.1f}', f'{revenue:.2f}', f'{revenue / actual:.2f}x'))
+
+            print(f'合成图书实际销售收入: {actual:.2f}')
+            print_table(['报表', '耗时(ms)', '报表收入', '相对实际'], rows)
+        finally:
+            # 回滚，不保留测试数据
+            trans.rollback()
+
+if __name__ == '__main__':
+    main()
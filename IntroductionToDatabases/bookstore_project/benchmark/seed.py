@@ -0,0 +1,251 @@
+"""
+合成数据生成：向本地测试库写入一套可配置规模的数据并提交，供 benchmark.api_suite 等端到端测试使用。
+
+- 图书：N 本，约2%库存不足10本（库存预警），其余库存充足
+- 销售：M 条，分布在最近 --years 年，图书热度偏斜（第 i 热门的图书被选中的概率随 i 迅速下降，
+  --skew 越大越集中），售货员随机；触发器同时写入对应的财务收入记录
+- 进货单：分布在同一时间范围，约5%未付款、3%已退货，其余已付款并写入财务支出记录；
+  每单1~5条明细，约 --new-ratio 比例为新书（未入库）
+- 用户：超级管理员 seed_admin 和若干售货员 seed_seller_N，密码均为 SEED_PASSWORD
+
+与其他基准测试不同，数据会提交（HTTP 服务器使用自己的连接，看不到未提交的事务），
+请用 BENCH_DATABASE_URI 指向单独的测试库。--clean 删除所有生成的数据
+（包括端到端测试期间由 seed_ 用户创建的记录）。
+
+    python -m benchmark.seed --books 20000 --sales 500000 --orders 20000 --years 3
+    python -m benchmark.seed --clean
+"""
+import argparse
+import time
+from datetime import date
+from sqlalchemy import text
+from benchmark.common import get_engine
+from backend.passwords import password_hasher
+from backend.report_views import REPORT_VIEWS
+
+ADMIN_USERNAME = 'seed_admin'
+SEED_PASSWORD = 'seed123456'
+
+# 生成的图书 ISBN 以 SEED- 开头（新书明细为 SEED-NEW-，端到端测试创建的为 SEED-API-）
+SEED_BOOKS_CTE = """
+    books AS (
+        SELECT array_agg(book_id ORDER BY book_id) AS ids, COUNT(*) AS n
+        FROM book WHERE isbn ~ '^SEED-[0-9]+$'
+    ),
+    sellers AS (
+        SELECT array_agg(user_id ORDER BY user_id) AS ids, COUNT(*) AS n
+        FROM "user" WHERE username LIKE 'seed\\_seller\\_%'
+    )
+"""
+
+# 热度偏斜：u 为 [0,1) 均匀随机数，u^skew 集中在0附近，排在前面的图书被选中得多
+POPULAR_BOOK = 'books.ids[1 + floor(books.n * power(random(), :skew))::INT]'
+RANDOM_SELLER = 'sellers.ids[1 + floor(random() * sellers.n)::INT]'
+RANDOM_TIME = ('CAST(:history_start AS TIMESTAMP) '
+               '+ random() * (LOCALTIMESTAMP - CAST(:history_start AS TIMESTAMP))')
+
+USERS_SQL = text("""
+    INSERT INTO "user" (username, password, real_name, employee_id, gender, age, role)
+    SELECT
+        CASE WHEN g = 0 THEN 'seed_admin' ELSE 'seed_seller_' || g END,
+        :password,
+        '测试用户' || g,
+        'SEED' || g,
+        CASE WHEN g % 2 = 0 THEN '男' ELSE '女' END,
+        22 + g % 30,
+        CASE WHEN g = 0 THEN '超级管理员' ELSE '普通管理员' END
+    FROM generate_series(0, :sellers) AS g
+""")
+
+BOOKS_SQL = text("""
+    INSERT INTO book (isbn, title, author, publisher, retail_price, stock)
+    SELECT
+        'SEED-' || lpad(g::TEXT, 9, '0'),
+        (ARRAY['数据库系统', '算法导论', '计算机网络', '中国历史', '现代小说', '经济学原理', '平面设计', 'Python编程'])[1 + g % 8]
+            || ' 第' || (1 + g % 12) || '卷 #' || g,
+        '作者' || (g % 997),
+        '出版社' || (g % 41),
+        round((20 + random() * 80)::NUMERIC, 2),
+        CASE WHEN g % 50 = 0 THEN g % 10 ELSE 1000 + (g * 7919) % 1000 END
+    FROM generate_series(1, :books) AS g
+""")
+
+PARTITIONS_SQL = text("""
+    SELECT proc_create_monthly_partitions('sale_record', :history_start, LOCALTIMESTAMP::DATE)
+         + proc_create_monthly_partitions('financial_record', :history_start, LOCALTIMESTAMP::DATE)
+""")
+
+SALES_SQL = text(f"""
+    WITH {SEED_BOOKS_CTE}
+    INSERT INTO sale_record (book_id, quantity, sale_price, sale_time, seller_id, remark)
+    SELECT
+        {POPULAR_BOOK},
+        1 + floor(power(random(), 3) * 5)::INT,
+        round((20 + random() * 80)::NUMERIC, 2),
+        {RANDOM_TIME},
+        {RANDOM_SELLER},
+        'seed'
+    FROM generate_series(1, :batch), books, sellers
+""")
+
+ORDERS_SQL = text(f"""
+    WITH {SEED_BOOKS_CTE}
+    INSERT INTO purchase_order (creator_id, create_time, status, total_amount, remark)
+    SELECT
+        {RANDOM_SELLER},
+        {RANDOM_TIME},
+        CASE WHEN r < 0.05 THEN '未付款' WHEN r < 0.08 THEN '已退货' ELSE '已付款' END,
+        0,
+        'seed'
+    FROM (SELECT random() AS r FROM generate_series(1, :orders)) AS o, sellers
+""")
+
+DETAILS_SQL = text(f"""
+    WITH {SEED_BOOKS_CTE}
+    INSERT INTO purchase_detail (order_id, book_id, isbn, title, author, publisher, quantity, purchase_price, is_new_book)
+    SELECT
+        o.order_id,
+        CASE WHEN d.is_new THEN NULL ELSE {POPULAR_BOOK} END,
+        CASE WHEN d.is_new THEN 'SEED-NEW-' || o.order_id || '-' || d.line END,
+        CASE WHEN d.is_new THEN '新书 #' || o.order_id || '-' || d.line END,
+        CASE WHEN d.is_new THEN '新作者' || o.order_id % 97 END,
+        CASE WHEN d.is_new THEN '出版社' || o.order_id % 41 END,
+        10 + floor(random() * 90)::INT,
+        round((10 + random() * 40)::NUMERIC, 2),
+        d.is_new
+    FROM purchase_order o
+    CROSS JOIN LATERAL (
+        SELECT line, random() < :new_ratio AS is_new
+        FROM generate_series(1, 1 + o.order_id % 5) AS line
+    ) AS d
+    CROSS JOIN books
+    WHERE o.remark = 'seed'
+      AND o.creator_id IN (SELECT unnest(ids) FROM sellers)
+""")
+
+ORDER_TOTALS_SQL = text("""
+    UPDATE purchase_order o
+    SET total_amount = t.total
+    FROM (SELECT order_id, SUM(quantity * purchase_price) AS total FROM purchase_detail GROUP BY order_id) AS t
+    WHERE o.order_id = t.order_id AND o.remark = 'seed'
+""")
+
+# 已付款进货单的财务支出记录，与 proc_pay_purchase_order 写入的格式相同（同时登记财务来源），时间取下单时间
+EXPENSES_SQL = text("""
+    WITH paid AS (
+        INSERT INTO financial_source (source_type, source_id)
+        SELECT '进货', order_id
+        FROM purchase_order
+        WHERE remark = 'seed' AND status = '已付款'
+        RETURNING source_id
+    )
+    INSERT INTO financial_record (type, amount, source_type, source_id, record_time, operator_id, description)
+    SELECT '支出', o.total_amount, '进货', o.order_id, o.create_time, o.creator_id, CONCAT('支付进货单: ', o.order_id)
+    FROM purchase_order o
+    JOIN paid ON paid.source_id = o.order_id
+""")
+
+# 删除顺序满足外键约束；财务日汇总由 financial_record 上的触发器同步扣减
+CLEAN_SQL = [
+    text("""DELETE FROM financial_record WHERE operator_id IN (SELECT user_id FROM "user" WHERE username LIKE 'seed\\_%')"""),
+    text("""DELETE FROM sale_record WHERE seller_id IN (SELECT user_id FROM "user" WHERE username LIKE 'seed\\_%')"""),
+    text("""
+        DELETE FROM financial_source WHERE source_type = '进货' AND source_id IN (
+            SELECT order_id FROM purchase_order
+            WHERE creator_id IN (SELECT user_id FROM "user" WHERE username LIKE 'seed\\_%')
+        )
+    """),
+    text("""
+        DELETE FROM purchase_detail WHERE order_id IN (
+            SELECT order_id FROM purchase_order
+            WHERE creator_id IN (SELECT user_id FROM "user" WHERE username LIKE 'seed\\_%')
+        )
+    """),
+    text("""DELETE FROM purchase_order WHERE creator_id IN (SELECT user_id FROM "user" WHERE username LIKE 'seed\\_%')"""),
+    text("DELETE FROM book WHERE isbn LIKE 'SEED-%'"),
+    text("""DELETE FROM "user" WHERE username LIKE 'seed\\_%'"""),
+]
+
+def refresh_reports(engine):
+    """刷新报表物化视图并更新统计信息，接口读到的是刚生成的数据"""
+    for view in REPORT_VIEWS:
+        with engine.begin() as conn:
+            conn.execute(text('SELECT proc_refresh_report_view(:view)'), {'view': view})
+    with engine.begin() as conn:
+        conn.execute(text('ANALYZE'))
+
+def seed(engine, books, sales, orders, years, sellers=20, skew=3.0, new_ratio=0.1, batch=100000, random_seed=0.42):
+    """写入一套合成数据（每个阶段一个事务），返回各阶段耗时 [(阶段, 行数, 秒)]"""
+    this_month = date.today().replace(day=1)
+    history_start = this_month.replace(year=this_month.year - years)
+    common = {'history_start': history_start, 'skew': skew}
+    phases = []
+
+    def phase(name, rows, fn):
+        start = time.perf_counter()
+        with engine.begin() as conn:
+            # 固定随机种子，相同参数生成的数据相同，便于比较不同提交的结果；
+            # 每个阶段的种子不同，分批写入的销售不会重复同一组随机数
+            conn.execute(text('SELECT setseed(:seed)'), {'seed': random_seed / (len(phases) + 1)})
+            fn(conn)
+        phases.append((name, rows, time.perf_counter() - start))
+        print(f'  {name}: {rows} 行, {phases[-1][2]:.1f}s')
+
+    with engine.connect() as conn:
+        if conn.execute(text("""SELECT 1 FROM "user" WHERE username = 'seed_admin'""")).scalar():
+            raise SystemExit('测试库中已有生成的数据，请先执行 python -m benchmark.seed --clean')
+
+    password = password_hasher.hash(SEED_PASSWORD)
+    phase('用户', sellers + 1, lambda conn: conn.execute(USERS_SQL, {'password': password, 'sellers': sellers}))
+    phase('图书', books, lambda conn: conn.execute(BOOKS_SQL, {'books': books}))
+    phase('月份分区', years * 12, lambda conn: conn.execute(PARTITIONS_SQL, common))
+
+    def insert_orders(conn):
+        conn.execute(ORDERS_SQL, {**common, 'orders': orders})
+        conn.execute(DETAILS_SQL, {**common, 'new_ratio': new_ratio})
+        conn.execute(ORDER_TOTALS_SQL)
+        conn.execute(EXPENSES_SQL)
+    phase('进货单', orders, insert_orders)
+
+    done = 0
+    while done < sales:
+        size = min(batch, sales - done)
+        phase(f'销售 {done + 1}~{done + size}', size,
+              lambda conn: conn.execute(SALES_SQL, {**common, 'batch': size}))
+        done += size
+
+    start = time.perf_counter()
+    refresh_reports(engine)
+    phases.append(('物化视图和统计信息', 0, time.perf_counter() - start))
+    return phases
+
+def clean(engine):
+    with engine.begin() as conn:
+        for statement in CLEAN_SQL:
+            print(f'  删除 {conn.execute(statement).rowcount} 行')
+    refresh_reports(engine)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--books', type=int, default=20000)
+    parser.add_argument('--sales', type=int, default=500000)
+    parser.add_argument('--orders', type=int, default=20000)
+    parser.add_argument('--years', type=int, default=3, help='销售和进货分布在最近几年')
+    parser.add_argument('--sellers', type=int, default=20)
+    parser.add_argument('--skew', type=float, default=3.0, help='图书热度偏斜程度（1为均匀）')
+    parser.add_argument('--new-ratio', type=float, default=0.1, help='进货明细中新书的比例')
+    parser.add_argument('--seed', type=float, default=0.42, help='随机种子（-1~1）')
+    parser.add_argument('--clean', action='store_true', help='删除生成的数据')
+    args = parser.parse_args()
+
+    engine = get_engine()
+    if args.clean:
+        clean(engine)
+        return
+
+    phases = seed(engine, args.books, args.sales, args.orders, args.years, args.sellers,
+                  args.skew, args.new_ratio, random_seed=args.seed)
+    print(f'完成，共 {sum(p[2] for p in phases):.1f}s；登录 {ADMIN_USERNAME} / {SEED_PASSWORD}')
+
+if __name__ == '__main__':
+    main()
@@ -2,6 +2,9 @@
 \c bookstore_management;
 
 -- 1. ͼ洢
+-- ۼһ UPDATEͬһʱŶӣ
+-- õжϿ棬ͬʱͨ鵼¿Ϊ
+-- 治ʱ׳ SQLSTATE BK001ȴ lock_timeout ʱ׳ 55P03ԣ
 CREATE OR REPLACE FUNCTION proc_sell_book(
     p_book_id INT,
     p_quantity INT,
@@ -15,61 +18,60 @@ DECLARE
     current_stock INT;
     v_error_msg VARCHAR(100);
 BEGIN
-    -- Ƿ㹻
-    SELECT stock INTO current_stock FROM book WHERE book_id = p_book_id;
+    -- 㹻ʱۼ棬޸κ
+    UPDATE book SET stock = stock - p_quantity
+    WHERE book_id = p_book_id AND stock >= p_quantity;
     
-    IF current_stock < p_quantity THEN
+    IF NOT FOUND THEN
+        SELECT stock INTO current_stock FROM book WHERE book_id = p_book_id;
+        IF current_stock IS NULL THEN
+            RAISE EXCEPTION 'ͼ鲻';
+        END IF;
         v_error_msg := CONCAT('治㣬ǰ: ', current_stock, ', Ҫ: ', p_quantity);
-        RAISE EXCEPTION '%', v_error_msg;
-    ELSE
-        -- ۼ¼
-        INSERT INTO sale_record (book_id, quantity, sale_price, seller_id, remark)
-        VALUES (p_book_id, p_quantity, p_sale_price, p_seller_id, p_remark)
-        RETURNING sale_id INTO p_sale_id;
-        
-        -- ¿
-        UPDATE book SET stock = stock - p_quantity WHERE book_id = p_book_id;
-        
-        -- Ӳ¼
-        INSERT INTO financial_record (type, amount, source_type, source_id, operator_id, description)
-        VALUES ('', p_quantity * p_sale_price, '', p_sale_id, p_seller_id, 
-                CONCAT('ͼID: ', p_book_id, ', : ', p_quantity));
+        RAISE EXCEPTION '%', v_error_msg USING ERRCODE = 'BK001';
     END IF;
+    
+    -- ۼ¼¼ trg_after_sale_insert ɣ
+    INSERT INTO sale_record (book_id, quantity, sale_price, seller_id, remark)
+    VALUES (p_book_id, p_quantity, p_sale_price, p_seller_id, p_remark)
+    RETURNING sale_id INTO p_sale_id;
 END;
-$$ LANGUAGE plpgsql;
+$$ LANGUAGE plpgsql
+SET lock_timeout = '5s';
 
 -- 2. 洢
+-- ״̬޸ͬһ UPDATEͬһʱ󵽵ϵȴ
+-- õж״̬Ѹ޸κв
+-- ¼дǰ financial_source ǼԴͬһظ
 CREATE OR REPLACE FUNCTION proc_pay_purchase_order(
     p_order_id INT,
     p_operator_id INT
 ) RETURNS VOID AS $$
 DECLARE
-    v_status VARCHAR(20);
-    v_total_amount DECIMAL(12, 2) := 0;
+    v_total_amount DECIMAL(12, 2);
 BEGIN
-    -- 鶩״̬
-    SELECT status INTO v_status FROM purchase_order WHERE order_id = p_order_id;
-    
-    IF v_status != 'δ' THEN
+    -- ¶״̬ܽ
+    UPDATE purchase_order
+    SET status = 'Ѹ',
+        total_amount = (
+            SELECT COALESCE(SUM(quantity * purchase_price), 0)
+            FROM purchase_detail
+            WHERE order_id = p_order_id
+        )
+    WHERE order_id = p_order_id AND status = 'δ'
+    RETURNING total_amount INTO v_total_amount;
+
+    IF NOT FOUND THEN
         RAISE EXCEPTION 'ֻδĶԸ';
-    ELSE
-        -- ܽ
-        SELECT SUM(quantity * purchase_price) INTO v_total_amount 
-        FROM purchase_detail 
-        WHERE order_id = p_order_id;
-        
-        -- ¶״̬
-        UPDATE purchase_order 
-        SET status = 'Ѹ', total_amount = v_total_amount 
-        WHERE order_id = p_order_id;
-        
-        -- Ӳ¼
-        INSERT INTO financial_record (type, amount, source_type, source_id, operator_id, description)
-        VALUES ('֧', v_total_amount, '', p_order_id, p_operator_id, 
-                CONCAT('֧: ', p_order_id));
-        
-        -- ͼĿ棨ᴦ
     END IF;
+
+    -- Ӳ¼
+    INSERT INTO financial_source (source_type, source_id) VALUES ('', p_order_id);
+    INSERT INTO financial_record (type, amount, source_type, source_id, operator_id, description)
+    VALUES ('֧', v_total_amount, '', p_order_id, p_operator_id,
+            CONCAT('֧: ', p_order_id));
+
+    -- ͼĿ trg_after_purchase_update 
 END;
 $$ LANGUAGE plpgsql;
 
@@ -121,17 +123,15 @@ END;
 $$ LANGUAGE plpgsql;
 
 -- 4. Զ۲¼Ĵ
+-- Ĳ¼ֻɸôд루ۡԼֱӲۼ¼
+-- ΨһԼ uq_financial_source ֤ÿֻһ¼
+-- ¼ʱȡʱ䣺¼ͬһ·ݷΨһԼеķҲʼͬ
 CREATE OR REPLACE FUNCTION trg_after_sale_insert_func()
 RETURNS TRIGGER AS $$
 BEGIN
-    -- ǷѾжӦĲ¼ظ
-    IF NOT EXISTS (SELECT 1 FROM financial_record 
-                   WHERE source_type = '' AND source_id = NEW.sale_id) THEN
-        -- ¼
-        INSERT INTO financial_record (type, amount, source_type, source_id, operator_id, description)
-        VALUES ('', NEW.quantity * NEW.sale_price, '', NEW.sale_id, NEW.seller_id, 
-                CONCAT('ͼID: ', NEW.book_id, ', : ', NEW.quantity));
-    END IF;
+    INSERT INTO financial_record (type, amount, source_type, source_id, record_time, operator_id, description)
+    VALUES ('', NEW.quantity * NEW.sale_price, '', NEW.sale_id, NEW.sale_time, NEW.seller_id, 
+            CONCAT('ͼID: ', NEW.book_id, ', : ', NEW.quantity));
     RETURN NULL;
 END;
 $$ LANGUAGE plpgsql;
@@ -163,4 +163,461 @@ $$ LANGUAGE plpgsql;
 CREATE TRIGGER trg_after_purchase_update
 AFTER UPDATE ON purchase_order
 FOR EACH ROW
-EXECUTE FUNCTION trg_after_purchase_update_func();
\ No newline at end of file
+EXECUTE FUNCTION trg_after_purchase_update_func();
+
+-- 6. ջά
+-- д¼·proc_pay_purchase_ordertrg_after_sale_insert_func
+-- ôͬһۼӵջܱ
+-- ͬһֻһʱв۶ҪŶӸһУֱύ
+-- ΪỰɢ 16 ͰͬϵĲۼӵͬУ
+-- ɾ޸д븺ҲҪҵԭͰ
+CREATE OR REPLACE FUNCTION trg_financial_daily_summary_func()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_bucket SMALLINT := pg_backend_pid() % 16;
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        INSERT INTO financial_daily_summary (day, type, bucket, total_amount, record_count)
+        VALUES (OLD.record_time::DATE, OLD.type, v_bucket, -OLD.amount, -1)
+        ON CONFLICT (day, type, bucket) DO UPDATE
+        SET total_amount = financial_daily_summary.total_amount + EXCLUDED.total_amount,
+            record_count = financial_daily_summary.record_count + EXCLUDED.record_count;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO financial_daily_summary (day, type, bucket, total_amount, record_count)
+        VALUES (NEW.record_time::DATE, NEW.type, v_bucket, NEW.amount, 1)
+        ON CONFLICT (day, type, bucket) DO UPDATE
+        SET total_amount = financial_daily_summary.total_amount + EXCLUDED.total_amount,
+            record_count = financial_daily_summary.record_count + EXCLUDED.record_count;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_financial_daily_summary
+AFTER INSERT OR UPDATE OR DELETE ON financial_record
+FOR EACH ROW
+EXECUTE FUNCTION trg_financial_daily_summary_func();
+
+-- 7. ؽջܣ״β޸һ£ػ
+-- ѹ鵵·ݵĲ¼ѲڱУЩڵĻܱ
+CREATE OR REPLACE FUNCTION fn_financial_archive_cutoff()
+RETURNS DATE AS $$
+    SELECT COALESCE(
+        (SELECT archived_before FROM partition_archive WHERE table_name = 'financial_record'),
+        '-infinity'::DATE
+    );
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION proc_rebuild_financial_daily_summary()
+RETURNS INT AS $$
+DECLARE
+    v_rows INT;
+    v_cutoff DATE := fn_financial_archive_cutoff();
+BEGIN
+    -- ؽڼֹµĲ¼д룬©
+    LOCK TABLE financial_record IN SHARE MODE;
+
+    DELETE FROM financial_daily_summary WHERE day >= v_cutoff;
+
+    INSERT INTO financial_daily_summary (day, type, bucket, total_amount, record_count)
+    SELECT record_time::DATE, type, 0, SUM(amount), COUNT(*)
+    FROM financial_record
+    WHERE record_time >= v_cutoff
+    GROUP BY record_time::DATE, type;
+
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+    RETURN v_rows;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 8. ջһԼ飬ػܱϸһµںͣѹ鵵·ݣ
+CREATE OR REPLACE FUNCTION fn_check_financial_daily_summary()
+RETURNS TABLE (
+    day DATE,
+    type VARCHAR(10),
+    summary_amount DECIMAL(14, 2),
+    actual_amount DECIMAL(14, 2),
+    summary_count INT,
+    actual_count INT
+) AS $$
+    SELECT
+        COALESCE(s.day, a.day),
+        COALESCE(s.type, a.type),
+        COALESCE(s.total_amount, 0),
+        COALESCE(a.total_amount, 0),
+        COALESCE(s.record_count, 0)::INT,
+        COALESCE(a.record_count, 0)::INT
+    FROM (
+        SELECT day, type, SUM(total_amount) AS total_amount, SUM(record_count) AS record_count
+        FROM financial_daily_summary
+        WHERE day >= fn_financial_archive_cutoff()
+        GROUP BY day, type
+    ) s
+    FULL OUTER JOIN (
+        SELECT record_time::DATE AS day, type, SUM(amount) AS total_amount, COUNT(*) AS record_count
+        FROM financial_record
+        WHERE record_time >= fn_financial_archive_cutoff()
+        GROUP BY record_time::DATE, type
+    ) a ON s.day = a.day AND s.type = a.type
+    WHERE COALESCE(s.total_amount, 0) <> COALESCE(a.total_amount, 0)
+       OR COALESCE(s.record_count, 0) <> COALESCE(a.record_count, 0)
+    ORDER BY 1, 2;
+$$ LANGUAGE sql;
+
+-- 9. ۴洢̣ﳵ㣩
+-- p_items ʽ: [{"book_id": 1, "quantity": 2, "sale_price": 35.00, "remark": ""}, ...]
+-- ÿһУ˳ţӦۼ¼IDκһʧع
+CREATE OR REPLACE FUNCTION proc_sell_books(
+    p_items JSONB,
+    p_seller_id INT
+) RETURNS TABLE (p_line_no INT, p_sale_id INT) AS $$
+DECLARE
+    v_book_id INT;
+    v_stock INT;
+    v_needed INT;
+BEGIN
+    --  book_id ˳漰ͼ飬̨ʱụ
+    PERFORM 1 FROM book
+    WHERE book_id IN (SELECT (e->>'book_id')::INT FROM jsonb_array_elements(p_items) AS e)
+    ORDER BY book_id
+    FOR UPDATE;
+
+    -- ͼǷڡǷ㹻ͬһڶʱϼжϣ
+    SELECT d.book_id, b.stock, d.quantity INTO v_book_id, v_stock, v_needed
+    FROM (
+        SELECT (e->>'book_id')::INT AS book_id, SUM((e->>'quantity')::INT) AS quantity
+        FROM jsonb_array_elements(p_items) AS e
+        GROUP BY 1
+    ) d
+    LEFT JOIN book b ON b.book_id = d.book_id
+    WHERE b.book_id IS NULL OR b.stock < d.quantity
+    ORDER BY d.book_id
+    LIMIT 1;
+
+    IF FOUND THEN
+        IF v_stock IS NULL THEN
+            RAISE EXCEPTION 'ͼID: %', v_book_id;
+        END IF;
+        RAISE EXCEPTION 'ͼID % 治㣬ǰ: %, Ҫ: %', v_book_id, v_stock, v_needed
+            USING ERRCODE = 'BK001';
+    END IF;
+
+    -- һۼͼĿ
+    UPDATE book b
+    SET stock = b.stock - d.quantity
+    FROM (
+        SELECT (e->>'book_id')::INT AS book_id, SUM((e->>'quantity')::INT) AS quantity
+        FROM jsonb_array_elements(p_items) AS e
+        GROUP BY 1
+    ) d
+    WHERE b.book_id = d.book_id;
+
+    -- ԤȷIDԱ봫жӦ¼ trg_after_sale_insert 
+    RETURN QUERY
+    WITH items AS (
+        SELECT
+            t.line_no::INT AS line_no,
+            nextval(pg_get_serial_sequence('sale_record', 'sale_id'))::INT AS sale_id,
+            (t.e->>'book_id')::INT AS book_id,
+            (t.e->>'quantity')::INT AS quantity,
+            (t.e->>'sale_price')::DECIMAL(10, 2) AS sale_price,
+            COALESCE(t.e->>'remark', '') AS remark
+        FROM jsonb_array_elements(p_items) WITH ORDINALITY AS t(e, line_no)
+    ),
+    inserted AS (
+        INSERT INTO sale_record (sale_id, book_id, quantity, sale_price, seller_id, remark)
+        SELECT items.sale_id, items.book_id, items.quantity, items.sale_price, p_seller_id, items.remark
+        FROM items
+        RETURNING sale_record.sale_id
+    )
+    SELECT items.line_no, items.sale_id
+    FROM items
+    JOIN inserted ON inserted.sale_id = items.sale_id
+    ORDER BY items.line_no;
+END;
+$$ LANGUAGE plpgsql
+SET lock_timeout = '5s';
+
+-- 10. 洢
+-- ѸδϸһԼͼ
+-- p_prices Ϊ {"ϸID": ۼ, ...}δгϸʹ p_default_price
+-- ͬһISBNͬϸϲΪһ飬ISBNͼеֻۼӿ棨޸ۼۣ
+-- ÿϸӦͼIDԼǷϲͼ
+CREATE OR REPLACE FUNCTION proc_receive_new_books(
+    p_order_id INT,
+    p_prices JSONB,
+    p_default_price DECIMAL(10, 2)
+) RETURNS TABLE (p_detail_id INT, p_book_id INT, p_merged BOOLEAN) AS $$
+DECLARE
+    v_order_status VARCHAR(20);
+    v_detail_id INT;
+BEGIN
+    -- ͬһᱻظ
+    SELECT status INTO v_order_status FROM purchase_order WHERE order_id = p_order_id FOR UPDATE;
+
+    IF v_order_status IS NULL THEN
+        RAISE EXCEPTION '';
+    ELSIF v_order_status != 'Ѹ' THEN
+        RAISE EXCEPTION 'ֻѸĶеͼӵ';
+    END IF;
+
+    -- Ҫ½ͼ鵫ûۼ۵ϸ
+    SELECT pd.detail_id INTO v_detail_id
+    FROM purchase_detail pd
+    WHERE pd.order_id = p_order_id
+      AND pd.is_new_book
+      AND COALESCE((p_prices->>pd.detail_id::TEXT)::DECIMAL(10, 2), p_default_price) IS NULL
+      AND NOT EXISTS (SELECT 1 FROM book b WHERE b.isbn = pd.isbn)
+    ORDER BY pd.detail_id
+    LIMIT 1;
+
+    IF FOUND THEN
+        RAISE EXCEPTION 'ϸ % ȱۼ', v_detail_id;
+    END IF;
+
+    RETURN QUERY
+    WITH lines AS (
+        SELECT
+            pd.detail_id, pd.isbn, pd.title, pd.author, pd.publisher, pd.quantity,
+            COALESCE((p_prices->>pd.detail_id::TEXT)::DECIMAL(10, 2), p_default_price) AS retail_price
+        FROM purchase_detail pd
+        WHERE pd.order_id = p_order_id AND pd.is_new_book
+        FOR UPDATE
+    ),
+    -- ON CONFLICT һθͬһУȰISBNϲ
+    grouped AS (
+        SELECT
+            isbn,
+            (ARRAY_AGG(title ORDER BY detail_id))[1] AS title,
+            (ARRAY_AGG(author ORDER BY detail_id))[1] AS author,
+            (ARRAY_AGG(publisher ORDER BY detail_id))[1] AS publisher,
+            COALESCE((ARRAY_AGG(retail_price ORDER BY detail_id) FILTER (WHERE retail_price IS NOT NULL))[1], 0) AS retail_price,
+            SUM(quantity) AS quantity
+        FROM lines
+        GROUP BY isbn
+    ),
+    upserted AS (
+        INSERT INTO book (isbn, title, author, publisher, retail_price, stock)
+        SELECT isbn, title, author, publisher, retail_price, quantity
+        FROM grouped
+        ON CONFLICT (isbn) DO UPDATE
+        SET stock = book.stock + EXCLUDED.stock
+        RETURNING book.book_id, book.isbn, (xmax <> 0) AS merged
+    ),
+    linked AS (
+        UPDATE purchase_detail pd
+        SET book_id = u.book_id, is_new_book = FALSE
+        FROM lines l
+        JOIN upserted u ON u.isbn = l.isbn
+        WHERE pd.detail_id = l.detail_id
+        RETURNING pd.detail_id, u.book_id, u.merged
+    )
+    SELECT linked.detail_id, linked.book_id, linked.merged
+    FROM linked
+    ORDER BY linked.detail_id;
+END;
+$$ LANGUAGE plpgsql
+SET lock_timeout = '5s';
+
+
+-- 11. ݰ汾ţHTTP ETag ʹã
+-- ÿűһа汾ţݱ仯ύʱһ汾ͨУ
+-- һͬһύȡͬһжİ汾ʼһ
+-- е nextval ƣύ֮ǰͱỰ
+CREATE TABLE IF NOT EXISTS data_version (
+    table_name VARCHAR(64) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
+);
+
+INSERT INTO data_version (table_name)
+VALUES ('book'), ('sale_record'), ('user'), ('purchase_order')
+ON CONFLICT (table_name) DO NOTHING;
+
+-- ϵмڸִУTG_TABLE_NAME Ƿ
+-- ˷ĴԲ븸
+-- ͬһ޸ĶʱֻһΣ񼶵Զü¼Ѿӹ
+-- ύعԶ
+CREATE OR REPLACE FUNCTION trg_bump_data_version_func()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_table TEXT := COALESCE(TG_ARGV[0], TG_TABLE_NAME);
+BEGIN
+    IF current_setting('data_version.' || v_table, TRUE) IS DISTINCT FROM 'bumped' THEN
+        UPDATE data_version SET version = version + 1 WHERE table_name = v_table;
+        PERFORM set_config('data_version.' || v_table, 'bumped', TRUE);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ԼӳٵύʱִУ汾еֻύгУ
+-- дͬһűֻύʱŶ
+CREATE CONSTRAINT TRIGGER trg_data_version_book
+AFTER INSERT OR UPDATE OR DELETE ON book
+DEFERRABLE INITIALLY DEFERRED
+FOR EACH ROW
+EXECUTE FUNCTION trg_bump_data_version_func();
+
+CREATE CONSTRAINT TRIGGER trg_data_version_sale_record
+AFTER INSERT OR UPDATE OR DELETE ON sale_record
+DEFERRABLE INITIALLY DEFERRED
+FOR EACH ROW
+EXECUTE FUNCTION trg_bump_data_version_func('sale_record');
+
+CREATE CONSTRAINT TRIGGER trg_data_version_user
+AFTER INSERT OR UPDATE OR DELETE ON "user"
+DEFERRABLE INITIALLY DEFERRED
+FOR EACH ROW
+EXECUTE FUNCTION trg_bump_data_version_func();
+
+-- ϸһ汾ţ˻ⶼӰɱ
+CREATE CONSTRAINT TRIGGER trg_data_version_purchase_order
+AFTER INSERT OR UPDATE OR DELETE ON purchase_order
+DEFERRABLE INITIALLY DEFERRED
+FOR EACH ROW
+EXECUTE FUNCTION trg_bump_data_version_func('purchase_order');
+
+CREATE CONSTRAINT TRIGGER trg_data_version_purchase_detail
+AFTER INSERT OR UPDATE OR DELETE ON purchase_detail
+DEFERRABLE INITIALLY DEFERRED
+FOR EACH ROW
+EXECUTE FUNCTION trg_bump_data_version_func('purchase_order');
+
+-- 12. ·ά
+-- sale_recordfinancial_record ·Χ·ݷΪ _pYYYYMM
+--  [p_from, p_to) ֮ȱٵ·ݷ½ķ
+-- ĬϷĳµʱPostgreSQL ٴµķ沢
+-- ЩԿɲѯֻǲܰ²ü
+CREATE OR REPLACE FUNCTION proc_create_monthly_partitions(
+    p_table TEXT,
+    p_from DATE,
+    p_to DATE
+) RETURNS INT AS $$
+DECLARE
+    v_column TEXT;
+    v_month DATE;
+    v_next DATE;
+    v_name TEXT;
+    v_conflict BOOLEAN;
+    v_created INT := 0;
+BEGIN
+    v_column := CASE p_table
+        WHEN 'sale_record' THEN 'sale_time'
+        WHEN 'financial_record' THEN 'record_time'
+    END;
+    IF v_column IS NULL THEN
+        RAISE EXCEPTION '% ǰ·ı', p_table;
+    END IF;
+
+    -- ӦýͬʱʱִУظͬһ
+    PERFORM pg_advisory_xact_lock(hashtext('proc_create_monthly_partitions'));
+
+    v_month := date_trunc('month', p_from)::DATE;
+    WHILE v_month < p_to LOOP
+        v_next := (v_month + INTERVAL '1 month')::DATE;
+        v_name := p_table || '_p' || to_char(v_month, 'YYYYMM');
+
+        IF to_regclass(v_name) IS NULL THEN
+            EXECUTE format(
+                'SELECT EXISTS (SELECT 1 FROM %I WHERE %I >= %L AND %I < %L)',
+                p_table || '_default', v_column, v_month, v_column, v_next
+            ) INTO v_conflict;
+
+            IF v_conflict THEN
+                RAISE WARNING 'ĬϷ %_default  % ݣ %',
+                    p_table, to_char(v_month, 'YYYY-MM'), v_name;
+            ELSE
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+                    v_name, p_table, v_month, v_next
+                );
+                v_created := v_created + 1;
+            END IF;
+        END IF;
+
+        v_month := v_next;
+    END LOOP;
+
+    RETURN v_created;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Ϊű¼֮ p_months_ahead µķ½ķ
+-- ӦôһǰԼ flask partitions ensureɼÿնʱ񣩶ִ
+CREATE OR REPLACE FUNCTION proc_ensure_partitions(p_months_ahead INT DEFAULT 3)
+RETURNS INT AS $$
+DECLARE
+    v_from DATE := date_trunc('month', CURRENT_DATE)::DATE;
+    v_to DATE := (date_trunc('month', CURRENT_DATE) + (p_months_ahead + 1) * INTERVAL '1 month')::DATE;
+BEGIN
+    RETURN proc_create_monthly_partitions('sale_record', v_from, v_to)
+         + proc_create_monthly_partitions('financial_record', v_from, v_to);
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT proc_ensure_partitions(3);
+
+-- 13. ﻯͼˢ£view_sales_statistics ȣ create_views.sql
+--  CONCURRENTLY ʽˢ£ˢڼԿȡ report_refresh м¼ʱͺʱ
+-- ϴˢ² p_max_ageˢͬһͼʱ NULL
+-- 򷵻رˢµʱ㣨ˢ¿ʼʱ̣
+CREATE OR REPLACE FUNCTION proc_refresh_report_view(
+    p_view TEXT,
+    p_max_age INTERVAL DEFAULT INTERVAL '0'
+) RETURNS TIMESTAMP AS $$
+DECLARE
+    v_started TIMESTAMP;
+BEGIN
+    IF p_view NOT IN ('view_sales_statistics', 'view_purchase_statistics',
+                      'view_user_sales_performance', 'view_monthly_finance') THEN
+        RAISE EXCEPTION '% Ǳﻯͼ', p_view;
+    END IF;
+
+    -- Ӧý̵Ķʱͬʱʱֻһˢ
+    IF NOT pg_try_advisory_xact_lock(hashtext('proc_refresh_report_view'), hashtext(p_view)) THEN
+        RETURN NULL;
+    END IF;
+
+    IF EXISTS (SELECT 1 FROM report_refresh
+               WHERE view_name = p_view AND refreshed_at > LOCALTIMESTAMP - p_max_age) THEN
+        RETURN NULL;
+    END IF;
+
+    v_started := clock_timestamp()::TIMESTAMP;
+    EXECUTE format('REFRESH MATERIALIZED VIEW CONCURRENTLY %I', p_view);
+
+    INSERT INTO report_refresh (view_name, refreshed_at, duration_ms)
+    VALUES (p_view, v_started, (EXTRACT(EPOCH FROM clock_timestamp()::TIMESTAMP - v_started) * 1000)::INT)
+    ON CONFLICT (view_name) DO UPDATE
+    SET refreshed_at = EXCLUDED.refreshed_at, duration_ms = EXCLUDED.duration_ms;
+
+    RETURN v_started;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 14. ϲջܵķͰУǰдѺ٣ÿÿͺϲΪͰ 0 һУ
+-- غϲģ, ͣɺ̨ʱÿִУҲͨ flask finance-summary compact ִ
+CREATE OR REPLACE FUNCTION proc_compact_financial_daily_summary()
+RETURNS INT AS $$
+DECLARE
+    v_rows INT;
+BEGIN
+    WITH moved AS (
+        DELETE FROM financial_daily_summary
+        WHERE bucket <> 0 AND day < CURRENT_DATE
+        RETURNING day, type, total_amount, record_count
+    )
+    INSERT INTO financial_daily_summary (day, type, bucket, total_amount, record_count)
+    SELECT day, type, 0, SUM(total_amount), SUM(record_count)
+    FROM moved
+    GROUP BY day, type
+    ON CONFLICT (day, type, bucket) DO UPDATE
+    SET total_amount = financial_daily_summary.total_amount + EXCLUDED.total_amount,
+        record_count = financial_daily_summary.record_count + EXCLUDED.record_count;
+
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+    RETURN v_rows;
+END;
+$$ LANGUAGE plpgsql;
@@ -16,8 +16,19 @@ WHERE
     stock < 10
 ORDER BY stock ASC;
 
+-- ͼΪﻯͼȡʱͳƣӦڵĶʱ񣨻 flask reports refresh
+--  proc_refresh_report_view  REFRESH ... CONCURRENTLY ˢ£ˢڼԿɶȡ
+-- CONCURRENTLY ҪﻯͼΨһͼвڶȡʱС
+
+-- ﻯͼˢ¼¼ÿͼݶӦʱ㣨ˢ¿ʼʱ̣ˢºʱ
+CREATE TABLE report_refresh (
+    view_name VARCHAR(64) PRIMARY KEY,
+    refreshed_at TIMESTAMP NOT NULL,
+    duration_ms INT NOT NULL DEFAULT 0
+);
+
 -- ͳͼͼͳ۶
-CREATE VIEW view_sales_statistics AS
+CREATE MATERIALIZED VIEW view_sales_statistics AS
 SELECT
     b.book_id,
     b.isbn,
@@ -31,11 +42,12 @@ GROUP BY
     b.book_id,
     b.isbn,
     b.title,
-    b.author
-ORDER BY total_revenue DESC;
+    b.author;
+
+CREATE UNIQUE INDEX uq_view_sales_statistics ON view_sales_statistics (book_id);
 
 -- ͳͼ
-CREATE VIEW view_purchase_statistics AS
+CREATE MATERIALIZED VIEW view_purchase_statistics AS
 SELECT
     b.book_id,
     b.isbn,
@@ -53,11 +65,12 @@ WHERE
 GROUP BY
     b.book_id,
     b.isbn,
-    b.title
-ORDER BY total_cost DESC;
+    b.title;
+
+CREATE UNIQUE INDEX uq_view_purchase_statistics ON view_purchase_statistics (book_id);
 
 -- ûҵͼ
-CREATE VIEW view_user_sales_performance AS
+CREATE MATERIALIZED VIEW view_user_sales_performance AS
 SELECT
     u.user_id,
     u.username,
@@ -70,8 +83,9 @@ FROM "user" u
 GROUP BY
     u.user_id,
     u.username,
-    u.real_name
-ORDER BY total_revenue DESC;
+    u.real_name;
+
+CREATE UNIQUE INDEX uq_view_user_sales_performance ON view_user_sales_performance (user_id);
 
 -- δɽͼ
 CREATE VIEW view_pending_purchase_orders AS
@@ -96,11 +110,35 @@ GROUP BY
     u.username
 ORDER BY po.create_time ASC;
 
--- ¶ȱͼ
-CREATE VIEW view_monthly_finance AS
-SELECT TO_CHAR (record_time, 'YYYY-MM') AS month, type, SUM(amount) AS total_amount
-FROM financial_record
+-- ¶ȱͼɲջܱºϼƣˢ´йأ¼޹
+CREATE MATERIALIZED VIEW view_monthly_finance AS
+SELECT TO_CHAR (day, 'YYYY-MM') AS month, type, SUM(total_amount) AS total_amount
+FROM financial_daily_summary
 GROUP BY
-    TO_CHAR (record_time, 'YYYY-MM'),
-    type
-ORDER BY month DESC, type;
\ No newline at end of file
+    TO_CHAR (day, 'YYYY-MM'),
+    type;
+
+CREATE UNIQUE INDEX uq_view_monthly_finance ON view_monthly_finance (month, type);
+
+INSERT INTO report_refresh (view_name, refreshed_at)
+VALUES
+    ('view_sales_statistics', CURRENT_TIMESTAMP),
+    ('view_purchase_statistics', CURRENT_TIMESTAMP),
+    ('view_user_sales_performance', CURRENT_TIMESTAMP),
+    ('view_monthly_finance', CURRENT_TIMESTAMP);
+
+-- ·бۼ¼Ͳ¼ά͹鵵ʹ
+CREATE VIEW view_partitions AS
+SELECT
+    parent.relname AS parent_table,
+    child.relname AS partition_name,
+    pg_get_expr (child.relpartbound, child.oid) AS partition_bound,
+    GREATEST(child.reltuples, 0)::BIGINT AS estimated_rows,
+    pg_total_relation_size (child.oid) AS total_bytes
+FROM
+    pg_inherits i
+    JOIN pg_class parent ON parent.oid = i.inhparent
+    JOIN pg_class child ON child.oid = i.inhrelid
+WHERE
+    parent.relname IN ('sale_record', 'financial_record')
+ORDER BY parent.relname, child.relname;
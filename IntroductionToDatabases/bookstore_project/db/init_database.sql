@@ -5,12 +5,13 @@
 CREATE TABLE "user" (
     user_id SERIAL PRIMARY KEY,
     username VARCHAR(50) NOT NULL UNIQUE,
-    password VARCHAR(32) NOT NULL, -- MD5ܵ
+    password VARCHAR(255) NOT NULL, -- scrypt/PBKDF2 ϣɵ MD5 ϣڵ¼ɹԶ
     real_name VARCHAR(100) NOT NULL,
     employee_id VARCHAR(20) NOT NULL,
     gender VARCHAR(2) NOT NULL CHECK (gender IN ('', 'Ů')), -- PostgreSQLʹCHECKENUM
     age INT CHECK (age > 0),
     role VARCHAR(10) NOT NULL CHECK (role IN ('Ա', 'ͨԱ')),
+    auth_version INT NOT NULL DEFAULT 1, -- ɫ仯ʱһʹѵ¼ỰȨʧЧ
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
@@ -70,22 +71,27 @@ CREATE TABLE purchase_detail (
     FOREIGN KEY (book_id) REFERENCES book (book_id)
 );
 
--- ۼ¼
+-- ۼ¼ sale_time ·Ϊ sale_record_pYYYYMM
+-- κ·ݷнĬϷ sale_record_default
+-- ·ݷ proc_ensure_partitions Ԥȴ create_functions.sql
 CREATE TABLE sale_record (
-    sale_id SERIAL PRIMARY KEY,
+    sale_id SERIAL,
     book_id INT NOT NULL,
     quantity INT NOT NULL,
     sale_price DECIMAL(10, 2) NOT NULL,
     sale_time TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
     seller_id INT NOT NULL,
     remark VARCHAR(500),
+    PRIMARY KEY (sale_id, sale_time),
     FOREIGN KEY (book_id) REFERENCES book (book_id),
     FOREIGN KEY (seller_id) REFERENCES "user" (user_id)
-);
+) PARTITION BY RANGE (sale_time);
+
+CREATE TABLE sale_record_default PARTITION OF sale_record DEFAULT;
 
--- ¼
+-- ¼ record_time ·Ϊ financial_record_pYYYYMM
 CREATE TABLE financial_record (
-    record_id SERIAL PRIMARY KEY,
+    record_id SERIAL,
     type VARCHAR(10) NOT NULL CHECK (type IN ('', '֧')),
     amount DECIMAL(12, 2) NOT NULL,
     source_type VARCHAR(10) NOT NULL CHECK (source_type IN ('', '')),
@@ -93,10 +99,43 @@ CREATE TABLE financial_record (
     record_time TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
     operator_id INT NOT NULL,
     description VARCHAR(500),
-    FOREIGN KEY (operator_id) REFERENCES "user" (user_id)
+    PRIMARY KEY (record_id, record_time),
+    FOREIGN KEY (operator_id) REFERENCES "user" (user_id),
+    -- ΨһԼ۵Ĳ¼ʱȡʱ䣬
+    -- ͬһظдʱжͬԻᱻܾ
+    CONSTRAINT uq_financial_source UNIQUE (source_type, source_id, record_time)
+) PARTITION BY RANGE (record_time);
+
+CREATE TABLE financial_record_default PARTITION OF financial_record DEFAULT;
+
+-- Ѽ˵ĲԴļ¼ʱǸʱ̣uq_financial_source
+-- ޷ֹͬһڲͬʱظˣproc_pay_purchase_order д¼ǰȵǼԴ
+-- ֤ÿŽֻһΣ鵵¼ʱ
+CREATE TABLE financial_source (
+    source_type VARCHAR(10) NOT NULL CHECK (source_type IN ('', '')),
+    source_id INT NOT NULL,
+    PRIMARY KEY (source_type, source_id)
+);
+
+-- ջܱ financial_record ϵĴά
+-- ÿÿͷΪͰдۼӵͬУȡʱ졢ͺϼƸͰ
+CREATE TABLE financial_daily_summary (
+    day DATE NOT NULL,
+    type VARCHAR(10) NOT NULL CHECK (type IN ('', '֧')),
+    bucket SMALLINT NOT NULL DEFAULT 0,
+    total_amount DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    record_count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, type, bucket)
+);
+
+-- ѹ鵵·ݷarchived_before ֮ǰ·ѵӸ루flask partitions archive
+-- ջܱЩ·ݵĽһԼؽֻ archived_before ֮
+CREATE TABLE partition_archive (
+    table_name VARCHAR(64) PRIMARY KEY,
+    archived_before DATE NOT NULL
 );
 
--- ʼԱû(: admin123)
+-- ʼԱû(: admin123״ε¼ԶΪ scrypt ϣ)
 INSERT INTO
     "user" (
         username,
@@ -118,18 +157,43 @@ VALUES (
     );
 
 -- ߲ѯ
-CREATE INDEX idx_book_title ON book (title);
+-- ͼƴıϵ GiST Ԫͬʱ֧ ILIKE '%ؼ%' Ӵ˺Ͱƶȵ KNN 
+-- ʽ backend/search.py е SEARCH_TEXT һ£
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX idx_book_search_trgm ON book
+    USING GIST ((title || ' ' || author || ' ' || publisher || ' ' || isbn) gist_trgm_ops);
+
+-- ͼǰ׺ƥ
+CREATE INDEX idx_book_title_prefix ON book (lower(title) text_pattern_ops);
+
+CREATE INDEX idx_book_author_prefix ON book (lower(author) text_pattern_ops);
 
-CREATE INDEX idx_book_author ON book (author);
+-- Ԥֻ治ͼ
+CREATE INDEX idx_book_low_stock ON book (stock) WHERE stock < 10;
 
-CREATE INDEX idx_book_publisher ON book (publisher);
+-- ϸءͼңδ book_id Ϊգ
+CREATE INDEX idx_purchase_detail_order ON purchase_detail (order_id);
 
-CREATE INDEX idx_purchase_order_status ON purchase_order (status);
+CREATE INDEX idx_purchase_detail_book ON purchase_detail (book_id) WHERE book_id IS NOT NULL;
+
+-- ״̬ɸѡʱҳ
+CREATE INDEX idx_purchase_order_status_time ON purchase_order (status, create_time, order_id);
 
 CREATE INDEX idx_purchase_order_creator ON purchase_order (creator_id);
 
-CREATE INDEX idx_sale_seller ON sale_record (seller_id);
+-- ϵԶÿϴ
+CREATE INDEX idx_sale_seller_time ON sale_record (seller_id, sale_time, sale_id);
+
+-- ͼɾͼǰĹ飬INCLUDE ֻɨ
+CREATE INDEX idx_sale_book ON sale_record (book_id) INCLUDE (quantity, sale_price);
+
+-- бӿڵļҳ (ʱ, ) ʹø
+CREATE INDEX idx_sale_time ON sale_record (sale_time, sale_id);
+
+CREATE INDEX idx_purchase_order_time ON purchase_order (create_time, order_id);
 
-CREATE INDEX idx_sale_time ON sale_record (sale_time);
+CREATE INDEX idx_financial_time ON financial_record (record_time, record_id);
 
-CREATE INDEX idx_financial_source ON financial_record (source_type, source_id);
\ No newline at end of file
+-- ¶ͳư  + ʱ䷶Χ ѯINCLUDE amount ֻɨ
+CREATE INDEX idx_financial_type_time ON financial_record (type, record_time) INCLUDE (amount);
\ No newline at end of file
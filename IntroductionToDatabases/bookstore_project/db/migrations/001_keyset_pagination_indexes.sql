@@ -0,0 +1,12 @@
+-- ӵݿ
+\c bookstore_management;
+
+-- ҳбӿڰ (ʱ, ) ҳ
+-- ݿִбű½ݿ init_database.sql ֱӴ
+DROP INDEX IF EXISTS idx_sale_time;
+
+CREATE INDEX idx_sale_time ON sale_record (sale_time, sale_id);
+
+CREATE INDEX IF NOT EXISTS idx_purchase_order_time ON purchase_order (create_time, order_id);
+
+CREATE INDEX IF NOT EXISTS idx_financial_time ON financial_record (record_time, record_id);
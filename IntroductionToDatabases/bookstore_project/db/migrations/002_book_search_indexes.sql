@@ -0,0 +1,24 @@
+-- ӵݿ
+\c bookstore_management;
+
+-- ͼԭеB޷ ILIKE '%ؼ%'滻ΪԪGIN
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+DROP INDEX IF EXISTS idx_book_title;
+
+DROP INDEX IF EXISTS idx_book_author;
+
+DROP INDEX IF EXISTS idx_book_publisher;
+
+CREATE INDEX IF NOT EXISTS idx_book_title_trgm ON book USING GIN (title gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_book_author_trgm ON book USING GIN (author gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_book_publisher_trgm ON book USING GIN (publisher gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_book_isbn_trgm ON book USING GIN (isbn gin_trgm_ops);
+
+-- ǰ׺ƥ䣨ؼ * β
+CREATE INDEX IF NOT EXISTS idx_book_title_prefix ON book (lower(title) text_pattern_ops);
+
+CREATE INDEX IF NOT EXISTS idx_book_author_prefix ON book (lower(author) text_pattern_ops);
@@ -0,0 +1,94 @@
+-- ӵݿ
+\c bookstore_management;
+
+-- ջܱܽӿڶȡܵУɨȫ¼
+CREATE TABLE IF NOT EXISTS financial_daily_summary (
+    day DATE NOT NULL,
+    type VARCHAR(10) NOT NULL CHECK (type IN ('', '֧')),
+    total_amount DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    record_count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, type)
+);
+
+DROP TRIGGER IF EXISTS trg_financial_daily_summary ON financial_record;
+
+-- 6. ջά
+-- д¼·proc_sell_bookproc_pay_purchase_ordertrg_after_sale_insert_func
+-- ôͬһۼӵջܱ
+CREATE OR REPLACE FUNCTION trg_financial_daily_summary_func()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE financial_daily_summary
+        SET total_amount = total_amount - OLD.amount,
+            record_count = record_count - 1
+        WHERE day = OLD.record_time::DATE AND type = OLD.type;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO financial_daily_summary (day, type, total_amount, record_count)
+        VALUES (NEW.record_time::DATE, NEW.type, NEW.amount, 1)
+        ON CONFLICT (day, type) DO UPDATE
+        SET total_amount = financial_daily_summary.total_amount + EXCLUDED.total_amount,
+            record_count = financial_daily_summary.record_count + 1;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_financial_daily_summary
+AFTER INSERT OR UPDATE OR DELETE ON financial_record
+FOR EACH ROW
+EXECUTE FUNCTION trg_financial_daily_summary_func();
+
+-- 7. ؽջܣ״β޸һ£ػ
+CREATE OR REPLACE FUNCTION proc_rebuild_financial_daily_summary()
+RETURNS INT AS $$
+DECLARE
+    v_rows INT;
+BEGIN
+    -- ؽڼֹµĲ¼д룬©
+    LOCK TABLE financial_record IN SHARE MODE;
+
+    DELETE FROM financial_daily_summary;
+
+    INSERT INTO financial_daily_summary (day, type, total_amount, record_count)
+    SELECT record_time::DATE, type, SUM(amount), COUNT(*)
+    FROM financial_record
+    GROUP BY record_time::DATE, type;
+
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+    RETURN v_rows;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 8. ջһԼ飬ػܱϸһµں
+CREATE OR REPLACE FUNCTION fn_check_financial_daily_summary()
+RETURNS TABLE (
+    day DATE,
+    type VARCHAR(10),
+    summary_amount DECIMAL(14, 2),
+    actual_amount DECIMAL(14, 2),
+    summary_count INT,
+    actual_count INT
+) AS $$
+    SELECT
+        COALESCE(s.day, a.day),
+        COALESCE(s.type, a.type),
+        COALESCE(s.total_amount, 0),
+        COALESCE(a.total_amount, 0),
+        COALESCE(s.record_count, 0),
+        COALESCE(a.record_count, 0)::INT
+    FROM financial_daily_summary s
+    FULL OUTER JOIN (
+        SELECT record_time::DATE AS day, type, SUM(amount) AS total_amount, COUNT(*) AS record_count
+        FROM financial_record
+        GROUP BY record_time::DATE, type
+    ) a ON s.day = a.day AND s.type = a.type
+    WHERE COALESCE(s.total_amount, 0) <> COALESCE(a.total_amount, 0)
+       OR COALESCE(s.record_count, 0) <> COALESCE(a.record_count, 0)
+    ORDER BY 1, 2;
+$$ LANGUAGE sql;
+
+-- ʷ
+SELECT proc_rebuild_financial_daily_summary();
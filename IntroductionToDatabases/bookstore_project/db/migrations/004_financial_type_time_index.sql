@@ -0,0 +1,5 @@
+-- ӵݿ
+\c bookstore_management;
+
+-- ¶ͳư  + ʱ䷶Χ ѯINCLUDE amount ֻɨ
+CREATE INDEX IF NOT EXISTS idx_financial_type_time ON financial_record (type, record_time) INCLUDE (amount);
@@ -0,0 +1,121 @@
+-- ӵݿ
+\c bookstore_management;
+
+-- ۸Ϊĵۼ治ͳһʹ SQLSTATE BK001
+
+-- 1. ͼ洢
+-- ۼһ UPDATEͬһʱŶӣ
+-- õжϿ棬ͬʱͨ鵼¿Ϊ
+-- 治ʱ׳ SQLSTATE BK001ȴ lock_timeout ʱ׳ 55P03ԣ
+CREATE OR REPLACE FUNCTION proc_sell_book(
+    p_book_id INT,
+    p_quantity INT,
+    p_seller_id INT,
+    p_sale_price DECIMAL(10, 2),
+    p_remark VARCHAR(500),
+    OUT p_sale_id INT
+) 
+AS $$
+DECLARE
+    current_stock INT;
+    v_error_msg VARCHAR(100);
+BEGIN
+    -- 㹻ʱۼ棬޸κ
+    UPDATE book SET stock = stock - p_quantity
+    WHERE book_id = p_book_id AND stock >= p_quantity;
+    
+    IF NOT FOUND THEN
+        SELECT stock INTO current_stock FROM book WHERE book_id = p_book_id;
+        IF current_stock IS NULL THEN
+            RAISE EXCEPTION 'ͼ鲻';
+        END IF;
+        v_error_msg := CONCAT('治㣬ǰ: ', current_stock, ', Ҫ: ', p_quantity);
+        RAISE EXCEPTION '%', v_error_msg USING ERRCODE = 'BK001';
+    END IF;
+    
+    -- ۼ¼
+    INSERT INTO sale_record (book_id, quantity, sale_price, seller_id, remark)
+    VALUES (p_book_id, p_quantity, p_sale_price, p_seller_id, p_remark)
+    RETURNING sale_id INTO p_sale_id;
+    
+    -- Ӳ¼
+    INSERT INTO financial_record (type, amount, source_type, source_id, operator_id, description)
+    VALUES ('', p_quantity * p_sale_price, '', p_sale_id, p_seller_id, 
+            CONCAT('ͼID: ', p_book_id, ', : ', p_quantity));
+END;
+$$ LANGUAGE plpgsql
+SET lock_timeout = '5s';
+
+-- 9. ۴洢̣ﳵ㣩
+-- p_items ʽ: [{"book_id": 1, "quantity": 2, "sale_price": 35.00, "remark": ""}, ...]
+-- ÿһУ˳ţӦۼ¼IDκһʧع
+CREATE OR REPLACE FUNCTION proc_sell_books(
+    p_items JSONB,
+    p_seller_id INT
+) RETURNS TABLE (p_line_no INT, p_sale_id INT) AS $$
+DECLARE
+    v_book_id INT;
+    v_stock INT;
+    v_needed INT;
+BEGIN
+    --  book_id ˳漰ͼ飬̨ʱụ
+    PERFORM 1 FROM book
+    WHERE book_id IN (SELECT (e->>'book_id')::INT FROM jsonb_array_elements(p_items) AS e)
+    ORDER BY book_id
+    FOR UPDATE;
+
+    -- ͼǷڡǷ㹻ͬһڶʱϼжϣ
+    SELECT d.book_id, b.stock, d.quantity INTO v_book_id, v_stock, v_needed
+    FROM (
+        SELECT (e->>'book_id')::INT AS book_id, SUM((e->>'quantity')::INT) AS quantity
+        FROM jsonb_array_elements(p_items) AS e
+        GROUP BY 1
+    ) d
+    LEFT JOIN book b ON b.book_id = d.book_id
+    WHERE b.book_id IS NULL OR b.stock < d.quantity
+    ORDER BY d.book_id
+    LIMIT 1;
+
+    IF FOUND THEN
+        IF v_stock IS NULL THEN
+            RAISE EXCEPTION 'ͼID: %', v_book_id;
+        END IF;
+        RAISE EXCEPTION 'ͼID % 治㣬ǰ: %, Ҫ: %', v_book_id, v_stock, v_needed
+            USING ERRCODE = 'BK001';
+    END IF;
+
+    -- һۼͼĿ
+    UPDATE book b
+    SET stock = b.stock - d.quantity
+    FROM (
+        SELECT (e->>'book_id')::INT AS book_id, SUM((e->>'quantity')::INT) AS quantity
+        FROM jsonb_array_elements(p_items) AS e
+        GROUP BY 1
+    ) d
+    WHERE b.book_id = d.book_id;
+
+    -- ԤȷIDԱ봫жӦ¼ trg_after_sale_insert 
+    RETURN QUERY
+    WITH items AS (
+        SELECT
+            t.line_no::INT AS line_no,
+            nextval(pg_get_serial_sequence('sale_record', 'sale_id'))::INT AS sale_id,
+            (t.e->>'book_id')::INT AS book_id,
+            (t.e->>'quantity')::INT AS quantity,
+            (t.e->>'sale_price')::DECIMAL(10, 2) AS sale_price,
+            COALESCE(t.e->>'remark', '') AS remark
+        FROM jsonb_array_elements(p_items) WITH ORDINALITY AS t(e, line_no)
+    ),
+    inserted AS (
+        INSERT INTO sale_record (sale_id, book_id, quantity, sale_price, seller_id, remark)
+        SELECT items.sale_id, items.book_id, items.quantity, items.sale_price, p_seller_id, items.remark
+        FROM items
+        RETURNING sale_record.sale_id
+    )
+    SELECT items.line_no, items.sale_id
+    FROM items
+    JOIN inserted ON inserted.sale_id = items.sale_id
+    ORDER BY items.line_no;
+END;
+$$ LANGUAGE plpgsql
+SET lock_timeout = '5s';
@@ -0,0 +1,85 @@
+-- ӵݿ
+\c bookstore_management;
+
+-- ⣺һΰѸеȫϸͼ
+
+-- 10. 洢
+-- ѸδϸһԼͼ
+-- p_prices Ϊ {"ϸID": ۼ, ...}δгϸʹ p_default_price
+-- ͬһISBNͬϸϲΪһ飬ISBNͼеֻۼӿ棨޸ۼۣ
+-- ÿϸӦͼIDԼǷϲͼ
+CREATE OR REPLACE FUNCTION proc_receive_new_books(
+    p_order_id INT,
+    p_prices JSONB,
+    p_default_price DECIMAL(10, 2)
+) RETURNS TABLE (p_detail_id INT, p_book_id INT, p_merged BOOLEAN) AS $$
+DECLARE
+    v_order_status VARCHAR(20);
+    v_detail_id INT;
+BEGIN
+    -- ͬһᱻظ
+    SELECT status INTO v_order_status FROM purchase_order WHERE order_id = p_order_id FOR UPDATE;
+
+    IF v_order_status IS NULL THEN
+        RAISE EXCEPTION '';
+    ELSIF v_order_status != 'Ѹ' THEN
+        RAISE EXCEPTION 'ֻѸĶеͼӵ';
+    END IF;
+
+    -- Ҫ½ͼ鵫ûۼ۵ϸ
+    SELECT pd.detail_id INTO v_detail_id
+    FROM purchase_detail pd
+    WHERE pd.order_id = p_order_id
+      AND pd.is_new_book
+      AND COALESCE((p_prices->>pd.detail_id::TEXT)::DECIMAL(10, 2), p_default_price) IS NULL
+      AND NOT EXISTS (SELECT 1 FROM book b WHERE b.isbn = pd.isbn)
+    ORDER BY pd.detail_id
+    LIMIT 1;
+
+    IF FOUND THEN
+        RAISE EXCEPTION 'ϸ % ȱۼ', v_detail_id;
+    END IF;
+
+    RETURN QUERY
+    WITH lines AS (
+        SELECT
+            pd.detail_id, pd.isbn, pd.title, pd.author, pd.publisher, pd.quantity,
+            COALESCE((p_prices->>pd.detail_id::TEXT)::DECIMAL(10, 2), p_default_price) AS retail_price
+        FROM purchase_detail pd
+        WHERE pd.order_id = p_order_id AND pd.is_new_book
+        FOR UPDATE
+    ),
+    -- ON CONFLICT һθͬһУȰISBNϲ
+    grouped AS (
+        SELECT
+            isbn,
+            (ARRAY_AGG(title ORDER BY detail_id))[1] AS title,
+            (ARRAY_AGG(author ORDER BY detail_id))[1] AS author,
+            (ARRAY_AGG(publisher ORDER BY detail_id))[1] AS publisher,
+            COALESCE((ARRAY_AGG(retail_price ORDER BY detail_id) FILTER (WHERE retail_price IS NOT NULL))[1], 0) AS retail_price,
+            SUM(quantity) AS quantity
+        FROM lines
+        GROUP BY isbn
+    ),
+    upserted AS (
+        INSERT INTO book (isbn, title, author, publisher, retail_price, stock)
+        SELECT isbn, title, author, publisher, retail_price, quantity
+        FROM grouped
+        ON CONFLICT (isbn) DO UPDATE
+        SET stock = book.stock + EXCLUDED.stock
+        RETURNING book.book_id, book.isbn, (xmax <> 0) AS merged
+    ),
+    linked AS (
+        UPDATE purchase_detail pd
+        SET book_id = u.book_id, is_new_book = FALSE
+        FROM lines l
+        JOIN upserted u ON u.isbn = l.isbn
+        WHERE pd.detail_id = l.detail_id
+        RETURNING pd.detail_id, u.book_id, u.merged
+    )
+    SELECT linked.detail_id, linked.book_id, linked.merged
+    FROM linked
+    ORDER BY linked.detail_id;
+END;
+$$ LANGUAGE plpgsql
+SET lock_timeout = '5s';
@@ -0,0 +1,5 @@
+-- ӵݿ
+\c bookstore_management;
+
+-- ỰȨİ汾ţ޸Ľɫʱһѵ¼ĻỰһʱǩ
+ALTER TABLE "user" ADD COLUMN IF NOT EXISTS auth_version INT NOT NULL DEFAULT 1;
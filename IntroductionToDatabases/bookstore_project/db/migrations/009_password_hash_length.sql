@@ -0,0 +1,5 @@
+-- ӵݿ
+\c bookstore_management;
+
+--  scrypt/PBKDF2 ϣֶμӿɵ MD5 ϣû¼ɹԶ
+ALTER TABLE "user" ALTER COLUMN password TYPE VARCHAR(255);
@@ -0,0 +1,43 @@
+-- ӵݿ
+\c bookstore_management;
+
+-- ݰ汾ţͼ顢ۡûбֻӿھݴ ETag
+
+-- 11. ݰ汾ţHTTP ETag ʹã
+-- ÿűһУݱ仯ύʱȡһ nextval
+-- ȡе last_value жǷ仯Ҫɨ
+-- вعӰ졢д֮䲻ụȴ
+CREATE SEQUENCE IF NOT EXISTS data_version_book;
+CREATE SEQUENCE IF NOT EXISTS data_version_sale_record;
+CREATE SEQUENCE IF NOT EXISTS data_version_user;
+
+CREATE OR REPLACE FUNCTION trg_bump_data_version_func()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM nextval('data_version_' || TG_TABLE_NAME);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ԼӳٵύʱִУѡȡѿ°汾šȴδύ
+-- ʱ䴰Сύ̱ᰴɴ ETag Ӧ
+DROP TRIGGER IF EXISTS trg_data_version_book ON book;
+CREATE CONSTRAINT TRIGGER trg_data_version_book
+AFTER INSERT OR UPDATE OR DELETE ON book
+DEFERRABLE INITIALLY DEFERRED
+FOR EACH ROW
+EXECUTE FUNCTION trg_bump_data_version_func();
+
+DROP TRIGGER IF EXISTS trg_data_version_sale_record ON sale_record;
+CREATE CONSTRAINT TRIGGER trg_data_version_sale_record
+AFTER INSERT OR UPDATE OR DELETE ON sale_record
+DEFERRABLE INITIALLY DEFERRED
+FOR EACH ROW
+EXECUTE FUNCTION trg_bump_data_version_func();
+
+DROP TRIGGER IF EXISTS trg_data_version_user ON "user";
+CREATE CONSTRAINT TRIGGER trg_data_version_user
+AFTER INSERT OR UPDATE OR DELETE ON "user"
+DEFERRABLE INITIALLY DEFERRED
+FOR EACH ROW
+EXECUTE FUNCTION trg_bump_data_version_func();
@@ -0,0 +1,68 @@
+-- ӵݿ
+\c bookstore_management;
+
+-- ۵Ĳ¼ֻ trg_after_sale_insert дһΣ
+--  (source_type, source_id) ΨһԼ֤ظ
+
+-- ǰ proc_sell_book 봥ظдĲ¼ÿԴһ
+-- ջ financial_record ϵĴͬۼ
+DELETE FROM financial_record f
+USING financial_record keep
+WHERE keep.source_type = f.source_type
+  AND keep.source_id = f.source_id
+  AND keep.record_id < f.record_id;
+
+-- ΨһԼͬʱԭ idx_financial_source
+ALTER TABLE financial_record ADD CONSTRAINT uq_financial_source UNIQUE (source_type, source_id);
+DROP INDEX IF EXISTS idx_financial_source;
+
+-- 1. ͼ洢
+-- ۼһ UPDATEͬһʱŶӣ
+-- õжϿ棬ͬʱͨ鵼¿Ϊ
+-- 治ʱ׳ SQLSTATE BK001ȴ lock_timeout ʱ׳ 55P03ԣ
+CREATE OR REPLACE FUNCTION proc_sell_book(
+    p_book_id INT,
+    p_quantity INT,
+    p_seller_id INT,
+    p_sale_price DECIMAL(10, 2),
+    p_remark VARCHAR(500),
+    OUT p_sale_id INT
+) 
+AS $$
+DECLARE
+    current_stock INT;
+    v_error_msg VARCHAR(100);
+BEGIN
+    -- 㹻ʱۼ棬޸κ
+    UPDATE book SET stock = stock - p_quantity
+    WHERE book_id = p_book_id AND stock >= p_quantity;
+    
+    IF NOT FOUND THEN
+        SELECT stock INTO current_stock FROM book WHERE book_id = p_book_id;
+        IF current_stock IS NULL THEN
+            RAISE EXCEPTION 'ͼ鲻';
+        END IF;
+        v_error_msg := CONCAT('治㣬ǰ: ', current_stock, ', Ҫ: ', p_quantity);
+        RAISE EXCEPTION '%', v_error_msg USING ERRCODE = 'BK001';
+    END IF;
+    
+    -- ۼ¼¼ trg_after_sale_insert ɣ
+    INSERT INTO sale_record (book_id, quantity, sale_price, seller_id, remark)
+    VALUES (p_book_id, p_quantity, p_sale_price, p_seller_id, p_remark)
+    RETURNING sale_id INTO p_sale_id;
+END;
+$$ LANGUAGE plpgsql
+SET lock_timeout = '5s';
+
+-- 4. Զ۲¼Ĵ
+-- Ĳ¼ֻɸôд루ۡԼֱӲۼ¼
+-- ΨһԼ uq_financial_source ֤ÿֻһ¼
+CREATE OR REPLACE FUNCTION trg_after_sale_insert_func()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO financial_record (type, amount, source_type, source_id, operator_id, description)
+    VALUES ('', NEW.quantity * NEW.sale_price, '', NEW.sale_id, NEW.seller_id, 
+            CONCAT('ͼID: ', NEW.book_id, ', : ', NEW.quantity));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,263 @@
+-- ӵݿ
+\c bookstore_management;
+
+-- sale_recordfinancial_record Ϊ·Χsale_time / record_time
+-- һ½½ݣɾԭ
+-- ִڼűۺ͸ȴͣҵʱִС
+
+BEGIN;
+
+LOCK TABLE sale_record, financial_record IN ACCESS EXCLUSIVE MODE;
+
+-- ԭͼؽ
+DROP VIEW IF EXISTS view_sales_statistics;
+DROP VIEW IF EXISTS view_user_sales_performance;
+DROP VIEW IF EXISTS view_monthly_finance;
+
+-- ԭͷ±ͬԼ
+ALTER TABLE sale_record RENAME TO sale_record_unpartitioned;
+ALTER TABLE sale_record_unpartitioned RENAME CONSTRAINT sale_record_pkey TO sale_record_unpartitioned_pkey;
+DROP INDEX IF EXISTS idx_sale_seller;
+DROP INDEX IF EXISTS idx_sale_time;
+
+ALTER TABLE financial_record RENAME TO financial_record_unpartitioned;
+ALTER TABLE financial_record_unpartitioned RENAME CONSTRAINT financial_record_pkey TO financial_record_unpartitioned_pkey;
+ALTER TABLE financial_record_unpartitioned DROP CONSTRAINT IF EXISTS uq_financial_source;
+DROP INDEX IF EXISTS idx_financial_source;
+DROP INDEX IF EXISTS idx_financial_time;
+DROP INDEX IF EXISTS idx_financial_type_time;
+
+-- ת±ɾԭʱᱻһɾ
+ALTER SEQUENCE sale_record_sale_id_seq OWNED BY NONE;
+ALTER SEQUENCE financial_record_record_id_seq OWNED BY NONE;
+
+CREATE TABLE sale_record (
+    sale_id INT NOT NULL DEFAULT nextval('sale_record_sale_id_seq'),
+    book_id INT NOT NULL,
+    quantity INT NOT NULL,
+    sale_price DECIMAL(10, 2) NOT NULL,
+    sale_time TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    seller_id INT NOT NULL,
+    remark VARCHAR(500),
+    PRIMARY KEY (sale_id, sale_time),
+    FOREIGN KEY (book_id) REFERENCES book (book_id),
+    FOREIGN KEY (seller_id) REFERENCES "user" (user_id)
+) PARTITION BY RANGE (sale_time);
+
+CREATE TABLE sale_record_default PARTITION OF sale_record DEFAULT;
+
+CREATE TABLE financial_record (
+    record_id INT NOT NULL DEFAULT nextval('financial_record_record_id_seq'),
+    type VARCHAR(10) NOT NULL CHECK (type IN ('', '֧')),
+    amount DECIMAL(12, 2) NOT NULL,
+    source_type VARCHAR(10) NOT NULL CHECK (source_type IN ('', '')),
+    source_id INT NOT NULL,
+    record_time TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    operator_id INT NOT NULL,
+    description VARCHAR(500),
+    PRIMARY KEY (record_id, record_time),
+    FOREIGN KEY (operator_id) REFERENCES "user" (user_id),
+    CONSTRAINT uq_financial_source UNIQUE (source_type, source_id, record_time)
+) PARTITION BY RANGE (record_time);
+
+CREATE TABLE financial_record_default PARTITION OF financial_record DEFAULT;
+
+ALTER SEQUENCE sale_record_sale_id_seq OWNED BY sale_record.sale_id;
+ALTER SEQUENCE financial_record_record_id_seq OWNED BY financial_record.record_id;
+
+-- ά create_functions.sql 12ͬ
+CREATE OR REPLACE FUNCTION proc_create_monthly_partitions(
+    p_table TEXT,
+    p_from DATE,
+    p_to DATE
+) RETURNS INT AS $$
+DECLARE
+    v_column TEXT;
+    v_month DATE;
+    v_next DATE;
+    v_name TEXT;
+    v_conflict BOOLEAN;
+    v_created INT := 0;
+BEGIN
+    v_column := CASE p_table
+        WHEN 'sale_record' THEN 'sale_time'
+        WHEN 'financial_record' THEN 'record_time'
+    END;
+    IF v_column IS NULL THEN
+        RAISE EXCEPTION '% ǰ·ı', p_table;
+    END IF;
+
+    -- ӦýͬʱʱִУظͬһ
+    PERFORM pg_advisory_xact_lock(hashtext('proc_create_monthly_partitions'));
+
+    v_month := date_trunc('month', p_from)::DATE;
+    WHILE v_month < p_to LOOP
+        v_next := (v_month + INTERVAL '1 month')::DATE;
+        v_name := p_table || '_p' || to_char(v_month, 'YYYYMM');
+
+        IF to_regclass(v_name) IS NULL THEN
+            EXECUTE format(
+                'SELECT EXISTS (SELECT 1 FROM %I WHERE %I >= %L AND %I < %L)',
+                p_table || '_default', v_column, v_month, v_column, v_next
+            ) INTO v_conflict;
+
+            IF v_conflict THEN
+                RAISE WARNING 'ĬϷ %_default  % ݣ %',
+                    p_table, to_char(v_month, 'YYYY-MM'), v_name;
+            ELSE
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+                    v_name, p_table, v_month, v_next
+                );
+                v_created := v_created + 1;
+            END IF;
+        END IF;
+
+        v_month := v_next;
+    END LOOP;
+
+    RETURN v_created;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION proc_ensure_partitions(p_months_ahead INT DEFAULT 3)
+RETURNS INT AS $$
+DECLARE
+    v_from DATE := date_trunc('month', CURRENT_DATE)::DATE;
+    v_to DATE := (date_trunc('month', CURRENT_DATE) + (p_months_ahead + 1) * INTERVAL '1 month')::DATE;
+BEGIN
+    RETURN proc_create_monthly_partitions('sale_record', v_from, v_to)
+         + proc_create_monthly_partitions('financial_record', v_from, v_to);
+END;
+$$ LANGUAGE plpgsql;
+
+-- Ϊڵÿ½ٸݣʱ±ϻûд
+-- Ʋظɲ¼ҲظۼӲջܣ
+SELECT proc_create_monthly_partitions(
+    'sale_record',
+    COALESCE((SELECT MIN(sale_time) FROM sale_record_unpartitioned)::DATE, CURRENT_DATE),
+    CURRENT_DATE
+);
+SELECT proc_create_monthly_partitions(
+    'financial_record',
+    COALESCE((SELECT MIN(record_time) FROM financial_record_unpartitioned)::DATE, CURRENT_DATE),
+    CURRENT_DATE
+);
+SELECT proc_ensure_partitions(3);
+
+INSERT INTO sale_record (sale_id, book_id, quantity, sale_price, sale_time, seller_id, remark)
+SELECT sale_id, book_id, quantity, sale_price, sale_time, seller_id, remark
+FROM sale_record_unpartitioned;
+
+INSERT INTO financial_record (record_id, type, amount, source_type, source_id, record_time, operator_id, description)
+SELECT record_id, type, amount, source_type, source_id, record_time, operator_id, description
+FROM financial_record_unpartitioned;
+
+DROP TABLE sale_record_unpartitioned;
+DROP TABLE financial_record_unpartitioned;
+
+-- ÿԶ
+CREATE INDEX idx_sale_seller ON sale_record (seller_id);
+CREATE INDEX idx_sale_time ON sale_record (sale_time, sale_id);
+CREATE INDEX idx_financial_time ON financial_record (record_time, record_id);
+CREATE INDEX idx_financial_type_time ON financial_record (type, record_time) INCLUDE (amount);
+
+-- ۲¼ʱȡʱ䣻ݰ汾ŴԲ븸
+CREATE OR REPLACE FUNCTION trg_after_sale_insert_func()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO financial_record (type, amount, source_type, source_id, record_time, operator_id, description)
+    VALUES ('', NEW.quantity * NEW.sale_price, '', NEW.sale_id, NEW.sale_time, NEW.seller_id,
+            CONCAT('ͼID: ', NEW.book_id, ', : ', NEW.quantity));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_after_sale_insert
+AFTER INSERT ON sale_record
+FOR EACH ROW
+EXECUTE FUNCTION trg_after_sale_insert_func();
+
+CREATE TRIGGER trg_financial_daily_summary
+AFTER INSERT OR UPDATE OR DELETE ON financial_record
+FOR EACH ROW
+EXECUTE FUNCTION trg_financial_daily_summary_func();
+
+CREATE OR REPLACE FUNCTION trg_bump_data_version_func()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM nextval('data_version_' || COALESCE(TG_ARGV[0], TG_TABLE_NAME));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE CONSTRAINT TRIGGER trg_data_version_sale_record
+AFTER INSERT OR UPDATE OR DELETE ON sale_record
+DEFERRABLE INITIALLY DEFERRED
+FOR EACH ROW
+EXECUTE FUNCTION trg_bump_data_version_func('sale_record');
+
+-- ѱ仯ʹۼ¼ ETag ʧЧ
+SELECT nextval('data_version_sale_record');
+
+-- ؽͼ create_views.sql ͬ
+CREATE VIEW view_sales_statistics AS
+SELECT
+    b.book_id,
+    b.isbn,
+    b.title,
+    b.author,
+    SUM(s.quantity) AS total_sold,
+    SUM(s.quantity * s.sale_price) AS total_revenue
+FROM book b
+    JOIN sale_record s ON b.book_id = s.book_id
+GROUP BY
+    b.book_id,
+    b.isbn,
+    b.title,
+    b.author
+ORDER BY total_revenue DESC;
+
+CREATE VIEW view_user_sales_performance AS
+SELECT
+    u.user_id,
+    u.username,
+    u.real_name,
+    COUNT(s.sale_id) AS total_sales,
+    SUM(s.quantity) AS total_items_sold,
+    SUM(s.quantity * s.sale_price) AS total_revenue
+FROM "user" u
+    LEFT JOIN sale_record s ON u.user_id = s.seller_id
+GROUP BY
+    u.user_id,
+    u.username,
+    u.real_name
+ORDER BY total_revenue DESC;
+
+CREATE VIEW view_monthly_finance AS
+SELECT TO_CHAR (record_time, 'YYYY-MM') AS month, type, SUM(amount) AS total_amount
+FROM financial_record
+GROUP BY
+    TO_CHAR (record_time, 'YYYY-MM'),
+    type
+ORDER BY month DESC, type;
+
+CREATE VIEW view_partitions AS
+SELECT
+    parent.relname AS parent_table,
+    child.relname AS partition_name,
+    pg_get_expr (child.relpartbound, child.oid) AS partition_bound,
+    GREATEST(child.reltuples, 0)::BIGINT AS estimated_rows,
+    pg_total_relation_size (child.oid) AS total_bytes
+FROM
+    pg_inherits i
+    JOIN pg_class parent ON parent.oid = i.inhparent
+    JOIN pg_class child ON child.oid = i.inhrelid
+WHERE
+    parent.relname IN ('sale_record', 'financial_record')
+ORDER BY parent.relname, child.relname;
+
+COMMIT;
+
+ANALYZE sale_record;
+ANALYZE financial_record;
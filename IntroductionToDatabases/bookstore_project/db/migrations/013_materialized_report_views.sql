@@ -0,0 +1,136 @@
+-- ӵݿ
+\c bookstore_management;
+
+-- ͼΪﻯͼΨһ REFRESH ... CONCURRENTLY
+-- Ӧڵĺ̨ flask reports refresh ʱˢ
+
+BEGIN;
+
+DROP VIEW IF EXISTS view_sales_statistics;
+DROP VIEW IF EXISTS view_purchase_statistics;
+DROP VIEW IF EXISTS view_user_sales_performance;
+DROP VIEW IF EXISTS view_monthly_finance;
+
+-- ﻯͼˢ¼¼ÿͼݶӦʱ㣨ˢ¿ʼʱ̣ˢºʱ
+CREATE TABLE report_refresh (
+    view_name VARCHAR(64) PRIMARY KEY,
+    refreshed_at TIMESTAMP NOT NULL,
+    duration_ms INT NOT NULL DEFAULT 0
+);
+
+-- ͳͼͼͳ۶
+CREATE MATERIALIZED VIEW view_sales_statistics AS
+SELECT
+    b.book_id,
+    b.isbn,
+    b.title,
+    b.author,
+    SUM(s.quantity) AS total_sold,
+    SUM(s.quantity * s.sale_price) AS total_revenue
+FROM book b
+    JOIN sale_record s ON b.book_id = s.book_id
+GROUP BY
+    b.book_id,
+    b.isbn,
+    b.title,
+    b.author;
+
+CREATE UNIQUE INDEX uq_view_sales_statistics ON view_sales_statistics (book_id);
+
+-- ͳͼ
+CREATE MATERIALIZED VIEW view_purchase_statistics AS
+SELECT
+    b.book_id,
+    b.isbn,
+    b.title,
+    SUM(pd.quantity) AS total_purchased,
+    SUM(
+        pd.quantity * pd.purchase_price
+    ) AS total_cost
+FROM
+    book b
+    JOIN purchase_detail pd ON b.book_id = pd.book_id
+    JOIN purchase_order po ON pd.order_id = po.order_id
+WHERE
+    po.status = 'Ѹ'
+GROUP BY
+    b.book_id,
+    b.isbn,
+    b.title;
+
+CREATE UNIQUE INDEX uq_view_purchase_statistics ON view_purchase_statistics (book_id);
+
+-- ûҵͼ
+CREATE MATERIALIZED VIEW view_user_sales_performance AS
+SELECT
+    u.user_id,
+    u.username,
+    u.real_name,
+    COUNT(s.sale_id) AS total_sales,
+    SUM(s.quantity) AS total_items_sold,
+    SUM(s.quantity * s.sale_price) AS total_revenue
+FROM "user" u
+    LEFT JOIN sale_record s ON u.user_id = s.seller_id
+GROUP BY
+    u.user_id,
+    u.username,
+    u.real_name;
+
+CREATE UNIQUE INDEX uq_view_user_sales_performance ON view_user_sales_performance (user_id);
+
+-- ¶ȱͼ
+CREATE MATERIALIZED VIEW view_monthly_finance AS
+SELECT TO_CHAR (record_time, 'YYYY-MM') AS month, type, SUM(amount) AS total_amount
+FROM financial_record
+GROUP BY
+    TO_CHAR (record_time, 'YYYY-MM'),
+    type;
+
+CREATE UNIQUE INDEX uq_view_monthly_finance ON view_monthly_finance (month, type);
+
+INSERT INTO report_refresh (view_name, refreshed_at)
+VALUES
+    ('view_sales_statistics', CURRENT_TIMESTAMP),
+    ('view_purchase_statistics', CURRENT_TIMESTAMP),
+    ('view_user_sales_performance', CURRENT_TIMESTAMP),
+    ('view_monthly_finance', CURRENT_TIMESTAMP);
+
+-- 13. ﻯͼˢ£view_sales_statistics ȣ create_views.sql
+--  CONCURRENTLY ʽˢ£ˢڼԿȡ report_refresh м¼ʱͺʱ
+-- ϴˢ² p_max_ageˢͬһͼʱ NULL
+-- 򷵻رˢµʱ㣨ˢ¿ʼʱ̣
+CREATE OR REPLACE FUNCTION proc_refresh_report_view(
+    p_view TEXT,
+    p_max_age INTERVAL DEFAULT INTERVAL '0'
+) RETURNS TIMESTAMP AS $$
+DECLARE
+    v_started TIMESTAMP;
+BEGIN
+    IF p_view NOT IN ('view_sales_statistics', 'view_purchase_statistics',
+                      'view_user_sales_performance', 'view_monthly_finance') THEN
+        RAISE EXCEPTION '% Ǳﻯͼ', p_view;
+    END IF;
+
+    -- Ӧý̵Ķʱͬʱʱֻһˢ
+    IF NOT pg_try_advisory_xact_lock(hashtext('proc_refresh_report_view'), hashtext(p_view)) THEN
+        RETURN NULL;
+    END IF;
+
+    IF EXISTS (SELECT 1 FROM report_refresh
+               WHERE view_name = p_view AND refreshed_at > LOCALTIMESTAMP - p_max_age) THEN
+        RETURN NULL;
+    END IF;
+
+    v_started := clock_timestamp()::TIMESTAMP;
+    EXECUTE format('REFRESH MATERIALIZED VIEW CONCURRENTLY %I', p_view);
+
+    INSERT INTO report_refresh (view_name, refreshed_at, duration_ms)
+    VALUES (p_view, v_started, (EXTRACT(EPOCH FROM clock_timestamp()::TIMESTAMP - v_started) * 1000)::INT)
+    ON CONFLICT (view_name) DO UPDATE
+    SET refreshed_at = EXCLUDED.refreshed_at, duration_ms = EXCLUDED.duration_ms;
+
+    RETURN v_started;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMIT;
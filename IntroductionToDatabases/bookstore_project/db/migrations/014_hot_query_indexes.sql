@@ -0,0 +1,26 @@
+-- ӵݿ
+\c bookstore_management;
+
+-- ȵѯĲ͸ python -m benchmark.index_advisor 飩
+-- ݿִбű½ݿ init_database.sql ֱӴ
+
+-- Ԥֻȡ stock < 10 ͼ飬ֻЩ
+CREATE INDEX IF NOT EXISTS idx_book_low_stock ON book (stock) WHERE stock < 10;
+
+-- ״̬ɸѡ (create_time, order_id) ҳ˳򼴽˳򣬲Ҫ
+-- ǰ׺ (status) ԭ idx_purchase_order_status
+CREATE INDEX IF NOT EXISTS idx_purchase_order_status_time ON purchase_order (status, create_time, order_id);
+DROP INDEX IF EXISTS idx_purchase_order_status;
+
+-- ؽϸܽⶼ order_id ϸ
+CREATE INDEX IF NOT EXISTS idx_purchase_detail_order ON purchase_detail (order_id);
+
+-- ɾͼǰĹ顢ͳư book_id ϸδϸ book_id Ϊգ
+CREATE INDEX IF NOT EXISTS idx_purchase_detail_book ON purchase_detail (book_id) WHERE book_id IS NOT NULL;
+
+-- ɾͼǰĹͰͼINCLUDE ֻɨ
+CREATE INDEX IF NOT EXISTS idx_sale_book ON sale_record (book_id) INCLUDE (quantity, sale_price);
+
+-- ۻԱɸѡۼ¼ (sale_time, sale_id) ҳǰ׺ (seller_id) ԭ idx_sale_seller
+CREATE INDEX IF NOT EXISTS idx_sale_seller_time ON sale_record (seller_id, sale_time, sale_id);
+DROP INDEX IF EXISTS idx_sale_seller;
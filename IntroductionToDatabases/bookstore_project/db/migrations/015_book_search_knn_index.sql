@@ -0,0 +1,17 @@
+-- ӵݿ
+\c bookstore_management;
+
+-- ͼߡ硢ISBN ƴӺһ GiST Ԫ
+-- ӴˣILIKEͰƶ<->>KNNɸɣֻȡǰ limit 
+-- ʽ backend/search.py е SEARCH_TEXT һ
+CREATE INDEX IF NOT EXISTS idx_book_search_trgm ON book
+    USING GIST ((title || ' ' || author || ' ' || publisher || ' ' || isbn) gist_trgm_ops);
+
+-- ԭϵ GIN Ԫʹ
+DROP INDEX IF EXISTS idx_book_title_trgm;
+
+DROP INDEX IF EXISTS idx_book_author_trgm;
+
+DROP INDEX IF EXISTS idx_book_publisher_trgm;
+
+DROP INDEX IF EXISTS idx_book_isbn_trgm;
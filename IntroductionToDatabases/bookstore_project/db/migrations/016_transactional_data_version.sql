@@ -0,0 +1,37 @@
+-- ӵݿ
+\c bookstore_management;
+
+-- ݰ汾ŸΪڵͨУе nextval ƣ
+-- ȡύ֮ǰͿ°汾ţɴ°汾ŵ ETag
+
+CREATE TABLE IF NOT EXISTS data_version (
+    table_name VARCHAR(64) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
+);
+
+-- ԭеĵǰֵʼǰ ETag ظ
+INSERT INTO data_version (table_name, version)
+SELECT 'book', last_value FROM data_version_book
+UNION ALL SELECT 'sale_record', last_value FROM data_version_sale_record
+UNION ALL SELECT 'user', last_value FROM data_version_user
+ON CONFLICT (table_name) DO NOTHING;
+
+-- ͬһ޸ĶʱֻһΣ񼶵Զü¼Ѿӹ
+-- ύعԶӳٵύʱִУ
+-- 汾еֻύг
+CREATE OR REPLACE FUNCTION trg_bump_data_version_func()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_table TEXT := COALESCE(TG_ARGV[0], TG_TABLE_NAME);
+BEGIN
+    IF current_setting('data_version.' || v_table, TRUE) IS DISTINCT FROM 'bumped' THEN
+        UPDATE data_version SET version = version + 1 WHERE table_name = v_table;
+        PERFORM set_config('data_version.' || v_table, 'bumped', TRUE);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP SEQUENCE IF EXISTS data_version_book;
+DROP SEQUENCE IF EXISTS data_version_sale_record;
+DROP SEQUENCE IF EXISTS data_version_user;
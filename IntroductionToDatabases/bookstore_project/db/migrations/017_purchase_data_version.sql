@@ -0,0 +1,23 @@
+-- ӵݿ
+\c bookstore_management;
+
+-- ݰ汾ţɱͳƽӿھݴ ETag ͻ
+-- ϸһ汾ţ˻ⶼӰɱ
+
+INSERT INTO data_version (table_name)
+VALUES ('purchase_order')
+ON CONFLICT (table_name) DO NOTHING;
+
+DROP TRIGGER IF EXISTS trg_data_version_purchase_order ON purchase_order;
+CREATE CONSTRAINT TRIGGER trg_data_version_purchase_order
+AFTER INSERT OR UPDATE OR DELETE ON purchase_order
+DEFERRABLE INITIALLY DEFERRED
+FOR EACH ROW
+EXECUTE FUNCTION trg_bump_data_version_func('purchase_order');
+
+DROP TRIGGER IF EXISTS trg_data_version_purchase_detail ON purchase_detail;
+CREATE CONSTRAINT TRIGGER trg_data_version_purchase_detail
+AFTER INSERT OR UPDATE OR DELETE ON purchase_detail
+DEFERRABLE INITIALLY DEFERRED
+FOR EACH ROW
+EXECUTE FUNCTION trg_bump_data_version_func('purchase_order');
@@ -0,0 +1,19 @@
+-- ӵݿ
+\c bookstore_management;
+
+-- ¶ȱͼΪɲջܱºϼƣ
+-- ԭÿˢ¶ɨȫ¼̨ÿˢһΣ¼
+
+DROP MATERIALIZED VIEW IF EXISTS view_monthly_finance;
+
+CREATE MATERIALIZED VIEW view_monthly_finance AS
+SELECT TO_CHAR (day, 'YYYY-MM') AS month, type, SUM(total_amount) AS total_amount
+FROM financial_daily_summary
+GROUP BY
+    TO_CHAR (day, 'YYYY-MM'),
+    type;
+
+CREATE UNIQUE INDEX uq_view_monthly_finance ON view_monthly_finance (month, type);
+
+UPDATE report_refresh SET refreshed_at = CURRENT_TIMESTAMP
+WHERE view_name = 'view_monthly_finance';
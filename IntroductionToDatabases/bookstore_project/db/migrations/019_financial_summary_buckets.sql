@@ -0,0 +1,109 @@
+-- ӵݿ
+\c bookstore_management;
+
+-- ջܷͰͬһֻһʱв۶ҪŶӸһС
+-- ÿÿͷΪͰ񰴻ỰۼӵͬУȡʱ졢ͺϼƸͰ
+-- ǰķͰɺ̨ʱÿϲ
+
+ALTER TABLE financial_daily_summary ADD COLUMN IF NOT EXISTS bucket SMALLINT NOT NULL DEFAULT 0;
+ALTER TABLE financial_daily_summary DROP CONSTRAINT financial_daily_summary_pkey;
+ALTER TABLE financial_daily_summary ADD PRIMARY KEY (day, type, bucket);
+
+CREATE OR REPLACE FUNCTION trg_financial_daily_summary_func()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_bucket SMALLINT := pg_backend_pid() % 16;
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        INSERT INTO financial_daily_summary (day, type, bucket, total_amount, record_count)
+        VALUES (OLD.record_time::DATE, OLD.type, v_bucket, -OLD.amount, -1)
+        ON CONFLICT (day, type, bucket) DO UPDATE
+        SET total_amount = financial_daily_summary.total_amount + EXCLUDED.total_amount,
+            record_count = financial_daily_summary.record_count + EXCLUDED.record_count;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO financial_daily_summary (day, type, bucket, total_amount, record_count)
+        VALUES (NEW.record_time::DATE, NEW.type, v_bucket, NEW.amount, 1)
+        ON CONFLICT (day, type, bucket) DO UPDATE
+        SET total_amount = financial_daily_summary.total_amount + EXCLUDED.total_amount,
+            record_count = financial_daily_summary.record_count + EXCLUDED.record_count;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION proc_rebuild_financial_daily_summary()
+RETURNS INT AS $$
+DECLARE
+    v_rows INT;
+BEGIN
+    -- ؽڼֹµĲ¼д룬©
+    LOCK TABLE financial_record IN SHARE MODE;
+
+    DELETE FROM financial_daily_summary;
+
+    INSERT INTO financial_daily_summary (day, type, bucket, total_amount, record_count)
+    SELECT record_time::DATE, type, 0, SUM(amount), COUNT(*)
+    FROM financial_record
+    GROUP BY record_time::DATE, type;
+
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+    RETURN v_rows;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ܱһȺϼƸͰϸȽ
+CREATE OR REPLACE FUNCTION fn_check_financial_daily_summary()
+RETURNS TABLE (
+    day DATE,
+    type VARCHAR(10),
+    summary_amount DECIMAL(14, 2),
+    actual_amount DECIMAL(14, 2),
+    summary_count INT,
+    actual_count INT
+) AS $$
+    SELECT
+        COALESCE(s.day, a.day),
+        COALESCE(s.type, a.type),
+        COALESCE(s.total_amount, 0),
+        COALESCE(a.total_amount, 0),
+        COALESCE(s.record_count, 0)::INT,
+        COALESCE(a.record_count, 0)::INT
+    FROM (
+        SELECT day, type, SUM(total_amount) AS total_amount, SUM(record_count) AS record_count
+        FROM financial_daily_summary
+        GROUP BY day, type
+    ) s
+    FULL OUTER JOIN (
+        SELECT record_time::DATE AS day, type, SUM(amount) AS total_amount, COUNT(*) AS record_count
+        FROM financial_record
+        GROUP BY record_time::DATE, type
+    ) a ON s.day = a.day AND s.type = a.type
+    WHERE COALESCE(s.total_amount, 0) <> COALESCE(a.total_amount, 0)
+       OR COALESCE(s.record_count, 0) <> COALESCE(a.record_count, 0)
+    ORDER BY 1, 2;
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION proc_compact_financial_daily_summary()
+RETURNS INT AS $$
+DECLARE
+    v_rows INT;
+BEGIN
+    WITH moved AS (
+        DELETE FROM financial_daily_summary
+        WHERE bucket <> 0 AND day < CURRENT_DATE
+        RETURNING day, type, total_amount, record_count
+    )
+    INSERT INTO financial_daily_summary (day, type, bucket, total_amount, record_count)
+    SELECT day, type, 0, SUM(total_amount), SUM(record_count)
+    FROM moved
+    GROUP BY day, type
+    ON CONFLICT (day, type, bucket) DO UPDATE
+    SET total_amount = financial_daily_summary.total_amount + EXCLUDED.total_amount,
+        record_count = financial_daily_summary.record_count + EXCLUDED.record_count;
+
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+    RETURN v_rows;
+END;
+$$ LANGUAGE plpgsql;
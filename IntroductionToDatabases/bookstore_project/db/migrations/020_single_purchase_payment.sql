@@ -0,0 +1,54 @@
+-- ӵݿ
+\c bookstore_management;
+
+-- ֻһΣ
+-- ΨһԼ uq_financial_source  record_timeļ¼ʱǸʱ̣
+-- ͬһȲ״̬޸ģдʱ䲻֧ͬ¼
+
+-- Ѽ˵ĲԴ֤ÿŽֻһ
+CREATE TABLE IF NOT EXISTS financial_source (
+    source_type VARCHAR(10) NOT NULL CHECK (source_type IN ('', '')),
+    source_id INT NOT NULL,
+    PRIMARY KEY (source_type, source_id)
+);
+
+-- ǼеĽ
+INSERT INTO financial_source (source_type, source_id)
+SELECT DISTINCT source_type, source_id
+FROM financial_record
+WHERE source_type = ''
+ON CONFLICT DO NOTHING;
+
+-- ״̬޸ĸΪͬһ UPDATEѸʱ޸κв
+CREATE OR REPLACE FUNCTION proc_pay_purchase_order(
+    p_order_id INT,
+    p_operator_id INT
+) RETURNS VOID AS $$
+DECLARE
+    v_total_amount DECIMAL(12, 2);
+BEGIN
+    -- ¶״̬ܽ
+    UPDATE purchase_order
+    SET status = 'Ѹ',
+        total_amount = (
+            SELECT COALESCE(SUM(quantity * purchase_price), 0)
+            FROM purchase_detail
+            WHERE order_id = p_order_id
+        )
+    WHERE order_id = p_order_id AND status = 'δ'
+    RETURNING total_amount INTO v_total_amount;
+
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'ֻδĶԸ';
+    END IF;
+
+    -- Ӳ¼
+    INSERT INTO financial_source (source_type, source_id) VALUES ('', p_order_id);
+    INSERT INTO financial_record (type, amount, source_type, source_id, operator_id, description)
+    VALUES ('֧', v_total_amount, '', p_order_id, p_operator_id,
+            CONCAT('֧: ', p_order_id));
+
+    -- ͼĿ trg_after_purchase_update 
+END;
+$$ LANGUAGE plpgsql;
+
@@ -0,0 +1,86 @@
+-- ӵݿ
+\c bookstore_management;
+
+-- ¼ѹ鵵·ݣջܱѹ鵵·ݵĽ
+-- һԼؽֻ鵵ֹڼ֮ڣٰѹ鵵ʷһ²ɾ
+
+CREATE TABLE IF NOT EXISTS partition_archive (
+    table_name VARCHAR(64) PRIMARY KEY,
+    archived_before DATE NOT NULL
+);
+
+-- Ѿ鵵ݿ⣺Ĳ¼·ݷ֮ǰջܡȴûв¼ʱ
+-- Щ·ݼΪѹ鵵·
+INSERT INTO partition_archive (table_name, archived_before)
+SELECT 'financial_record', p.oldest
+FROM (
+    SELECT MIN(TO_DATE(RIGHT(partition_name, 6), 'YYYYMM')) AS oldest
+    FROM view_partitions
+    WHERE parent_table = 'financial_record' AND partition_name ~ '_p[0-9]{6}$'
+) p
+WHERE EXISTS (SELECT 1 FROM financial_daily_summary WHERE day < p.oldest)
+  AND NOT EXISTS (SELECT 1 FROM financial_record WHERE record_time < p.oldest)
+ON CONFLICT (table_name) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION fn_financial_archive_cutoff()
+RETURNS DATE AS $$
+    SELECT COALESCE(
+        (SELECT archived_before FROM partition_archive WHERE table_name = 'financial_record'),
+        '-infinity'::DATE
+    );
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION proc_rebuild_financial_daily_summary()
+RETURNS INT AS $$
+DECLARE
+    v_rows INT;
+    v_cutoff DATE := fn_financial_archive_cutoff();
+BEGIN
+    -- ؽڼֹµĲ¼д룬©
+    LOCK TABLE financial_record IN SHARE MODE;
+
+    DELETE FROM financial_daily_summary WHERE day >= v_cutoff;
+
+    INSERT INTO financial_daily_summary (day, type, bucket, total_amount, record_count)
+    SELECT record_time::DATE, type, 0, SUM(amount), COUNT(*)
+    FROM financial_record
+    WHERE record_time >= v_cutoff
+    GROUP BY record_time::DATE, type;
+
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+    RETURN v_rows;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION fn_check_financial_daily_summary()
+RETURNS TABLE (
+    day DATE,
+    type VARCHAR(10),
+    summary_amount DECIMAL(14, 2),
+    actual_amount DECIMAL(14, 2),
+    summary_count INT,
+    actual_count INT
+) AS $$
+    SELECT
+        COALESCE(s.day, a.day),
+        COALESCE(s.type, a.type),
+        COALESCE(s.total_amount, 0),
+        COALESCE(a.total_amount, 0),
+        COALESCE(s.record_count, 0)::INT,
+        COALESCE(a.record_count, 0)::INT
+    FROM (
+        SELECT day, type, SUM(total_amount) AS total_amount, SUM(record_count) AS record_count
+        FROM financial_daily_summary
+        WHERE day >= fn_financial_archive_cutoff()
+        GROUP BY day, type
+    ) s
+    FULL OUTER JOIN (
+        SELECT record_time::DATE AS day, type, SUM(amount) AS total_amount, COUNT(*) AS record_count
+        FROM financial_record
+        WHERE record_time >= fn_financial_archive_cutoff()
+        GROUP BY record_time::DATE, type
+    ) a ON s.day = a.day AND s.type = a.type
+    WHERE COALESCE(s.total_amount, 0) <> COALESCE(a.total_amount, 0)
+       OR COALESCE(s.record_count, 0) <> COALESCE(a.record_count, 0)
+    ORDER BY 1, 2;
+$$ LANGUAGE sql;
@@ -2,6 +2,10 @@
 const API = {
     baseUrl: CONFIG.apiBaseUrl,
 
+    // GET 请求的 ETag 缓存：endpoint -> { etag, data }
+    // 再次请求时带上 If-None-Match，服务器返回304时直接使用上次的数据
+    etagCache: new Map(),
+
     // 通用请求方法
     async request(endpoint, options = {}) {
         const url = this.baseUrl + endpoint;
@@ -24,14 +28,25 @@ const API = {
             }
         };
 
-        // 如果有请求体且为JSON格式，转换为字符串
-        if (fetchOptions.body && typeof fetchOptions.body === 'object') {
+        const method = (fetchOptions.method || 'GET').toUpperCase();
+        const cached = method === 'GET' ? this.etagCache.get(endpoint) : null;
+        if (cached) {
+            fetchOptions.headers['If-None-Match'] = cached.etag;
+        }
+
+        // 如果有请求体且为JSON格式，转换为字符串（文件按原始内容上传）
+        if (fetchOptions.body && typeof fetchOptions.body === 'object' && !(fetchOptions.body instanceof Blob)) {
             fetchOptions.body = JSON.stringify(fetchOptions.body);
         }
 
         try {
             const response = await fetch(url, fetchOptions);
 
+            // 数据没有变化
+            if (response.status === 304 && cached) {
+                return cached.data;
+            }
+
             // 获取原始响应文本
             const responseText = await response.text();
 
@@ -49,6 +64,11 @@ const API = {
                 throw new Error(data.error || `请求失败: ${response.status} ${response.statusText}`);
             }
 
+            const etag = method === 'GET' ? response.headers.get('ETag') : null;
+            if (etag) {
+                this.etagCache.set(endpoint, { etag, data });
+            }
+
             return data;
         } catch (error) {
             console.error('API请求错误');
@@ -68,6 +88,7 @@ const API = {
 
         // 登出
         logout() {
+            API.etagCache.clear();
             return API.request('/users/logout', {
                 method: 'POST'
             });
@@ -186,6 +207,14 @@ const API = {
             });
         },
 
+        // 批量销售（购物车结算），items: [{book_id, quantity, sale_price, remark}]
+        createSalesBatch(items) {
+            return API.request('/sales/batch', {
+                method: 'POST',
+                body: { items }
+            });
+        },
+
         // 获取单条销售记录
         getSale(saleId) {
             return API.request(`/sales/${saleId}`);
@@ -221,6 +250,16 @@ const API = {
             });
         },
 
+        // 导入供应商清单（CSV或JSON文件）创建进货单
+        importManifest(file, remark = '') {
+            const isJson = file.name.toLowerCase().endsWith('.json');
+            return API.request(`/purchases/import?remark=${encodeURIComponent(remark)}`, {
+                method: 'POST',
+                headers: { 'Content-Type': isJson ? 'application/json' : 'text/csv' },
+                body: file
+            });
+        },
+
         // 获取单个进货单详情
         getPurchase(purchaseId) {
             return API.request(`/purchases/${purchaseId}`);
@@ -246,12 +285,27 @@ const API = {
             return API.request(`/purchases/${purchaseId}/cancel`, {
                 method: 'POST'
             });
-        },        // 添加新书到库存
+        },
+
+        // 整单新书入库（retailPrices: {明细ID: 零售价}）
+        receiveNewBooks(purchaseId, defaultRetailPrice, retailPrices = {}) {
+            return API.request(`/purchases/${purchaseId}/receive-new-books`, {
+                method: 'POST',
+                body: { default_retail_price: defaultRetailPrice, retail_prices: retailPrices }
+            });
+        },
+
+        // 添加新书到库存
         addNewBookToStock(detailId, retailPrice) {
             return API.request(`/purchases/detail/${detailId}/add-to-stock`, {
                 method: 'POST',
                 body: { retail_price: retailPrice }
             });
+        },
+
+        // 获取进货统计（freshness.refreshed_at 为数据时间点）
+        getPurchaseStatistics() {
+            return API.request('/purchases/statistics');
         }
     },
 
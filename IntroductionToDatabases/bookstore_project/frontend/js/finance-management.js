@@ -179,7 +179,8 @@ const FinanceManagement = {
             const tableBody = document.getElementById('monthly-statistics-body');
             tableBody.innerHTML = '';
 
-            if (sortedData.length > 0) {
+            // 后端会返回全年12个月（无数据的月份金额为0），全部为0时视为无数据
+            if (sortedData.some(item => item.income || item.expense)) {
                 sortedData.forEach(item => {
                     tableBody.innerHTML += `
                         <tr>
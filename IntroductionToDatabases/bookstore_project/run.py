@@ -1,6 +1,8 @@
+import argparse
 import os
 from backend.app import create_app # 从 backend.app 导入
-from flask import send_from_directory
+from backend.models import db
+from backend.static_files import init_static_files
 
 app = create_app()
 
@@ -8,15 +10,56 @@ app = create_app()
 # run.py 在根目录，所以路径相对于当前文件目录
 frontend_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'frontend')
 
-@app.route('/')
-def serve_index():
-    return send_from_directory(frontend_dir, 'index.html')
+# 前端文件（带 ETag/Last-Modified 和缓存头，可选预压缩）
+init_static_files(app, frontend_dir)
 
-@app.route('/<path:path>')
-def serve_static_files(path):
-    return send_from_directory(frontend_dir, path)
+def run_gunicorn(host, port, workers, threads):
+    from gunicorn.app.base import BaseApplication
+
+    class StandaloneApplication(BaseApplication):
+        def load_config(self):
+            self.cfg.set('bind', f'{host}:{port}')
+            self.cfg.set('workers', workers)
+            self.cfg.set('threads', threads)
+            self.cfg.set('worker_class', 'gthread')
+            self.cfg.set('post_fork', post_fork)
+
+        def load(self):
+            return app
+
+    def post_fork(server, worker):
+        # 主进程创建应用时打开的连接不能在子进程间共享，每个工作进程重新建立连接池
+        with app.app_context():
+            db.engine.dispose()
+
+    StandaloneApplication().run()
+
+def run_waitress(host, port, threads):
+    from waitress import serve
+    serve(app, host=host, port=port, threads=threads)
+
+def main():
+    parser = argparse.ArgumentParser(description='书店管理系统')
+    parser.add_argument('--production', action='store_true',
+                        default=os.getenv('RUN_MODE') == 'production',
+                        help='使用多进程/多线程的生产服务器（也可设置 RUN_MODE=production）')
+    parser.add_argument('--host', default=os.getenv('HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.getenv('PORT', 5000)))
+    parser.add_argument('--workers', type=int, default=int(os.getenv('WEB_WORKERS', os.cpu_count() or 1)),
+                        help='工作进程数（仅 gunicorn）')
+    parser.add_argument('--threads', type=int, default=int(os.getenv('WEB_THREADS', 4)),
+                        help='每个工作进程的线程数')
+    args = parser.parse_args()
+
+    if not args.production:
+        # 开发模式：单进程开发服务器，修改代码后自动重载
+        # 使用 '0.0.0.0' 使服务可以从网络中的其他机器访问
+        app.run(host=args.host, port=args.port, debug=True)
+    elif os.name == 'posix':
+        run_gunicorn(args.host, args.port, args.workers, args.threads)
+    else:
+        # Windows 上没有 gunicorn，使用单进程多线程的 waitress
+        run_waitress(args.host, args.port, args.threads)
 
 if __name__ == '__main__':
-    # 注意：在生产环境中，debug模式应该关闭
-    # 使用 '0.0.0.0' 使服务可以从网络中的其他机器访问
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    main()
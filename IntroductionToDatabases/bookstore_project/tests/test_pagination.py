@@ -0,0 +1,29 @@
+"""
+被篡改的分页游标返回400，不会把类型不符的值传给数据库
+"""
+import base64
+import json
+import pytest
+
+def make_cursor(values):
+    raw = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+@pytest.mark.parametrize('path, values', [
+    ('/api/books/', ['x']),
+    ('/api/books/', [True]),
+    ('/api/books/', [[1]]),
+    ('/api/books/', [{'a': 1}]),
+    ('/api/books/', [1.5]),
+    ('/api/sales/', ['2024-01-01T00:00:00', '1']),
+    ('/api/sales/', [1, 1]),
+    ('/api/finance/', ['2024-01-01T00:00:00', None]),
+])
+def test_tampered_cursor_is_rejected(client, path, values):
+    response = client.get(path, query_string={'limit': 2, 'cursor': make_cursor(values)})
+    assert response.status_code == 400
+    assert response.get_json()['error'] == '无效的分页游标'
+
+def test_valid_cursor_is_accepted(client):
+    response = client.get('/api/books/', query_string={'limit': 2, 'cursor': make_cursor([0])})
+    assert response.status_code == 200
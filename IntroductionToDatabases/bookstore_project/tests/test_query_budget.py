@@ -0,0 +1,55 @@
+"""
+带 @query_budget 的接口实际执行的SQL语句数不能超过预算，
+列表接口出现逐行懒加载（N+1）时这里会失败。
+"""
+from urllib.parse import urlencode
+import pytest
+from sqlalchemy import text
+from backend.query_counter import count_queries
+
+# (端点, 请求路径)；路径中的 {sale_id} / {order_id} 取测试数据中的记录
+BUDGET_REQUESTS = [
+    ('sale_bp.get_all_sales', '/api/sales/'),
+    ('sale_bp.get_all_sales', '/api/sales/?limit=3'),
+    ('sale_bp.get_sale', '/api/sales/{sale_id}'),
+    ('finance_bp.get_all_financial_records', '/api/finance/'),
+    ('finance_bp.get_all_financial_records', '/api/finance/?limit=3'),
+    ('purchase_bp.get_all_purchase_orders', '/api/purchases/'),
+    ('purchase_bp.get_all_purchase_orders', '/api/purchases/?' + urlencode({'status': '未付款', 'limit': 2})),
+    ('purchase_bp.get_purchase_order', '/api/purchases/{order_id}'),
+]
+
+@pytest.fixture(scope='module')
+def record_ids(app):
+    from backend.models import db
+    with app.app_context():
+        user_id = app.config['TEST_USER_ID']
+        ids = {
+            'sale_id': db.session.execute(
+                text('SELECT MAX(sale_id) FROM sale_record WHERE seller_id = :user_id'), {'user_id': user_id}
+            ).scalar(),
+            'order_id': db.session.execute(
+                text('SELECT MAX(order_id) FROM purchase_order WHERE creator_id = :user_id'), {'user_id': user_id}
+            ).scalar(),
+        }
+        db.session.remove()
+    return ids
+
+def test_every_budgeted_endpoint_is_checked(app):
+    budgeted = {
+        endpoint for endpoint, view in app.view_functions.items()
+        if getattr(view, 'query_budget', None) is not None
+    }
+    assert budgeted == {endpoint for endpoint, _ in BUDGET_REQUESTS}
+
+@pytest.mark.parametrize('endpoint,path', BUDGET_REQUESTS)
+def test_query_budget(app, client, record_ids, endpoint, path):
+    budget = app.view_functions[endpoint].query_budget
+
+    with count_queries() as counter:
+        response = client.get(path.format(**record_ids))
+
+    assert response.status_code == 200, response.get_json()
+    assert counter.count <= budget, (
+        f'{endpoint} 执行了 {counter.count} 条SQL，超出预算 {budget}:\n' + '\n\n'.join(counter.statements)
+    )
@@ -0,0 +1,18 @@
+"""
+批量销售接口的输入校验：格式不正确的购物车返回400，不进入数据库
+"""
+import pytest
+
+@pytest.mark.parametrize('items', [
+    [1],
+    ['book'],
+    [None],
+    [{'book_id': 1, 'quantity': 1, 'sale_price': float('nan')}],
+    [{'book_id': 1, 'quantity': 1, 'sale_price': float('inf')}],
+    [{'book_id': 1, 'quantity': 1, 'sale_price': 'Infinity'}],
+    [{'book_id': float('inf'), 'quantity': 1, 'sale_price': 10}],
+])
+def test_invalid_items_are_rejected(client, items):
+    response = client.post('/api/sales/batch', json={'items': items})
+    assert response.status_code == 400
+    assert '第1项' in response.get_json()['error']